@@ -0,0 +1,55 @@
+"""
+Control de acceso sin interfaz (headless) sobre video grabado y carpetas de imágenes.
+
+Ejemplos:
+    python batch.py grabacion_puerta1.mp4 grabacion_puerta2.mp4
+    python batch.py fotos_incidente/ --output decisiones.csv
+    python batch.py camara.mp4 --output decisiones.jsonl --frame-step 2 --report reporte.json
+"""
+import argparse
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from dotenv import load_dotenv
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Procesa video grabado o imágenes con la lógica de control de acceso, sin cámara ni ventanas.",
+        epilog=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('sources', nargs='+', help="Archivos de video, imágenes o carpetas de imágenes")
+    parser.add_argument('--db', default='access_control.db', help="Base de datos con los usuarios registrados")
+    parser.add_argument('--output', default=None,
+                        help="Archivo .csv o .jsonl para las decisiones (por defecto se escriben en access_logs)")
+    parser.add_argument('--frame-step', type=int, default=1, help="Procesa uno de cada N frames de video")
+    parser.add_argument('--report', default=None, help="Guarda el reporte de rendimiento en JSON")
+    parser.add_argument('--gallery-file', default=None,
+                        help="Galería cuantizada en archivo (compartida con otros procesos del equipo)")
+    args = parser.parse_args()
+
+    try:
+        from system_core import FaceAccessControlSystem
+        from offline import OfflineProcessor, print_report
+    except ImportError as e:
+        print(f"Error al importar el módulo central: {e}")
+        sys.exit(1)
+
+    system = FaceAccessControlSystem(db_path=args.db, gallery_file=args.gallery_file)
+    try:
+        processor = OfflineProcessor(system, output=args.output, frame_step=args.frame_step)
+        report = processor.process(args.sources)
+    finally:
+        system.close()
+
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReporte guardado en {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark del asistente IA contra un servidor Groq local (sin red ni API key).
+
+Mide, para respuestas completas y en streaming:
+  - tiempo hasta el primer fragmento visible
+  - tiempo total de la respuesta
+  - efecto de la caché de respuestas con preguntas repetidas
+
+Uso:
+    python benchmarks/bench_assistant.py --db access_control.db --repeats 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from groq import Groq
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from assistants import IAAssistant
+from database import DatabaseManager
+from fake_groq_server import start_server
+
+QUESTIONS = [
+    "¿Cuántos usuarios hay registrados?",
+    "¿Cuántos accesos se denegaron hoy?",
+    "¿Quién es el usuario más activo?",
+]
+
+
+def measure(assistant, question, stream):
+    start = time.perf_counter()
+    first = None
+    if stream:
+        for _ in assistant.chat_stream(question):
+            if first is None:
+                first = time.perf_counter() - start
+    else:
+        assistant.chat(question)
+        first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def report(label, samples):
+    first = np.array([s[0] for s in samples]) * 1000
+    total = np.array([s[1] for s in samples]) * 1000
+    print(f"  {label:28s} primer fragmento p50 {np.percentile(first, 50):8.1f} ms | "
+          f"total p50 {np.percentile(total, 50):8.1f} ms | p99 {np.percentile(total, 99):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=None, help="Base de datos (por defecto una temporal vacía)")
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--first-token-delay', type=float, default=0.2)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    db_path = args.db
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        DatabaseManager(db_path=db_path).close()
+
+    server, base_url = start_server(first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    client = Groq(api_key='local', base_url=base_url)
+
+    print(f"Servidor local: {base_url}")
+    for stream in (False, True):
+        label = "streaming" if stream else "respuesta completa"
+        assistant = IAAssistant(db_path=db_path, client=client, cache_size=0)
+        samples = [measure(assistant, QUESTIONS[i % len(QUESTIONS)], stream) for i in range(args.repeats)]
+        report(f"{label} (sin caché)", samples)
+
+        assistant = IAAssistant(db_path=db_path, client=client)
+        samples = [measure(assistant, QUESTIONS[i % len(QUESTIONS)], stream) for i in range(args.repeats)]
+        report(f"{label} (con caché)", samples)
+
+    print(f"  Peticiones recibidas por el servidor: {server.requests}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark de GalleryIndex: búsqueda exacta (fuerza bruta) vs aproximada (IVF).
+
+Genera una galería sintética de embeddings y mide latencia por consulta y
+recall@k del modo aproximado respecto al exacto.
+
+Uso:
+    python benchmarks/bench_gallery.py --sizes 10000 100000 --n-probe 4 8 16
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from gallery import GalleryIndex
+
+
+def make_gallery(size, dim, seed=0):
+    """Embeddings sintéticos agrupados (simula identidades parecidas entre sí)."""
+    rng = np.random.default_rng(seed)
+    n_groups = max(1, size // 50)
+    centers = rng.normal(size=(n_groups, dim)).astype(np.float32)
+    groups = rng.integers(0, n_groups, size=size)
+    return centers[groups] + 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+
+
+def make_probes(gallery, n_queries, seed=1):
+    """Consultas: usuarios de la galería con ruido (otra foto de la misma persona)."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, gallery.shape[0], size=n_queries)
+    noise = 0.2 * rng.normal(size=(n_queries, gallery.shape[1])).astype(np.float32)
+    return gallery[picks] + noise
+
+
+def time_queries(index, probes, k, exact):
+    latencies = []
+    results = []
+    for probe in probes:
+        start = time.perf_counter()
+        results.append(index.search(probe, k=k, exact=exact))
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, results
+
+
+def recall(exact_results, approx_results):
+    hits = 0
+    total = 0
+    for exact, approx in zip(exact_results, approx_results):
+        expected = {user_id for user_id, _, _ in exact}
+        found = {user_id for user_id, _, _ in approx}
+        hits += len(expected & found)
+        total += len(expected)
+    return hits / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    print(f"{'N':>8} {'modo':>12} {'p50 ms':>9} {'p99 ms':>9} {'recall@k':>9}")
+    for size in args.sizes:
+        vectors = make_gallery(size, args.dim)
+        probes = make_probes(vectors, args.queries)
+        entries = [(i, f"user_{i}", v) for i, v in enumerate(vectors)]
+
+        index = GalleryIndex(approximate=True, min_train_size=0)
+        start = time.perf_counter()
+        index.build(entries)
+        build_s = time.perf_counter() - start
+
+        exact_ms, exact_results = time_queries(index, probes, args.k, exact=True)
+        print(f"{size:>8} {'exacto':>12} {np.percentile(exact_ms, 50):9.3f} "
+              f"{np.percentile(exact_ms, 99):9.3f} {1.0:9.3f}")
+
+        for n_probe in args.n_probe:
+            index.n_probe = n_probe
+            approx_ms, approx_results = time_queries(index, probes, args.k, exact=False)
+            print(f"{size:>8} {f'ivf/{n_probe}':>12} {np.percentile(approx_ms, 50):9.3f} "
+                  f"{np.percentile(approx_ms, 99):9.3f} {recall(exact_results, approx_results):9.3f}")
+
+        print(f"{'':>8} construcción del índice: {build_s:.2f} s ({len(index._lists)} listas)")
+
+
+if __name__ == "__main__":
+    main()
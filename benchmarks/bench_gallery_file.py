@@ -0,0 +1,135 @@
+"""
+Benchmark de la galería en archivo cuantizado (float16 / int8) frente a la
+galería float32 cargada desde SQLite.
+
+Para cada tamaño crea una base de datos temporal con embeddings sintéticos y mide:
+  - arranque: leer users + decodificar BLOBs + construir GalleryIndex, frente a
+    leer la generación de users y abrir el archivo con np.memmap
+  - memoria anónima (privada) que suma cada proceso; la del archivo vive en el
+    page cache y se comparte entre procesos
+  - latencia de búsqueda (p50/p99) y precisión: coincidencia del top-1 con float32
+    y error máximo de distancia
+
+Uso:
+    python benchmarks/bench_gallery_file.py --sizes 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bench_gallery import make_gallery, make_probes
+from database import DatabaseManager
+from gallery import GalleryIndex
+from gallery_file import QuantizedGallery, write_gallery_file
+import embeddings
+
+
+def rss_anon_mb():
+    """Memoria anónima residente del proceso (Linux); None si no se puede leer."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('RssAnon:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def make_database(path, vectors):
+    db = DatabaseManager(db_path=path)
+    db.add_users_batch([
+        (f"user_{i}", None, f"known_faces/user_{i}.jpg", embeddings.encode_embedding(vector),
+         embeddings.MODEL_NAME, vector.shape[0], embeddings.EMBEDDING_VERSION)
+        for i, vector in enumerate(vectors)
+    ])
+    return db
+
+
+def load_from_sqlite(db):
+    entries = [
+        (user_id, name, embeddings.decode_embedding(blob, dim))
+        for user_id, name, _, blob, _, dim, _ in db.get_all_users_for_recognition()
+    ]
+    index = GalleryIndex()
+    index.build(entries)
+    return index, entries
+
+
+def time_search(index, probes, k):
+    latencies = []
+    results = []
+    for probe in probes:
+        start = time.perf_counter()
+        results.append(index.search(probe, k=k))
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, results
+
+
+def accuracy(reference, results):
+    agree = sum(r[0][0] == q[0][0] for r, q in zip(reference, results))
+    error = max(abs(r[0][2] - q[0][2]) for r, q in zip(reference, results))
+    return agree / len(reference), error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'N':>8} {'galería':>9} {'arranque':>10} {'archivo':>9} {'mem. priv.':>11} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'top-1':>7} {'err. dist.':>10}")
+    for size in args.sizes:
+        vectors = make_gallery(size, args.dim)
+        probes = make_probes(vectors, args.queries)
+        with tempfile.TemporaryDirectory() as tmp:
+            db = make_database(os.path.join(tmp, 'bench.db'), vectors)
+            generation = db.get_users_generation()
+
+            # Primero los archivos mapeados, para que la memoria del float32 no se mezcle
+            rows = []
+            entries = None
+            for dtype in ('float16', 'int8'):
+                path = os.path.join(tmp, f'gallery_{dtype}.bin')
+                if entries is None:
+                    _, entries = load_from_sqlite(db)
+                write_gallery_file(path, entries, dtype=dtype, generation=generation,
+                                   model=embeddings.MODEL_NAME, version=embeddings.EMBEDDING_VERSION)
+                before = rss_anon_mb()
+                start = time.perf_counter()
+                db.get_users_generation()
+                gallery = QuantizedGallery(path)
+                startup = time.perf_counter() - start
+                latencies, results = time_search(gallery, probes, args.k)
+                after = rss_anon_mb()
+                rows.append((dtype, startup, os.path.getsize(path), before, after, latencies, results))
+            entries = None
+
+            before = rss_anon_mb()
+            start = time.perf_counter()
+            index, _ = load_from_sqlite(db)
+            startup = time.perf_counter() - start
+            latencies, reference = time_search(index, probes, args.k)
+            after = rss_anon_mb()
+            rows.insert(0, ('float32', startup, None, before, after, latencies, reference))
+            db.close()
+
+        for dtype, startup, file_size, before, after, latencies, results in rows:
+            agree, error = accuracy(reference, results)
+            memory = f"{after - before:8.1f} MB" if before is not None else f"{'-':>11}"
+            size_text = f"{file_size / 2**20:6.1f} MB" if file_size else f"{'(SQLite)':>9}"
+            print(f"{size:>8} {dtype:>9} {startup * 1000:7.1f} ms {size_text} {memory} "
+                  f"{np.percentile(latencies, 50):8.3f} {np.percentile(latencies, 99):8.3f} "
+                  f"{agree:7.1%} {error:10.5f}")
+
+
+if __name__ == "__main__":
+    main()
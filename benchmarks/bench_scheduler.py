@@ -0,0 +1,159 @@
+"""
+Simulación de estrategias de reconocimiento en una escena sintética.
+
+Compara, sobre la misma secuencia de frames:
+  fixed      reconocer todos los rostros cada N frames (el antiguo check_interval)
+  tracker    calendario por track de FaceTracker (tiempo/confianza)
+  events     RecognitionScheduler (rostro nuevo, cambio en el rostro, plazo) con presupuesto
+
+Mide inferencias totales, latencia desde que aparece una persona hasta su primera
+decisión y latencia para detectar un cambio de persona dentro de una misma caja.
+La detección y el reconocimiento se simulan (cajas y texturas conocidas), así
+que el resultado depende solo de la estrategia.
+
+Uso:
+    python benchmarks/bench_scheduler.py --seconds 120 --budget 5
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from scheduler import RecognitionScheduler
+from tracking import FaceTracker
+
+WIDTH, HEIGHT = 640, 480
+FACE = 96
+
+
+def make_scene(seconds, fps, people, seed=0):
+    """
+    Genera apariciones: cada persona entra, se queda un tiempo y sale;
+    en algunas, otra identidad ocupa su lugar a mitad de camino (cambio de persona).
+    Returns:
+        Lista de eventos {start, end, swap_at, box, identities}
+    """
+    rng = np.random.default_rng(seed)
+    total = seconds * fps
+    slots = [(40 + i * 150, 150) for i in range(4)]
+    events = []
+    for i in range(people):
+        start = int(rng.integers(0, total - fps * 5))
+        duration = int(rng.integers(fps * 3, fps * 20))
+        swap_at = start + duration // 2 if rng.random() < 0.3 else None
+        x, y = slots[i % len(slots)]
+        events.append({
+            'start': start, 'end': min(total, start + duration), 'swap_at': swap_at,
+            'box': (x, y, FACE, FACE), 'identities': (2 * i, 2 * i + 1),
+        })
+    # Un rostro por posición a la vez
+    events.sort(key=lambda e: e['start'])
+    busy = {}
+    kept = []
+    for event in events:
+        if busy.get(event['box'], -1) < event['start']:
+            kept.append(event)
+            busy[event['box']] = event['end']
+    return kept
+
+
+def render(frame_index, events, textures, background, rng):
+    frame = background.copy()
+    boxes, identities = [], []
+    for event in events:
+        if event['start'] <= frame_index < event['end']:
+            identity = event['identities'][1] if event['swap_at'] and frame_index >= event['swap_at'] \
+                else event['identities'][0]
+            jitter = rng.integers(-2, 3, size=2)
+            x, y, w, h = event['box']
+            x, y = x + int(jitter[0]), y + int(jitter[1])
+            frame[y:y+h, x:x+w] = textures[identity]
+            boxes.append((x, y, w, h))
+            identities.append(identity)
+    return frame, boxes, identities
+
+
+def simulate(strategy, events, args):
+    rng = np.random.default_rng(1)
+    texture_rng = np.random.default_rng(2)
+    n_identities = max(max(e['identities']) for e in events) + 1
+    textures = [texture_rng.integers(0, 256, size=(FACE, FACE), dtype=np.uint8) for _ in range(n_identities)]
+    background = np.full((HEIGHT, WIDTH), 90, dtype=np.uint8)
+
+    tracker = FaceTracker()
+    scheduler = RecognitionScheduler(tracker, max_rate=args.budget) if strategy == 'events' else None
+
+    inferences = 0
+    first_decision = {}   # identidad -> frame de su primera decisión
+    total_frames = args.seconds * args.fps
+    for frame_index in range(total_frames):
+        now = frame_index / args.fps
+        frame, boxes, identities = render(frame_index, events, textures, background, rng)
+        tracks = tracker.update(boxes, now=now)
+
+        if strategy == 'fixed':
+            to_recognize = tracks if frame_index % args.check_interval == 0 else []
+        elif strategy == 'tracker':
+            to_recognize = [t for t in tracks if tracker.needs_recognition(t, now=now)]
+        else:
+            to_recognize = [t for t, _ in scheduler.select(frame, tracks, now=now)]
+
+        for track in to_recognize:
+            # Reconocimiento simulado: identidad de la caja más parecida
+            identity = identities[boxes.index(track.box)] if track.box in boxes else None
+            inferences += 1
+            if scheduler is not None:
+                scheduler.mark_submitted(frame, track, 'sim', now=now)
+            else:
+                tracker.mark_pending(track, now=now)
+            result = {'verified': True, 'user_id': identity, 'name': str(identity), 'distance': 0.2}
+            tracker.assign_result(track.id, result, now=now)
+            if identity is not None and identity not in first_decision:
+                first_decision[identity] = frame_index
+
+    appear, swap = [], []
+    missed = 0
+    for event in events:
+        first, second = event['identities']
+        if first in first_decision:
+            appear.append((first_decision[first] - event['start']) / args.fps)
+        else:
+            missed += 1
+        if event['swap_at']:
+            if second in first_decision:
+                swap.append((first_decision[second] - event['swap_at']) / args.fps)
+            else:
+                missed += 1
+
+    return {
+        'inferences': inferences,
+        'per_second': inferences / args.seconds,
+        'appear_ms': np.mean(appear) * 1000 if appear else float('nan'),
+        'swap_ms': np.mean(swap) * 1000 if swap else float('nan'),
+        'missed': missed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=int, default=120)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--people', type=int, default=40)
+    parser.add_argument('--check-interval', type=int, default=30, help="Frames entre reconocimientos (fixed)")
+    parser.add_argument('--budget', type=float, default=5.0, help="Reconocimientos/s del planificador por eventos")
+    args = parser.parse_args()
+
+    events = make_scene(args.seconds, args.fps, args.people)
+    swaps = sum(1 for e in events if e['swap_at'])
+    print(f"Escena: {args.seconds} s a {args.fps} FPS, {len(events)} apariciones, {swaps} cambio(s) de persona\n")
+    print(f"{'estrategia':>10} {'inferencias':>12} {'inf/s':>7} {'1ª decisión':>12} {'cambio':>10} {'perdidos':>9}")
+    for strategy in ('fixed', 'tracker', 'events'):
+        r = simulate(strategy, events, args)
+        print(f"{strategy:>10} {r['inferences']:>12} {r['per_second']:>7.2f} {r['appear_ms']:>9.0f} ms "
+              f"{r['swap_ms']:>7.0f} ms {r['missed']:>9}")
+
+
+if __name__ == "__main__":
+    main()
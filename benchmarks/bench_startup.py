@@ -0,0 +1,108 @@
+"""
+Benchmark del arranque para operaciones que solo usan la base de datos.
+
+Lanza un intérprete nuevo por repetición que importa el sistema, lo inicializa
+y consulta estadísticas y usuarios (opciones 3 y 4 del menú). Mide el tiempo
+total y la memoria máxima (RSS), y comprueba que no se cargaron módulos pesados
+(TensorFlow, DeepFace, Groq). Termina con código 1 si se supera el presupuesto,
+para usarlo como control de regresiones.
+
+Uso:
+    python benchmarks/bench_startup.py --repeats 5 --budget 1.0
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+HEAVY_MODULES = ['tensorflow', 'keras', 'deepface.DeepFace', 'groq', 'sklearn']
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+
+def max_rss_mb():
+    # resource solo existe en Unix; en Windows se usa psutil si está instalado
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        memory = psutil.Process().memory_info()
+        return getattr(memory, 'peak_wset', memory.rss) / 2**20
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 2**20 if sys.platform == 'darwin' else max_rss / 1024  # bytes en macOS, KB en Linux
+
+sys.path.append({src!r})
+from system_core import FaceAccessControlSystem
+imported = time.perf_counter()
+system = FaceAccessControlSystem(db_path={db!r})
+system.get_access_statistics()
+system.get_all_users()
+ready = time.perf_counter()
+system.close()
+print(json.dumps({{
+    'import': imported - start,
+    'ready': ready - start,
+    'max_rss_mb': max_rss_mb(),
+    'heavy': [m for m in {heavy!r} if m in sys.modules],
+}}))
+'''
+
+
+def run_once(db_path, workdir):
+    code = CHILD.format(src=SRC_DIR, db=os.path.abspath(db_path), heavy=HEAVY_MODULES)
+    process = subprocess.run([sys.executable, '-c', code], cwd=workdir, capture_output=True, text=True)
+    if process.returncode != 0:
+        print(process.stderr)
+        sys.exit(f"El proceso de arranque falló (código {process.returncode})")
+    # La última línea es el JSON (las anteriores son mensajes del sistema)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=None, help="Base de datos (por defecto una temporal vacía)")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help="Tiempo máximo (s) hasta tener estadísticas y usuarios (mediana)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = args.db or os.path.join(workdir, 'bench.db')
+
+    runs = [run_once(db_path, workdir) for _ in range(args.repeats)]
+    import_times = np.array([r['import'] for r in runs])
+    ready_times = np.array([r['ready'] for r in runs])
+    rss = [r['max_rss_mb'] for r in runs if r['max_rss_mb'] is not None]
+    heavy = sorted({m for r in runs for m in r['heavy']})
+
+    print(f"Arranque ({args.repeats} repeticiones):")
+    print(f"  Importación:             p50 {np.median(import_times) * 1000:7.1f} ms | máx {import_times.max() * 1000:7.1f} ms")
+    print(f"  Hasta estadísticas:      p50 {np.median(ready_times) * 1000:7.1f} ms | máx {ready_times.max() * 1000:7.1f} ms")
+    print(f"  Memoria máxima (RSS):    {max(rss):.0f} MB" if rss
+          else "  Memoria máxima (RSS):    - (instala psutil para medirla en Windows)")
+    print(f"  Módulos pesados cargados: {', '.join(heavy) if heavy else 'ninguno'}")
+
+    failed = False
+    if np.median(ready_times) > args.budget:
+        print(f"FALLO: el arranque supera el presupuesto de {args.budget:.2f} s")
+        failed = True
+    if heavy:
+        print("FALLO: las operaciones de base de datos cargaron módulos pesados")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Suite de benchmarks del sistema (CPU, sin cámara ni red).
+
+Secciones:
+  detection   FPS del detector Haar a varias resoluciones
+  embedding   Latencia del modelo Facenet por tamaño de lote
+  matching    Latencia de búsqueda contra galerías sintéticas (10 a 100k usuarios)
+  logging     Registros/s de log_access (escritura diferida)
+  statistics  Latencia de las consultas de estadísticas y registros sobre una base grande
+
+Los resultados se guardan en JSON para comparar ejecuciones en el tiempo.
+Con --images se usan fotos reales como fixture (recomendado para detección);
+si no, se generan imágenes sintéticas.
+
+Uso:
+    python benchmarks/bench_suite.py --output resultados.json
+    python benchmarks/bench_suite.py --quick --sections matching logging
+    python benchmarks/bench_suite.py --images fotos/ --compare resultados_anteriores.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bench_gallery import make_gallery, make_probes
+from database import DatabaseManager
+from gallery import GalleryIndex
+
+SECTIONS = ['detection', 'embedding', 'matching', 'logging', 'statistics']
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720), (1920, 1080)]
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def latency_summary(seconds):
+    """Resumen de latencias en milisegundos."""
+    ms = np.asarray(seconds) * 1000
+    return {
+        'count': int(ms.size),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+
+
+def load_fixture_images(images_dir):
+    if not images_dir:
+        return []
+    images = []
+    for filename in sorted(os.listdir(images_dir)):
+        if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+            image = cv2.imread(os.path.join(images_dir, filename))
+            if image is not None:
+                images.append(image)
+    return images
+
+
+def make_frames(images, width, height, count, seed=0):
+    """Frames de prueba: fotos del fixture redimensionadas o imágenes sintéticas suavizadas."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        if images:
+            frames.append(cv2.resize(images[i % len(images)], (width, height)))
+        else:
+            noise = rng.integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+            frames.append(cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC))
+    return frames
+
+
+# ==================== SECCIONES ====================
+
+def bench_detection(args, images):
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    results = {'source': 'fixture' if images else 'synthetic'}
+    for width, height in RESOLUTIONS:
+        frames = make_frames(images, width, height, args.frames)
+        cascade.detectMultiScale(cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY), 1.3, 5)  # Calentamiento
+        latencies = []
+        faces = 0
+        for frame in frames:
+            start = time.perf_counter()
+            # Mismo procesamiento que el bucle en vivo
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces += len(cascade.detectMultiScale(gray, 1.3, 5))
+            latencies.append(time.perf_counter() - start)
+        summary = latency_summary(latencies)
+        summary['fps'] = 1000.0 / summary['mean_ms']
+        summary['faces'] = faces
+        results[f"{width}x{height}"] = summary
+        print(f"  {width}x{height:<5} {summary['fps']:8.1f} FPS | p50 {summary['p50_ms']:7.2f} ms | "
+              f"{faces} rostro(s)")
+    return results
+
+
+def bench_embedding(args, images):
+    try:
+        from model_manager import ModelManager
+        manager = ModelManager(intra_op_threads=args.threads, inter_op_threads=args.threads and 1,
+                               warmup_batch_sizes=args.batch_sizes)
+        start = time.perf_counter()
+        manager.load()
+        load_s = time.perf_counter() - start
+    except Exception as e:
+        print(f"  Omitido: no se pudo cargar el modelo ({e})")
+        return {'skipped': str(e)}
+
+    results = {'load_s': load_s, 'batches': {}}
+    rng = np.random.default_rng(0)
+    for batch_size in args.batch_sizes:
+        batch = rng.random((batch_size, *manager.target_size, 3), dtype=np.float32)
+        latencies = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            manager.embed(batch)
+            latencies.append(time.perf_counter() - start)
+        summary = latency_summary(latencies)
+        summary['per_face_ms'] = summary['p50_ms'] / batch_size
+        summary['faces_per_s'] = 1000.0 * batch_size / summary['mean_ms']
+        results['batches'][str(batch_size)] = summary
+        print(f"  lote {batch_size:>3}: p50 {summary['p50_ms']:8.2f} ms | "
+              f"{summary['per_face_ms']:6.2f} ms/rostro | {summary['faces_per_s']:7.1f} rostros/s")
+
+    if images:
+        # Detección + alineación de DeepFace sobre fotos reales
+        latencies = []
+        for image in images[:args.repeats]:
+            start = time.perf_counter()
+            try:
+                manager.preprocess(image, enforce_detection=False)
+            except Exception:
+                continue
+            latencies.append(time.perf_counter() - start)
+        if latencies:
+            results['preprocess'] = latency_summary(latencies)
+            print(f"  preprocesado: p50 {results['preprocess']['p50_ms']:8.2f} ms/imagen")
+    return results
+
+
+def bench_matching(args):
+    results = {}
+    for size in args.gallery_sizes:
+        vectors = make_gallery(size, 128)
+        probes = make_probes(vectors, args.queries)
+        entries = [(i, f"user_{i}", v) for i, v in enumerate(vectors)]
+
+        approximate = size >= 10000
+        index = GalleryIndex(approximate=approximate, min_train_size=0)
+        start = time.perf_counter()
+        index.build(entries)
+        build_s = time.perf_counter() - start
+
+        summary = {'build_s': build_s}
+        modes = [('exact', True)] + ([('ivf', False)] if approximate else [])
+        exact_ids = None
+        for mode, exact in modes:
+            latencies = []
+            ids = []
+            for probe in probes:
+                start = time.perf_counter()
+                match = index.search(probe, k=1, exact=exact)
+                latencies.append(time.perf_counter() - start)
+                ids.append(match[0][0] if match else None)
+            summary[mode] = latency_summary(latencies)
+            if exact_ids is None:
+                exact_ids = ids
+            else:
+                summary[mode]['recall_at_1'] = float(np.mean([a == b for a, b in zip(exact_ids, ids)]))
+        results[str(size)] = summary
+
+        line = f"  {size:>7} usuarios: exacto p50 {summary['exact']['p50_ms']:7.3f} ms"
+        if approximate:
+            line += (f" | ivf p50 {summary['ivf']['p50_ms']:7.3f} ms "
+                     f"(recall@1 {summary['ivf']['recall_at_1']:.3f})")
+        print(line)
+    return results
+
+
+def bench_logging(args, workdir):
+    db_manager = DatabaseManager(db_path=os.path.join(workdir, 'logging.db'))
+    rows = args.log_rows
+    start = time.perf_counter()
+    for i in range(rows):
+        db_manager.log_access(i % 100, f"user_{i % 100}", i % 3 != 0, 0.8)
+    enqueued = time.perf_counter() - start
+    db_manager.flush()
+    total = time.perf_counter() - start
+    db_manager.close()
+
+    results = {
+        'rows': rows,
+        'enqueue_us_per_row': enqueued / rows * 1e6,
+        'rows_per_s': rows / total,
+    }
+    print(f"  {rows} registros: {results['rows_per_s']:,.0f} registros/s | "
+          f"encolar {results['enqueue_us_per_row']:.1f} µs/registro")
+    return results
+
+
+def generate_access_logs(db_manager, rows, users=1000, days=180, chunk=50000, seed=0):
+    """Rellena access_logs con registros sintéticos repartidos en los últimos días."""
+    rand = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    written = 0
+    while written < rows:
+        entries = []
+        for _ in range(min(chunk, rows - written)):
+            user = rand.randrange(users)
+            granted = rand.random() < 0.8
+            timestamp = now - timedelta(seconds=rand.randrange(days * 86400))
+            entries.append((
+                user if granted else None,
+                f"user_{user}" if granted else 'Desconocido',
+                timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                granted,
+                rand.uniform(0.6, 1.0) if granted else 0.0,
+                f"cam{rand.randrange(4)}"
+            ))
+        db_manager._write_access_logs(entries)
+        written += len(entries)
+
+
+def bench_statistics(args, workdir):
+    db_manager = DatabaseManager(db_path=os.path.join(workdir, 'statistics.db'))
+    start = time.perf_counter()
+    generate_access_logs(db_manager, args.db_rows)
+    generate_s = time.perf_counter() - start
+    print(f"  Base generada: {args.db_rows:,} registros en {generate_s:.1f} s")
+
+    queries = {
+        'access_statistics': db_manager.get_access_statistics,
+        'daily_statistics': lambda: db_manager.get_daily_statistics(days=30),
+        'user_statistics': lambda: db_manager.get_user_statistics(limit=10),
+        'logs_by_user': lambda: list(zip(range(20), db_manager.query_access_logs(
+            user_name='user_42', page_size=20))),
+        'logs_denied_range': lambda: list(zip(range(20), db_manager.query_access_logs(
+            granted=False, start=(datetime.now(timezone.utc) - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S'),
+            page_size=20))),
+    }
+
+    results = {'rows': args.db_rows, 'generate_s': generate_s}
+    for name, query in queries.items():
+        query()  # Calentamiento (caché de páginas de SQLite)
+        latencies = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            query()
+            latencies.append(time.perf_counter() - start)
+        results[name] = latency_summary(latencies)
+        print(f"  {name:20s} p50 {results[name]['p50_ms']:8.3f} ms | p99 {results[name]['p99_ms']:8.3f} ms")
+    db_manager.close()
+    return results
+
+
+# ==================== RESULTADOS ====================
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def flatten(results, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1} (solo valores numéricos)."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, previous_path):
+    """Muestra la variación de las métricas de latencia y rendimiento respecto a otra ejecución."""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = flatten(json.load(f)['results'])
+    print(f"\nComparación con {previous_path}:")
+    for name, value in flatten(current).items():
+        if name in previous and previous[name] and name.endswith(('p50_ms', 'fps', 'rows_per_s', 'faces_per_s')):
+            change = (value - previous[name]) / previous[name] * 100
+            print(f"  {name:55s} {previous[name]:12.3f} -> {value:12.3f} ({change:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS, default=SECTIONS)
+    parser.add_argument('--output', default='bench_results.json', help="Archivo JSON de resultados")
+    parser.add_argument('--compare', default=None, help="JSON de una ejecución anterior")
+    parser.add_argument('--images', default=None, help="Carpeta de fotos de rostros usada como fixture")
+    parser.add_argument('--quick', action='store_true', help="Tamaños reducidos (para CI o pruebas rápidas)")
+    parser.add_argument('--threads', type=int, default=None, help="Hilos de TensorFlow para el modelo")
+    args = parser.parse_args()
+
+    args.frames = 20 if args.quick else 100
+    args.repeats = 20 if args.quick else 100
+    args.queries = 50 if args.quick else 200
+    args.batch_sizes = [1, 4, 16] if args.quick else [1, 2, 4, 8, 16, 32]
+    args.gallery_sizes = [10, 100, 1000, 10000] if args.quick else [10, 100, 1000, 10000, 100000]
+    args.log_rows = 20000 if args.quick else 200000
+    args.db_rows = 100000 if args.quick else 1000000
+
+    images = load_fixture_images(args.images)
+    workdir = tempfile.mkdtemp()
+    results = {}
+    for section in args.sections:
+        print(f"\n[{section}]")
+        if section == 'detection':
+            results[section] = bench_detection(args, images)
+        elif section == 'embedding':
+            results[section] = bench_embedding(args, images)
+        elif section == 'matching':
+            results[section] = bench_matching(args)
+        elif section == 'logging':
+            results[section] = bench_logging(args, workdir)
+        elif section == 'statistics':
+            results[section] = bench_statistics(args, workdir)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment_info(), 'quick': args.quick, 'results': results},
+                  f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Servidor local compatible con la API de chat de Groq (/openai/v1/chat/completions).
+
+Permite probar y medir el asistente IA sin red ni API key. Responde con un
+texto fijo, en modo normal o en streaming (SSE), simulando la latencia del
+primer token y la velocidad de generación.
+
+Uso:
+    python benchmarks/fake_groq_server.py --port 8765
+    (el cliente: Groq(api_key='local', base_url='http://127.0.0.1:8765'))
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = (
+    "El sistema tiene usuarios registrados y un historial de accesos. "
+    "Puedes consultar las estadísticas desde el menú principal."
+)
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Silencioso
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/openai/v1/chat/completions':
+            self._send_json(404, {'error': {'message': f"Ruta desconocida: {self.path}"}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+        server.requests += 1
+
+        model = request.get('model', 'fake-model')
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        words = server.answer.split(' ')
+
+        time.sleep(server.first_token_delay)
+
+        if not request.get('stream'):
+            time.sleep(server.token_delay * len(words))
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': server.answer},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': len(words), 'total_tokens': len(words)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        def send_chunk(delta, finish_reason=None):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        send_chunk({'role': 'assistant', 'content': ''})
+        for i, word in enumerate(words):
+            send_chunk({'content': word if i == 0 else ' ' + word})
+            time.sleep(server.token_delay)
+        send_chunk({}, finish_reason='stop')
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start_server(port=0, answer=DEFAULT_ANSWER, first_token_delay=0.2, token_delay=0.02):
+    """
+    Arranca el servidor en un hilo.
+    Returns:
+        (server, base_url); server.requests cuenta las peticiones recibidas
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeGroqHandler)
+    server.daemon_threads = True
+    server.answer = answer
+    server.first_token_delay = first_token_delay
+    server.token_delay = token_delay
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-delay', type=float, default=0.2)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.port, first_token_delay=args.first_token_delay,
+                                    token_delay=args.token_delay)
+    print(f"Servidor Groq local en {base_url} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
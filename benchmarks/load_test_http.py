@@ -0,0 +1,144 @@
+"""
+Prueba de carga del servicio HTTP de reconocimiento (serve.py) en localhost.
+
+Lanza varios clientes concurrentes (uno por hilo, con conexión keep-alive) que
+envían la misma imagen a POST /recognize durante un tiempo fijo, y reporta:
+  - peticiones/s atendidas y distribución de códigos (200, 503...)
+  - latencia p50/p90/p99 de las respuestas 200
+  - tamaño medio de los lotes del modelo según /stats (micro-batching)
+
+Con --concurrency varios valores se mide cada nivel por separado, para ver
+dónde se satura el servicio y a partir de cuándo responde 503.
+
+Uso:
+    python serve.py --port 8080 --no-log          # en otra terminal
+    python benchmarks/load_test_http.py --image rostro.jpg --concurrency 1 4 16 64
+    python benchmarks/load_test_http.py --image rostro.jpg --duration 30 --output carga.json
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import numpy as np
+
+
+def get_stats(host, port):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        connection.request('GET', '/stats')
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def client(host, port, path, body, content_type, deadline, latencies, statuses, lock):
+    """Envía peticiones en bucle cerrado hasta la hora límite."""
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    local_latencies, local_statuses = [], Counter()
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('POST', path, body=body, headers={'Content-Type': content_type})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                status = 'error'
+            elapsed = time.perf_counter() - start
+            local_statuses[status] += 1
+            if status == 200:
+                local_latencies.append(elapsed)
+    finally:
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+
+def run_level(host, port, path, body, content_type, concurrency, duration):
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    before = get_stats(host, port)['embedding']
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=client, args=(host, port, path, body, content_type, deadline,
+                                              latencies, statuses, lock))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    after = get_stats(host, port)['embedding']
+
+    batches = after['batches'] - before['batches']
+    faces = after['faces'] - before['faces']
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'concurrency': concurrency,
+        'requests': sum(statuses.values()),
+        'ok': statuses.get(200, 0),
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'requests_per_s': statuses.get(200, 0) / elapsed,
+        'p50_ms': float(np.percentile(latencies_ms, 50)) if latencies else None,
+        'p90_ms': float(np.percentile(latencies_ms, 90)) if latencies else None,
+        'p99_ms': float(np.percentile(latencies_ms, 99)) if latencies else None,
+        'mean_batch_size': faces / batches if batches else None,
+    }
+
+
+def fmt(value, pattern):
+    return pattern.format(value) if value is not None else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help="Dirección del servicio")
+    parser.add_argument('--image', required=True, help="Imagen JPEG/PNG con un rostro")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help="Clientes concurrentes (uno o varios niveles)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Segundos por nivel")
+    parser.add_argument('--camera-id', default='load-test')
+    parser.add_argument('--output', default=None, help="Guarda los resultados en JSON")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    host, port = url.hostname, url.port or 80
+    with open(args.image, 'rb') as f:
+        body = f.read()
+    content_type = 'image/png' if args.image.lower().endswith('.png') else 'image/jpeg'
+    path = f"/recognize?camera_id={args.camera_id}"
+
+    stats = get_stats(host, port)
+    print(f"Servicio en {args.url}: {stats['gallery']['users']} usuarios, "
+          f"cola máxima {stats['service']['max_queue_depth']} peticiones")
+    print(f"{'clientes':>8} {'peticiones':>10} {'ok':>7} {'503':>6} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'lote medio':>10}")
+
+    results = []
+    for concurrency in args.concurrency:
+        result = run_level(host, port, path, body, content_type, concurrency, args.duration)
+        results.append(result)
+        print(f"{concurrency:>8} {result['requests']:>10} {result['ok']:>7} "
+              f"{result['statuses'].get('503', 0):>6} {result['requests_per_s']:8.1f} "
+              f"{fmt(result['p50_ms'], '{:8.1f}'):>8} {fmt(result['p90_ms'], '{:8.1f}'):>8} "
+              f"{fmt(result['p99_ms'], '{:8.1f}'):>8} {fmt(result['mean_batch_size'], '{:10.2f}'):>10}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'url': args.url, 'image': args.image, 'duration_s': args.duration,
+                       'results': results}, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Registro masivo de usuarios desde una carpeta de fotos o un manifiesto CSV.
+
+El manifiesto CSV debe tener las columnas: name, email, photo
+(las rutas de las fotos son relativas al archivo CSV).
+En una carpeta, el nombre de cada usuario sale del nombre del archivo
+(Juan_Perez.jpg -> "Juan Perez").
+
+Ejemplos:
+    python bulk_enroll.py personal.csv
+    python bulk_enroll.py fotos_personal/ --workers 8 --batch-size 500
+    python bulk_enroll.py personal.csv --retry-failed
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from database import DatabaseManager
+from enrollment import BulkEnroller, load_entries, print_report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Registra muchos usuarios en paralelo.",
+        epilog=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('source', help="Carpeta de fotos o manifiesto CSV")
+    parser.add_argument('--db', default='access_control.db', help="Base de datos del sistema")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos para calcular embeddings")
+    parser.add_argument('--batch-size', type=int, default=200, help="Usuarios por transacción")
+    parser.add_argument('--journal', default=None,
+                        help="Archivo de progreso para reanudar (por defecto <source>.progress.jsonl)")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="Reintenta las entradas que fallaron en ejecuciones anteriores")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"No se encuentra: {args.source}")
+        sys.exit(1)
+
+    journal = args.journal or os.path.abspath(args.source).rstrip(os.sep) + '.progress.jsonl'
+    entries = load_entries(args.source)
+    print(f"{len(entries)} entrada(s) leídas de {args.source}")
+    print(f"Progreso en: {journal}")
+
+    db_manager = DatabaseManager(db_path=args.db)
+    enroller = BulkEnroller(
+        db_manager, workers=args.workers, batch_size=args.batch_size,
+        journal_path=journal, retry_failed=args.retry_failed
+    )
+    report = enroller.run(entries)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
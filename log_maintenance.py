@@ -0,0 +1,76 @@
+"""
+Mantenimiento de los logs de acceso particionados por mes.
+
+Comandos:
+    list     Muestra las particiones archivadas
+    compact  Archiva los meses cerrados, aplica la retención y libera espacio
+    export   Exporta las particiones archivadas a Parquet
+
+Ejemplos:
+    python log_maintenance.py compact --retention-months 12
+    python log_maintenance.py export --output exports/
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from database import DatabaseManager
+from log_partitions import LogPartitionManager
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Particionado, retención y exportación de los logs de acceso.",
+        epilog=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('command', choices=['list', 'compact', 'export'])
+    parser.add_argument('--db', default='access_control.db', help="Base de datos principal")
+    parser.add_argument('--archive-dir', default='log_archive', help="Carpeta de particiones archivadas")
+    parser.add_argument('--retention-months', type=int, default=12,
+                        help="Meses de archivo que se conservan (0 = sin límite)")
+    parser.add_argument('--vacuum-hot', action='store_true',
+                        help="VACUUM completo de la base principal tras archivar")
+    parser.add_argument('--output', default='exports', help="Carpeta de salida para export")
+    parser.add_argument('--overwrite', action='store_true', help="Reescribe exportaciones existentes")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(db_path=args.db)
+    manager = LogPartitionManager(
+        db_manager, archive_dir=args.archive_dir,
+        retention_months=args.retention_months or None
+    )
+
+    if args.command == 'list':
+        partitions = manager.list_partitions()
+        if not partitions:
+            print("No hay particiones archivadas")
+        for year, month, path in partitions:
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"  {year:04d}-{month:02d} | {path} | {size_mb:.1f} MB")
+
+    elif args.command == 'compact':
+        report = manager.compact(vacuum_hot=args.vacuum_hot)
+        if not report['archived']:
+            print("No hay meses cerrados en la base principal")
+        for month, rows in report['archived'].items():
+            print(f"  Archivado {month}: {rows} registro(s)")
+        for path in report['removed']:
+            print(f"  Eliminado por retención: {path}")
+
+    elif args.command == 'export':
+        try:
+            written = manager.export(args.output, overwrite=args.overwrite)
+        except ImportError as e:
+            print(f"La exportación a Parquet requiere pandas y pyarrow: {e}")
+            sys.exit(1)
+        if not written:
+            print("No hay particiones nuevas para exportar")
+        for path in written:
+            print(f"  Exportado: {path}")
+
+    db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
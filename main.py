@@ -1,10 +1,13 @@
+import argparse
 import sys
 import os
+from datetime import datetime, timedelta
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from dotenv import load_dotenv
 load_dotenv()
 
 try:
+    import metrics
     from system_core import FaceAccessControlSystem
 except ImportError as e:
     print(f"Error al importar el módulo central: {e}")
@@ -16,14 +19,33 @@ except ImportError as e:
 
 def main():
     """Función principal con menú interactivo"""
-    # Inicializar sistema
+    parser = argparse.ArgumentParser(description="Sistema de control de acceso facial")
+    parser.add_argument('--preload', action='store_true',
+                        help="Carga el modelo de reconocimiento en segundo plano mientras se muestra el menú")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Activa las métricas y las sirve en http://127.0.0.1:PUERTO/metrics")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Activa las métricas y las escribe periódicamente en este archivo (formato Prometheus)")
+    parser.add_argument('--gallery-file', default=None,
+                        help="Galería cuantizada en archivo, mapeada en memoria y compartida entre procesos")
+    parser.add_argument('--gallery-dtype', choices=('int8', 'float16'), default='int8',
+                        help="Tipo de los vectores de la galería en archivo")
+    args = parser.parse_args()
+
+    if args.metrics_port is not None or args.metrics_file:
+        metrics.configure(port=args.metrics_port, textfile=args.metrics_file)
+
+    # Inicializar sistema (el modelo de reconocimiento se carga al primer uso)
     try:
-        system = FaceAccessControlSystem()
+        system = FaceAccessControlSystem(gallery_file=args.gallery_file, gallery_dtype=args.gallery_dtype)
     except Exception as e:
         print(f"Error al inicializar el sistema: {e}")
         print("Asegúrate de tener instaladas las librerías necesarias (opencv-python, deepface, numpy).")
         return
 
+    if args.preload:
+        system.preload(background=True)
+
     print("\n" + "="*60)
     print("     SISTEMA DE CONTROL DE ACCESO FACIAL")
     print("           Con Reconocimiento IA")
@@ -38,10 +60,12 @@ def main():
         print("3. Ver estadísticas del sistema")
         print("4. Ver usuarios registrados")
         print("5. Consultar asistente IA")
-        print("6. Salir")
+        print("6. Control de acceso multi-cámara")
+        print("7. Consultar registros de acceso")
+        print("8. Salir")
         print("-"*60)
 
-        choice = input("\n> Selecciona una opción (1-6): ").strip()
+        choice = input("\n> Selecciona una opción (1-8): ").strip()
 
         if choice == '1':
             print("\n" + "="*60)
@@ -71,7 +95,8 @@ def main():
             print("\n" + "="*60)
             print("INICIANDO CONTROL DE ACCESO")
             print("="*60)
-            print("El sistema verificará rostros cada 1 segundo aprox.")
+            print("Cada rostro se reconoce al aparecer y se vuelve a verificar si cambia o")
+            print("según su confianza, con un máximo de reconocimientos por segundo.")
             print("Presiona 'q' para detener el sistema")
             input("\n> Presiona Enter para comenzar...")
             system.run_access_control()
@@ -125,19 +150,83 @@ def main():
                     break
 
                 print("\n⏳Procesando la respuesta de la IA...\n")
-                answer = system.ask_ai(question)
-
-                print("IA:", answer)
+                print("IA: ", end="", flush=True)
+                for chunk in system.ask_ai(question, stream=True):
+                    print(chunk, end="", flush=True)
+                print()
                 
         elif choice == '6':
+            print("\n" + "="*60)
+            print("CONTROL DE ACCESO MULTI-CÁMARA")
+            print("="*60)
+            print("Fuentes: índices de cámara (0, 1...), URLs RTSP o archivos de video")
+            sources = input("> Fuentes separadas por comas: ").strip()
+            sources = [source.strip() for source in sources.split(',') if source.strip()]
+            if not sources:
+                print("Debes indicar al menos una fuente")
+                continue
+
+            display = input("> ¿Mostrar ventanas? (s/n): ").strip().lower() != 'n'
+            print("Presiona 'q' en cualquier ventana (o Ctrl+C) para detener el sistema")
+            system.run_multi_camera(sources, display=display)
+
+        elif choice == '7':
+            print("\n" + "="*60)
+            print("CONSULTA DE REGISTROS DE ACCESO")
+            print("="*60)
+            print("Deja cualquier filtro vacío para no aplicarlo (fechas en UTC, formato AAAA-MM-DD)")
+            filters = {}
+            try:
+                start = input("> Desde (fecha): ").strip()
+                if start:
+                    filters['start'] = datetime.strptime(start, '%Y-%m-%d').strftime('%Y-%m-%d %H:%M:%S')
+                end = input("> Hasta (fecha, incluida): ").strip()
+                if end:
+                    end_day = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
+                    filters['end'] = end_day.strftime('%Y-%m-%d %H:%M:%S')
+                user = input("> Usuario: ").strip()
+                if user:
+                    filters['user_name'] = user
+                status = input("> Estado (c=concedidos, d=denegados, Enter=todos): ").strip().lower()
+                if status in ('c', 'd'):
+                    filters['granted'] = status == 'c'
+                min_conf = input("> Confianza mínima (0-1): ").strip()
+                if min_conf:
+                    filters['min_confidence'] = float(min_conf)
+                max_conf = input("> Confianza máxima (0-1): ").strip()
+                if max_conf:
+                    filters['max_confidence'] = float(max_conf)
+            except ValueError as e:
+                print(f"Filtro inválido: {e}")
+                continue
+
+            page_size = 20
+            shown = 0
+            # Incluye también los meses archivados por log_maintenance.py
+            for log_id, _, user_name, timestamp, granted, conf, camera_id in \
+                    system.query_access_logs(page_size=page_size, archive_dir='log_archive', **filters):
+                status = "✅ CONCEDIDO" if granted else "❌ DENEGADO"
+                camera = f" | {camera_id}" if camera_id else ""
+                print(f"  #{log_id} {timestamp} | {user_name:20s} | {status} | Conf: {conf:.2f}{camera}")
+                shown += 1
+                if shown % page_size == 0:
+                    if input("\n> Enter para ver más, 'q' para terminar: ").strip().lower() == 'q':
+                        break
+
+            if shown == 0:
+                print("\nNo hay registros que coincidan con los filtros")
+
+        elif choice == '8':
             print("\n" + "="*60)
             print("Gracias por usar el sistema")
             print("Desarrollado para proyecto de IA")
             print("="*60)
+            system.close()
+            metrics.registry.stop()
             break
 
         else:
-            print("\nOpción inválida. Por favor selecciona 1-6")
+            print("\nOpción inválida. Por favor selecciona 1-8")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+"""
+Migración de los embeddings guardados a la versión de este código
+(embeddings.MODEL_NAME / embeddings.EMBEDDING_VERSION).
+
+Recalcula los embeddings desde las fotos en procesos de baja prioridad y los deja
+aparte, sin tocar los que usa el reconocimiento. Se puede interrumpir (Ctrl+C) y
+reanudar. Cuando están todos, activa la versión nueva en una sola transacción y
+los procesos en marcha (main.py, batch.py...) cambian de modelo solos.
+
+Ejemplos:
+    python reembed.py --status
+    python reembed.py --workers 2 --max-rate 20
+    python reembed.py --no-switch          # solo calcular; activar más tarde
+    python reembed.py --retry-failed
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from database import DatabaseManager
+from reembedding import EmbeddingMigration, print_report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recalcula los embeddings con el modelo o preprocesamiento nuevo.",
+        epilog=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--db', default='access_control.db', help="Base de datos del sistema")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Procesos para calcular embeddings (por defecto, la mitad de las CPUs)")
+    parser.add_argument('--batch-size', type=int, default=32, help="Usuarios por lote")
+    parser.add_argument('--max-rate', type=float, default=None,
+                        help="Máximo de usuarios por segundo (para no competir con el reconocimiento)")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="Reintenta los usuarios que fallaron en ejecuciones anteriores")
+    parser.add_argument('--allow-failures', action='store_true',
+                        help="Activa la versión nueva aunque haya usuarios fallidos "
+                             "(se recalculan al cargar la galería)")
+    parser.add_argument('--no-switch', action='store_true',
+                        help="Solo calcula; no activa la versión nueva")
+    parser.add_argument('--status', action='store_true', help="Muestra el progreso y sale")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No se encuentra: {args.db}")
+        sys.exit(1)
+
+    db_manager = DatabaseManager(db_path=args.db)
+    migration = EmbeddingMigration(
+        db_manager, workers=args.workers, batch_size=args.batch_size, max_rate=args.max_rate,
+        retry_failed=args.retry_failed, allow_failures=args.allow_failures
+    )
+
+    if args.status:
+        print_report({'target': migration.target, 'computed': 0, 'failed': 0, 'failures': [],
+                      'switched': False, 'status': migration.status()})
+        return
+
+    try:
+        report = migration.run(switch=not args.no_switch)
+    except KeyboardInterrupt:
+        print("\nMigración interrumpida: lo calculado queda guardado, vuelve a ejecutar para continuar")
+        sys.exit(1)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
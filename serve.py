@@ -0,0 +1,89 @@
+"""
+Servicio HTTP local de reconocimiento para los controladores de puerta.
+
+Endpoints:
+    POST /recognize   Imagen JPEG/PNG en el cuerpo (?camera_id=puerta1)
+                      o JSON {"image": "<base64>", "camera_id": "puerta1"}
+    POST /enroll      JSON {"name": "...", "email": "...", "image": "<base64>"}
+                      o la imagen en el cuerpo con ?name=...&email=...
+                      Solo desde la propia máquina, salvo con --enroll-token
+                      (cabecera "Authorization: Bearer <token>")
+    GET  /stats       Accesos, galería, tamaño medio de los lotes y latencias
+
+Ejemplos:
+    python serve.py --port 8080
+    python serve.py --host 0.0.0.0 --max-queue-depth 64 --gallery-file gallery.bin
+    python serve.py --host 0.0.0.0 --enroll-token "$ENROLL_TOKEN"
+    curl --data-binary @rostro.jpg -H "Content-Type: image/jpeg" "http://127.0.0.1:8080/recognize?camera_id=puerta1"
+"""
+import argparse
+import sys
+import os
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from dotenv import load_dotenv
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sirve el reconocimiento facial por HTTP (un modelo y una galería compartidos).",
+        epilog=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Dirección de escucha (0.0.0.0 para aceptar conexiones de la red local)")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default='access_control.db', help="Base de datos del sistema")
+    parser.add_argument('--max-queue-depth', type=int, default=32,
+                        help="Peticiones en curso a partir de las cuales se responde 503")
+    parser.add_argument('--max-batch-size', type=int, default=16, help="Máximo de rostros por lote del modelo")
+    parser.add_argument('--max-batch-wait', type=float, default=0.01,
+                        help="Segundos máximos que se espera para completar un lote")
+    parser.add_argument('--no-log', action='store_true', help="No registra los reconocimientos en access_logs")
+    parser.add_argument('--gallery-file', default=None,
+                        help="Galería cuantizada en archivo (compartida con otros procesos del equipo)")
+    parser.add_argument('--enroll-token', default=os.getenv("ENROLL_TOKEN"),
+                        help="Token para POST /enroll desde otras máquinas (por defecto, ENROLL_TOKEN "
+                             "del entorno; sin token solo se acepta desde la propia máquina)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Sirve además las métricas en http://127.0.0.1:PUERTO/metrics")
+    args = parser.parse_args()
+
+    try:
+        import metrics
+        from system_core import FaceAccessControlSystem
+        from http_service import RecognitionHTTPService
+    except ImportError as e:
+        print(f"Error al importar el módulo central: {e}")
+        sys.exit(1)
+
+    # Las latencias por etapa aparecen en /stats
+    metrics.configure(port=args.metrics_port)
+
+    system = FaceAccessControlSystem(
+        db_path=args.db, gallery_file=args.gallery_file,
+        max_batch_size=args.max_batch_size, max_batch_wait=args.max_batch_wait
+    )
+    print("Cargando el modelo y la galería...")
+    system.preload(background=False)
+
+    service = RecognitionHTTPService(
+        system, host=args.host, port=args.port,
+        max_queue_depth=args.max_queue_depth, log_access=not args.no_log,
+        enroll_token=args.enroll_token
+    )
+    port = service.start()
+    print(f"Servicio de reconocimiento en http://{args.host}:{port} "
+          f"({len(system.gallery)} usuarios; Ctrl+C para salir)")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\nDeteniendo el servicio...")
+    finally:
+        service.stop()
+        system.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,103 +1,230 @@
-from groq import Groq
 import os
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 load_dotenv()
 
+from log_partitions import recent_archived_logs
+
+class ResponseCache:
+    """Caché LRU con expiración (TTL) para respuestas del asistente."""
+
+    def __init__(self, max_size=64, ttl=300):
+        """
+        Args:
+            max_size: Número máximo de respuestas guardadas
+            ttl: Segundos de validez de cada respuesta
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if time.monotonic() > expires:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
 class IAAssistant:
     """Asistente IA para consultas sobre el sistema de control de acceso"""
     
-    def __init__(self, db_path='access_control.db'):
+    def __init__(self, db_path='access_control.db', max_context_tokens=600, top_users=10,
+                 client=None, model=None, cache_size=64, cache_ttl=300, archive_dir='log_archive'):
         """
         Inicializa el asistente con Groq
         Args:
             db_path: Ruta a la base de datos del sistema
+            max_context_tokens: Presupuesto aproximado de tokens para el contexto de la BD
+            top_users: Número de usuarios más activos que se incluyen en el contexto
+            client: Cliente compatible con Groq ya creado (p. ej. apuntando a un servidor local)
+            model: Modelo de lenguaje a usar
+            cache_size: Respuestas guardadas en la caché LRU (0 = sin caché)
+            cache_ttl: Segundos de validez de una respuesta en caché
+            archive_dir: Particiones archivadas de los logs (completan los últimos accesos)
         """
         self.db_path = db_path
+        self.max_context_tokens = max_context_tokens
+        self.top_users = top_users
+        self.archive_dir = archive_dir
+        
+        # Caché del contexto: se invalida cuando cambia la base de datos
+        self._conn = None
+        self._context_key = None
+        self._context = None
         
-        # Obtener API key de Groq desde variables de entorno
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("No existe GROQ_API_KEY en el entorno. Configúrala con: $env:GROQ_API_KEY='tu-key'")
-        self.client = Groq(api_key=api_key)
-        self.model = "llama-3.3-70b-versatile" 
+        # Caché de respuestas por (pregunta, versión del contexto)
+        self.response_cache = ResponseCache(max_size=cache_size, ttl=cache_ttl)
+        
+        if client is None:
+            # Obtener API key de Groq desde variables de entorno
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("No existe GROQ_API_KEY en el entorno. Configúrala con: $env:GROQ_API_KEY='tu-key'")
+            from groq import Groq  # Se importa al usar el asistente, no al arrancar
+            client = Groq(api_key=api_key)
+        self.client = client
+        self.model = model or "llama-3.3-70b-versatile" 
         print(f"Asistente IA inicializado con modelo: {self.model}")
     
+    def _get_connection(self):
+        """Conexión persistente de solo lectura a la base de datos del sistema."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                f"file:{os.path.abspath(self.db_path)}?mode=ro", uri=True, check_same_thread=False
+            )
+        return self._conn
+
+    @staticmethod
+    def _estimate_tokens(text):
+        """Estimación aproximada (~4 caracteres por token)."""
+        return len(text) // 4 + 1
+
     def get_context_from_db(self):
         """
-        Extrae información relevante de la base de datos para dar contexto a la IA
+        Extrae información relevante de la base de datos para dar contexto a la IA.
+        El resultado se guarda en caché y solo se recalcula cuando otra conexión
+        modifica la base de datos (PRAGMA data_version) o cambia el día.
         Returns:
             String con información del sistema
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            context_parts = []
-            cursor.execute('SELECT COUNT(*) FROM users')
-            user_count = cursor.fetchone()[0]
-            context_parts.append(f"Usuarios registrados: {user_count}")
-            
-            # 2. Total de intentos de acceso
-            cursor.execute('SELECT COUNT(*) FROM access_logs')
-            log_count = cursor.fetchone()[0]
-            context_parts.append(f"Total de intentos de acceso: {log_count}")
+            cursor = self._get_connection().cursor()
+            cursor.execute('PRAGMA data_version')
+            data_version = cursor.fetchone()[0]
+            cursor.execute("SELECT DATE('now')")
+            key = (data_version, cursor.fetchone()[0])
             
-            # 3. Accesos de hoy
-            cursor.execute('''
-                SELECT COUNT(*), SUM(access_granted) 
-                FROM access_logs 
-                WHERE DATE(timestamp) = DATE('now')
-            ''')
-            result = cursor.fetchone()
-            if result[0]:
-                today_total = result[0]
-                today_granted = result[1] or 0
-                today_denied = today_total - today_granted
-                context_parts.append(
-                    f"Accesos hoy: {today_total} intentos "
-                    f"({today_granted} concedidos, {today_denied} ; denegados)"
-                )
-            
-            # 4. Últimos 5 accesos
-            cursor.execute('''
-                SELECT user_name, access_granted, confidence, timestamp 
-                FROM access_logs 
-                ORDER BY timestamp DESC 
-                LIMIT 5
-            ''')
-            recent_logs = cursor.fetchall()
-            if recent_logs:
-                context_parts.append("\n📋 Últimos 5 accesos:")
-                for user, granted, conf, ts in recent_logs:
-                    status = "✅" if granted else "❌"
-                    context_parts.append(f"  {status} {ts}: {user} (confianza: {conf:.2f})")
-            
-            # 5. Lista de usuarios (nombres)
-            cursor.execute('SELECT name FROM users ORDER BY name')
-            users = cursor.fetchall()
-            if users:
-                user_names = ", ".join([u[0] for u in users])
-                context_parts.append(f"\n👤 Usuarios: {user_names}")
-            
-            conn.close()
-            
-            return "\n".join(context_parts)
+            if key != self._context_key:
+                self._context = self._build_context(cursor)
+                self._context_key = key
+            return self._context
         
         except Exception as e:
+            self._conn = None
+            self._context_key = None
             return f"Error al obtener datos: {str(e)}"
-    
-    def chat(self, message: str):
+
+    def _build_context(self, cursor):
         """
-        Procesa un mensaje del usuario y genera respuesta usando Groq
-        Args:
-            message: Pregunta o mensaje del usuario
-        Returns:
-            Respuesta del asistente IA
+        Construye un resumen acotado del sistema a partir de las tablas de resumen.
+        Las secciones se agregan por prioridad hasta agotar el presupuesto de tokens.
         """
-        try:
-            db_context = self.get_context_from_db()
-            system_prompt = f"""Eres un asistente inteligente para un sistema de control de acceso con reconocimiento facial.
+        sections = []
+        
+        # 1-2. Contadores globales (resumen incremental, sin recorrer access_logs)
+        cursor.execute('SELECT total_users, total_attempts, granted, denied FROM access_stats WHERE id = 1')
+        user_count, log_count, granted, denied = cursor.fetchone()
+        sections.append([
+            f"Usuarios registrados: {user_count}",
+            f"Total de intentos de acceso: {log_count} ({granted} concedidos, {denied} denegados)"
+        ])
+        
+        # 3. Accesos de hoy y de los últimos días (resumen diario)
+        cursor.execute('''
+            SELECT day, total, granted 
+            FROM access_daily 
+            WHERE day > DATE('now', '-7 days') 
+            ORDER BY day DESC
+        ''')
+        days = cursor.fetchall()
+        cursor.execute("SELECT DATE('now')")
+        today_date = cursor.fetchone()[0]
+        today = next((row for row in days if row[0] == today_date), None)
+        if today:
+            _, today_total, today_granted = today
+            today_granted = today_granted or 0
+            today_denied = today_total - today_granted
+            sections.append([
+                f"Accesos hoy: {today_total} intentos "
+                f"({today_granted} concedidos, {today_denied} ; denegados)"
+            ])
+        if days:
+            lines = ["\n📅 Últimos 7 días:"]
+            for day, total, day_granted in days:
+                lines.append(f"  {day}: {total} intentos, {day_granted or 0} concedidos")
+            sections.append(lines)
+        
+        # 4. Últimos 5 accesos
+        cursor.execute('''
+            SELECT user_name, access_granted, confidence, timestamp 
+            FROM access_logs 
+            ORDER BY timestamp DESC, id DESC 
+            LIMIT 5
+        ''')
+        recent_logs = cursor.fetchall()
+        if len(recent_logs) < 5 and self.archive_dir:
+            # A principio de mes, tras compactar, el resto está en los meses archivados
+            recent_logs += recent_archived_logs(self.archive_dir, 5 - len(recent_logs))
+        if recent_logs:
+            lines = ["\n📋 Últimos 5 accesos:"]
+            for user, log_granted, conf, ts in recent_logs:
+                status = "✅" if log_granted else "❌"
+                lines.append(f"  {status} {ts}: {user} (confianza: {conf:.2f})")
+            sections.append(lines)
+        
+        # 5. Usuarios más activos (en lugar de la lista completa de nombres)
+        cursor.execute('''
+            SELECT user_name, total, granted, last_seen 
+            FROM access_user_stats 
+            WHERE user_id IS NOT NULL 
+            ORDER BY total DESC 
+            LIMIT ?
+        ''', (self.top_users,))
+        active_users = cursor.fetchall()
+        if active_users:
+            lines = [f"\n👤 Usuarios más activos (top {len(active_users)}):"]
+            for name, total, user_granted, last_seen in active_users:
+                lines.append(f"  {name}: {total} intentos, {user_granted} concedidos, último: {last_seen}")
+            sections.append(lines)
+        
+        # 6. Con pocos usuarios, la lista completa de nombres
+        if user_count <= self.top_users:
+            cursor.execute('SELECT name FROM users ORDER BY name')
+            names = [row[0] for row in cursor.fetchall()]
+            if names:
+                sections.append([f"\n👤 Usuarios: {', '.join(names)}"])
+        
+        # Agregar secciones (y líneas) mientras quepan en el presupuesto
+        context_parts = []
+        budget = self.max_context_tokens
+        for lines in sections:
+            for line in lines:
+                cost = self._estimate_tokens(line)
+                if cost > budget:
+                    context_parts.append("  … (resumen truncado)")
+                    return "\n".join(context_parts)
+                context_parts.append(line)
+                budget -= cost
+        
+        return "\n".join(context_parts)
+    
+    def _build_messages(self, message):
+        """Construye los mensajes (prompt de sistema con el contexto + pregunta)."""
+        db_context = self.get_context_from_db()
+        system_prompt = f"""Eres un asistente inteligente para un sistema de control de acceso con reconocimiento facial.
 
 INFORMACIÓN ACTUAL DEL SISTEMA:
 {db_context}
@@ -118,28 +245,94 @@ SOBRE EL SISTEMA:
 - Registra todos los intentos con timestamp, usuario y nivel de confianza
 
 Responde de manera concisa (máximo 3-4 párrafos) a menos que se pida más detalle."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": message}
+        ]
+
+    def _cache_key(self, message):
+        # _context_key cambia cuando cambian los datos, así que invalida las respuestas
+        return (" ".join(message.lower().split()), self._context_key)
+
+    @staticmethod
+    def _format_error(e):
+        error_msg = str(e)
+        
+        if "model_decommissioned" in error_msg:
+            return "El modelo está descontinuado. Por favor actualiza el código con un modelo compatible."
+        elif "api_key" in error_msg.lower():
+            return "Error de autenticación. Verifica tu GROQ_API_KEY."
+        elif "rate_limit" in error_msg.lower():
+            return "Límite de solicitudes alcanzado. Espera un momento e intenta de nuevo."
+        else:
+            return f"Error al consultar IA: {error_msg}"
+
+    def chat(self, message: str):
+        """
+        Procesa un mensaje del usuario y genera respuesta usando Groq
+        Args:
+            message: Pregunta o mensaje del usuario
+        Returns:
+            Respuesta del asistente IA
+        """
+        try:
+            messages = self._build_messages(message)
+            key = self._cache_key(message)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
             
             response = self.client.chat.completions.create(
                 model=self.model,  
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ],
+                messages=messages,
                 temperature=0.7, 
                 max_tokens=1024,  
                 top_p=1
             )
             
-            return response.choices[0].message.content
+            answer = response.choices[0].message.content
+            self.response_cache.put(key, answer)
+            return answer
         
         except Exception as e:
-            error_msg = str(e)
+            return self._format_error(e)
+
+    def chat_stream(self, message: str):
+        """
+        Igual que chat(), pero devuelve la respuesta por fragmentos a medida que llega.
+        Args:
+            message: Pregunta o mensaje del usuario
+        Yields:
+            Fragmentos de texto de la respuesta
+        """
+        try:
+            messages = self._build_messages(message)
+            key = self._cache_key(message)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
             
-            if "model_decommissioned" in error_msg:
-                return "El modelo está descontinuado. Por favor actualiza el código con un modelo compatible."
-            elif "api_key" in error_msg.lower():
-                return "Error de autenticación. Verifica tu GROQ_API_KEY."
-            elif "rate_limit" in error_msg.lower():
-                return "Límite de solicitudes alcanzado. Espera un momento e intenta de nuevo."
-            else:
-                return f"Error al consultar IA: {error_msg}"
+            stream = self.client.chat.completions.create(
+                model=self.model,  
+                messages=messages,
+                temperature=0.7, 
+                max_tokens=1024,  
+                top_p=1,
+                stream=True
+            )
+            
+            parts = []
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    parts.append(content)
+                    yield content
+            
+            self.response_cache.put(key, "".join(parts))
+        
+        except Exception as e:
+            yield self._format_error(e)
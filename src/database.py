@@ -1,16 +1,178 @@
+import atexit
+import os
+import queue
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
+
+import metrics
+
+
+class AccessLogWriter:
+    """
+    Escritura diferida (write-behind) de los logs de acceso.
+    log_access solo encola la entrada; un hilo de fondo la escribe junto con
+    otras en una única transacción cuando se junta un lote o vence el intervalo.
+    """
+
+    def __init__(self, db_manager, batch_size=100, flush_interval=0.5):
+        """
+        Args:
+            db_manager: DatabaseManager dueño de la conexión
+            batch_size: Entradas por transacción
+            flush_interval: Segundos máximos que una entrada espera en la cola
+        """
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    def put(self, entry):
+        if self._closed:
+            # Tras el cierre se escribe directamente para no perder registros
+            self.db_manager._write_access_logs([entry])
+        else:
+            self._queue.put(entry)
+
+    def flush(self, timeout=None):
+        """Bloquea hasta que todo lo encolado antes de la llamada esté escrito."""
+        if self._closed or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """Escribe lo pendiente y detiene el hilo."""
+        if self._closed:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._closed = True
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Venció el intervalo
+
+            if isinstance(item, tuple):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            # Lote lleno, intervalo vencido, petición de flush o cierre
+            if batch:
+                try:
+                    self.db_manager._write_access_logs(batch)
+                except sqlite3.Error as e:
+                    print(f"Error al guardar logs de acceso: {e}")
+                batch = []
+            deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
 
 class DatabaseManager:
     """Gestiona la conexión y las operaciones de la base de datos SQLite."""
     
-    def __init__(self, db_path='access_control.db'):
+    def __init__(self, db_path='access_control.db', log_batch_size=100, log_flush_interval=0.5):
+        """
+        Args:
+            db_path: Ruta de la base de datos
+            log_batch_size: Logs de acceso por transacción (escritura diferida)
+            log_flush_interval: Segundos máximos antes de escribir los logs pendientes
+        """
         self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Conexión propia para detectar cambios de otras conexiones (PRAGMA data_version)
+        self._watch_conn = None
+        self._watch_lock = threading.Lock()
+        self._data_version = None
         self._init_database()
+        self._log_writer = AccessLogWriter(
+            self, batch_size=log_batch_size, flush_interval=log_flush_interval
+        )
+        atexit.register(self.close)
 
     def _get_connection(self):
-        """Retorna una conexión a la base de datos."""
-        return sqlite3.connect(self.db_path)
+        """
+        Retorna la conexión persistente del hilo actual (una por hilo),
+        en modo WAL para que las lecturas no bloqueen a las escrituras.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            # Permite liberar espacio de forma incremental tras archivar logs
+            # (solo tiene efecto en bases nuevas; en las existentes se aplica con VACUUM)
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA cache_size=-16000')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def release_thread_connection(self):
+        """
+        Cierra la conexión del hilo actual. Para hilos de vida corta (uno por
+        petición en el servicio HTTP): sin esto, cada hilo deja una conexión
+        abierta hasta close().
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._connections_lock:
+            try:
+                self._connections.remove(conn)
+            except ValueError:
+                pass
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def flush(self, timeout=None):
+        """Escribe en disco los logs de acceso pendientes."""
+        self._log_writer.flush(timeout)
+
+    def close(self):
+        """Escribe lo pendiente y cierra todas las conexiones."""
+        self._log_writer.close()
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections = []
+        self._local = threading.local()
+        with self._watch_lock:
+            if self._watch_conn is not None:
+                try:
+                    self._watch_conn.close()
+                except sqlite3.Error:
+                    pass
+                self._watch_conn = None
+                self._data_version = None
 
     def _init_database(self):
         """Crea las tablas necesarias en la base de datos."""
@@ -24,10 +186,24 @@ class DatabaseManager:
                 name TEXT NOT NULL UNIQUE,
                 email TEXT,
                 photo_path TEXT NOT NULL,
-                registered_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                registered_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                embedding BLOB,
+                embedding_model TEXT,
+                embedding_dim INTEGER,
+                embedding_version INTEGER,
+                generation INTEGER
             )
         ''')
         
+        # Migración: bases de datos creadas antes de guardar embeddings
+        self._ensure_columns(cursor, 'users', {
+            'embedding': 'BLOB',
+            'embedding_model': 'TEXT',
+            'embedding_dim': 'INTEGER',
+            'embedding_version': 'INTEGER',
+            'generation': 'INTEGER'
+        })
+        
         # Tabla de logs de acceso
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS access_logs (
@@ -37,13 +213,231 @@ class DatabaseManager:
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 access_granted BOOLEAN,
                 confidence REAL,
+                camera_id TEXT,
                 FOREIGN KEY (user_id) REFERENCES users(id)
             )
         ''')
+        self._ensure_columns(cursor, 'access_logs', {'camera_id': 'TEXT'})
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_access_logs_timestamp ON access_logs(timestamp)')
+        # Índices para las consultas filtradas (el rowid/id va incluido en cada índice)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_access_logs_user_name_time 
+            ON access_logs(user_name, timestamp)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_access_logs_user_id_time 
+            ON access_logs(user_id, timestamp)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_access_logs_granted_time 
+            ON access_logs(access_granted, timestamp, confidence)
+        ''')
+        
+        self._init_rollups(cursor)
+        self._init_generations(cursor)
+        self._init_embedding_spec(cursor)
         
         conn.commit()
-        conn.close()
         print("Base de datos inicializada")
+
+    def _init_rollups(self, cursor):
+        """
+        Crea los resúmenes que se mantienen de forma incremental (con triggers)
+        para no recorrer access_logs en cada consulta de estadísticas.
+        """
+        # Contadores globales (una sola fila)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS access_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_attempts INTEGER NOT NULL DEFAULT 0,
+                granted INTEGER NOT NULL DEFAULT 0,
+                denied INTEGER NOT NULL DEFAULT 0,
+                total_users INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Resumen por día
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS access_daily (
+                day TEXT PRIMARY KEY,
+                total INTEGER NOT NULL DEFAULT 0,
+                granted INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Resumen por usuario
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS access_user_stats (
+                user_name TEXT PRIMARY KEY,
+                user_id INTEGER,
+                total INTEGER NOT NULL DEFAULT 0,
+                granted INTEGER NOT NULL DEFAULT 0,
+                last_seen TIMESTAMP
+            )
+        ''')
+        
+        # Primera vez: se calculan los resúmenes a partir de los datos existentes
+        cursor.execute('SELECT COUNT(*) FROM access_stats')
+        if cursor.fetchone()[0] == 0:
+            cursor.execute('''
+                INSERT INTO access_stats (id, total_attempts, granted, denied, total_users)
+                SELECT 1,
+                       (SELECT COUNT(*) FROM access_logs),
+                       (SELECT COUNT(*) FROM access_logs WHERE access_granted = 1),
+                       (SELECT COUNT(*) FROM access_logs WHERE access_granted = 0),
+                       (SELECT COUNT(*) FROM users)
+            ''')
+            cursor.execute('DELETE FROM access_daily')
+            cursor.execute('''
+                INSERT INTO access_daily (day, total, granted)
+                SELECT DATE(timestamp), COUNT(*), SUM(access_granted = 1)
+                FROM access_logs GROUP BY DATE(timestamp)
+            ''')
+            cursor.execute('DELETE FROM access_user_stats')
+            cursor.execute('''
+                INSERT INTO access_user_stats (user_name, user_id, total, granted, last_seen)
+                SELECT user_name, MAX(user_id), COUNT(*), SUM(access_granted = 1), MAX(timestamp)
+                FROM access_logs GROUP BY user_name
+            ''')
+        
+        # Mantenimiento incremental
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_access_logs_rollup
+            AFTER INSERT ON access_logs
+            BEGIN
+                UPDATE access_stats SET
+                    total_attempts = total_attempts + 1,
+                    granted = granted + (NEW.access_granted = 1),
+                    denied = denied + (NEW.access_granted = 0)
+                WHERE id = 1;
+                INSERT INTO access_daily (day, total, granted)
+                VALUES (DATE(NEW.timestamp), 1, NEW.access_granted = 1)
+                ON CONFLICT(day) DO UPDATE SET
+                    total = total + 1,
+                    granted = granted + excluded.granted;
+                INSERT INTO access_user_stats (user_name, user_id, total, granted, last_seen)
+                VALUES (NEW.user_name, NEW.user_id, 1, NEW.access_granted = 1, NEW.timestamp)
+                ON CONFLICT(user_name) DO UPDATE SET
+                    user_id = COALESCE(excluded.user_id, user_id),
+                    total = total + 1,
+                    granted = granted + excluded.granted,
+                    last_seen = MAX(COALESCE(last_seen, ''), excluded.last_seen);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_users_insert_rollup
+            AFTER INSERT ON users
+            BEGIN
+                UPDATE access_stats SET total_users = total_users + 1 WHERE id = 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_users_delete_rollup
+            AFTER DELETE ON users
+            BEGIN
+                UPDATE access_stats SET total_users = total_users - 1 WHERE id = 1;
+            END
+        ''')
+
+    def _init_generations(self, cursor):
+        """
+        Contador de generación de la tabla users, mantenido con triggers.
+        Cada alta, cambio de nombre/embedding o baja lo incrementa y deja la nueva
+        generación en la fila (o en users_deleted), de modo que cualquier proceso
+        puede cargar solo lo que cambió desde la generación que ya tiene.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users_generation (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generation INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO users_generation (id, generation) VALUES (1, 0)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users_deleted (
+                user_id INTEGER PRIMARY KEY,
+                generation INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_generation ON users(generation)')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_users_insert_generation
+            AFTER INSERT ON users
+            BEGIN
+                UPDATE users_generation SET generation = generation + 1 WHERE id = 1;
+                UPDATE users SET generation = (SELECT generation FROM users_generation WHERE id = 1)
+                WHERE id = NEW.id;
+            END
+        ''')
+        # Solo las columnas que usa el reconocimiento (así no se dispara con su propio UPDATE)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_users_update_generation
+            AFTER UPDATE OF name, embedding, embedding_model, embedding_dim, embedding_version ON users
+            BEGIN
+                UPDATE users_generation SET generation = generation + 1 WHERE id = 1;
+                UPDATE users SET generation = (SELECT generation FROM users_generation WHERE id = 1)
+                WHERE id = NEW.id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_users_delete_generation
+            AFTER DELETE ON users
+            BEGIN
+                UPDATE users_generation SET generation = generation + 1 WHERE id = 1;
+                INSERT OR REPLACE INTO users_deleted (user_id, generation)
+                VALUES (OLD.id, (SELECT generation FROM users_generation WHERE id = 1));
+            END
+        ''')
+
+    def _init_embedding_spec(self, cursor):
+        """
+        Versión de embeddings activa (la que usa el reconocimiento) y tabla de
+        embeddings pendientes donde la migración deja los de la versión nueva
+        hasta que se activan todos juntos.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS embedding_spec (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                model_name TEXT NOT NULL,
+                version INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pending_embeddings (
+                user_id INTEGER PRIMARY KEY,
+                embedding BLOB,
+                embedding_model TEXT NOT NULL,
+                embedding_dim INTEGER,
+                embedding_version INTEGER NOT NULL,
+                error TEXT,
+                computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        cursor.execute('SELECT COUNT(*) FROM embedding_spec')
+        if cursor.fetchone()[0] == 0:
+            # Primera vez: la versión activa es la de la mayoría de los embeddings guardados
+            # (o la de este código si todavía no hay ninguno)
+            cursor.execute('''
+                SELECT embedding_model, embedding_version FROM users
+                WHERE embedding IS NOT NULL AND embedding_model IS NOT NULL
+                GROUP BY embedding_model, embedding_version
+                ORDER BY COUNT(*) DESC LIMIT 1
+            ''')
+            row = cursor.fetchone()
+            if row is None:
+                import embeddings
+                row = embeddings.target_spec()
+            cursor.execute('INSERT INTO embedding_spec (id, model_name, version) VALUES (1, ?, ?)', row)
+
+    def _ensure_columns(self, cursor, table, columns):
+        """Agrega a la tabla las columnas que falten."""
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in columns.items():
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
         
     # --- Operaciones de Usuario ---
 
@@ -52,85 +446,432 @@ class DatabaseManager:
         cursor = conn.cursor()
         cursor.execute('SELECT id, name, photo_path FROM users WHERE name = ?', (name,))
         user = cursor.fetchone()
-        conn.close()
         return user
 
     def get_all_users_for_recognition(self):
-        """Obtiene ID, nombre y ruta de foto para reconocimiento."""
+        """Obtiene ID, nombre, ruta de foto y embedding guardado para reconocimiento."""
         conn = self._get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT id, name, photo_path FROM users')
+        cursor.execute('''
+            SELECT id, name, photo_path, embedding, embedding_model,
+                   embedding_dim, embedding_version
+            FROM users
+        ''')
         users = cursor.fetchall()
-        conn.close()
         return users
 
+    def users_changed(self):
+        """
+        Indica si otra conexión (de este u otro proceso) confirmó cambios en la base
+        desde la llamada anterior. Usa PRAGMA data_version: no lee ninguna tabla.
+        La primera llamada devuelve True.
+        """
+        with self._watch_lock:
+            if self._watch_conn is None:
+                self._watch_conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            data_version = self._watch_conn.execute('PRAGMA data_version').fetchone()[0]
+            changed = data_version != self._data_version
+            self._data_version = data_version
+            return changed
+
+    def get_users_generation(self):
+        """Generación actual de la tabla users (aumenta con cada alta, cambio o baja)."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT generation FROM users_generation WHERE id = 1')
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def get_user_generation(self, user_id):
+        """Generación del último alta o cambio del usuario (None si no existe)."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT generation FROM users WHERE id = ?', (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def get_users_changed_since(self, generation):
+        """Usuarios dados de alta o modificados después de la generación dada (mismas columnas que get_all_users_for_recognition)."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, name, photo_path, embedding, embedding_model,
+                   embedding_dim, embedding_version
+            FROM users WHERE generation > ?
+        ''', (generation,))
+        return cursor.fetchall()
+
+    def get_users_deleted_since(self, generation):
+        """IDs de los usuarios eliminados después de la generación dada."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT user_id FROM users_deleted WHERE generation > ?', (generation,))
+        return [row[0] for row in cursor.fetchall()]
+
+    # --- Versiones de embeddings ---
+
+    def get_active_embedding_spec(self):
+        """(modelo, versión) de los embeddings que usa el reconocimiento."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT model_name, version FROM embedding_spec WHERE id = 1')
+        return tuple(cursor.fetchone())
+
+    def get_users_to_reembed(self, embedding_model, embedding_version, limit=100):
+        """
+        Usuarios sin embedding de la versión dada que todavía no tienen uno pendiente
+        (ni un fallo registrado). Returns: lista de (id, name, photo_path)
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, name, photo_path FROM users u
+            WHERE NOT (u.embedding IS NOT NULL AND u.embedding_model IS ? AND u.embedding_version IS ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM pending_embeddings p
+                  WHERE p.user_id = u.id AND p.embedding_model = ? AND p.embedding_version = ?
+              )
+            ORDER BY id LIMIT ?
+        ''', (embedding_model, embedding_version, embedding_model, embedding_version, limit))
+        return cursor.fetchall()
+
+    def save_pending_embeddings(self, rows):
+        """
+        Guarda embeddings calculados para la versión nueva (sin activarlos).
+        Args:
+            rows: Lista de tuplas (user_id, embedding, embedding_model, embedding_dim,
+                  embedding_version, error); embedding es None si falló
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.executemany(
+            '''INSERT OR REPLACE INTO pending_embeddings 
+               (user_id, embedding, embedding_model, embedding_dim, embedding_version, error) 
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            rows
+        )
+        conn.commit()
+
+    def clear_pending_embeddings(self, embedding_model, embedding_version, failed_only=False):
+        """
+        Descarta pendientes que no sirven: los de otras versiones y, con
+        failed_only, los fallidos de la versión dada (para reintentarlos).
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        if failed_only:
+            cursor.execute(
+                '''DELETE FROM pending_embeddings 
+                   WHERE embedding IS NULL AND embedding_model = ? AND embedding_version = ?''',
+                (embedding_model, embedding_version)
+            )
+        else:
+            cursor.execute(
+                '''DELETE FROM pending_embeddings 
+                   WHERE embedding_model != ? OR embedding_version != ?
+                      OR user_id NOT IN (SELECT id FROM users)''',
+                (embedding_model, embedding_version)
+            )
+        removed = cursor.rowcount
+        conn.commit()
+        return removed
+
+    def _count_reembedding(self, cursor, embedding_model, embedding_version):
+        cursor.execute('''
+            SELECT (SELECT COUNT(*) FROM users),
+                   (SELECT COUNT(*) FROM users
+                    WHERE embedding IS NOT NULL AND embedding_model IS ? AND embedding_version IS ?),
+                   (SELECT COUNT(*) FROM pending_embeddings p JOIN users u ON u.id = p.user_id
+                    WHERE p.embedding IS NOT NULL AND p.embedding_model = ? AND p.embedding_version = ?),
+                   (SELECT COUNT(*) FROM pending_embeddings p JOIN users u ON u.id = p.user_id
+                    WHERE p.embedding IS NULL AND p.embedding_model = ? AND p.embedding_version = ?),
+                   (SELECT COUNT(*) FROM users u
+                    WHERE NOT (u.embedding IS NOT NULL AND u.embedding_model IS ? AND u.embedding_version IS ?)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM pending_embeddings p
+                          WHERE p.user_id = u.id AND p.embedding_model = ? AND p.embedding_version = ?
+                      ))
+        ''', (embedding_model, embedding_version) * 5)
+        total, current, pending, failed, remaining = cursor.fetchone()
+        return {'total': total, 'current': current, 'pending': pending, 'failed': failed,
+                'remaining': remaining}
+
+    def get_reembedding_status(self, embedding_model, embedding_version):
+        """Progreso de la migración a la versión dada: {total, current, pending, failed, remaining}."""
+        conn = self._get_connection()
+        return self._count_reembedding(conn.cursor(), embedding_model, embedding_version)
+
+    def switch_embedding_spec(self, embedding_model, embedding_version, allow_failures=False):
+        """
+        Activa la versión nueva de forma atómica: en una sola transacción copia los
+        embeddings pendientes a users, cambia la versión activa y vacía los pendientes.
+        Los procesos que reconocen ven o todo lo anterior o todo lo nuevo.
+        Args:
+            allow_failures: Activa aunque haya usuarios cuyo embedding no se pudo calcular
+                            (quedan fuera del reconocimiento hasta recalcularlos)
+        Returns:
+            Estado de la migración con 'switched' (bool) y 'updated' (usuarios actualizados)
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            status = self._count_reembedding(cursor, embedding_model, embedding_version)
+            status['updated'] = 0
+            status['switched'] = False
+            if status['remaining'] or (status['failed'] and not allow_failures):
+                conn.rollback()
+                return status
+            
+            cursor.execute('''
+                UPDATE users SET 
+                    embedding = (SELECT p.embedding FROM pending_embeddings p WHERE p.user_id = users.id),
+                    embedding_dim = (SELECT p.embedding_dim FROM pending_embeddings p WHERE p.user_id = users.id),
+                    embedding_model = ?,
+                    embedding_version = ?
+                WHERE id IN (
+                    SELECT user_id FROM pending_embeddings 
+                    WHERE embedding IS NOT NULL AND embedding_model = ? AND embedding_version = ?
+                )
+            ''', (embedding_model, embedding_version, embedding_model, embedding_version))
+            status['updated'] = cursor.rowcount
+            cursor.execute(
+                'UPDATE embedding_spec SET model_name = ?, version = ? WHERE id = 1',
+                (embedding_model, embedding_version)
+            )
+            # Aunque no cambie ningún usuario, los procesos deben enterarse del cambio de versión
+            cursor.execute('UPDATE users_generation SET generation = generation + 1 WHERE id = 1')
+            cursor.execute('DELETE FROM pending_embeddings')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        status['switched'] = True
+        return status
+
     def get_all_users_info(self):
         """Obtiene todos los detalles de los usuarios."""
         conn = self._get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT id, name, email, registered_date FROM users ORDER BY name')
         users = cursor.fetchall()
-        conn.close()
         return users
 
-    def add_user(self, name, email, photo_path):
+    def add_user(self, name, email, photo_path, embedding=None, embedding_model=None,
+                 embedding_dim=None, embedding_version=None):
         conn = self._get_connection()
         cursor = conn.cursor()
         cursor.execute(
-            'INSERT INTO users (name, email, photo_path) VALUES (?, ?, ?)',
-            (name, email, photo_path)
+            '''INSERT INTO users 
+               (name, email, photo_path, embedding, embedding_model, 
+                embedding_dim, embedding_version) 
+               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (name, email, photo_path, embedding, embedding_model,
+             embedding_dim, embedding_version)
         )
         conn.commit()
         user_id = cursor.lastrowid
-        conn.close()
         return user_id
 
-    # --- Operaciones de Logs ---
-    
-    def log_access(self, user_id, user_name, granted, confidence):
-        """Registra un intento de acceso."""
+    def get_all_user_names(self):
+        """Devuelve el conjunto de nombres ya registrados."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT name FROM users')
+        names = {row[0] for row in cursor.fetchall()}
+        return names
+
+    def add_users_batch(self, users):
+        """
+        Inserta varios usuarios en una sola transacción.
+        Args:
+            users: Lista de tuplas (name, email, photo_path, embedding,
+                   embedding_model, embedding_dim, embedding_version)
+        Returns:
+            Nombres insertados (los repetidos, también los que otro proceso
+            registró mientras tanto, se omiten)
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        inserted = []
+        with conn:
+            for user in users:
+                cursor.execute(
+                    '''INSERT OR IGNORE INTO users 
+                       (name, email, photo_path, embedding, embedding_model, 
+                        embedding_dim, embedding_version) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                    user
+                )
+                # rowcount no incluye las filas que modifican los triggers de estadísticas
+                if cursor.rowcount > 0:
+                    inserted.append(user[0])
+        return inserted
+
+    def update_user_embedding(self, user_id, embedding, embedding_model,
+                              embedding_dim, embedding_version):
+        """Guarda (o reemplaza) el embedding de un usuario existente."""
         conn = self._get_connection()
         cursor = conn.cursor()
         cursor.execute(
-            '''INSERT INTO access_logs 
-               (user_id, user_name, access_granted, confidence) 
-               VALUES (?, ?, ?, ?)''',
-            (user_id, user_name, granted, confidence)
+            '''UPDATE users 
+               SET embedding = ?, embedding_model = ?, embedding_dim = ?, embedding_version = ?
+               WHERE id = ?''',
+            (embedding, embedding_model, embedding_dim, embedding_version, user_id)
         )
         conn.commit()
-        conn.close()
 
-    def get_access_statistics(self):
-        """Obtiene estadísticas generales y logs recientes."""
+    # --- Operaciones de Logs ---
+    
+    def log_access(self, user_id, user_name, granted, confidence, camera_id=None):
+        """
+        Registra un intento de acceso (opcionalmente con la cámara que lo originó).
+        La escritura es diferida: se encola y se guarda en lote en segundo plano.
+        """
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        self._log_writer.put((user_id, user_name, timestamp, granted, confidence, camera_id))
+
+    def _write_access_logs(self, entries):
+        """Inserta un lote de logs de acceso en una sola transacción."""
         conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        # Total de intentos
-        cursor.execute('SELECT COUNT(*) FROM access_logs')
-        total_attempts = cursor.fetchone()[0]
+        with metrics.timer('db_write'), conn:
+            conn.executemany(
+                '''INSERT INTO access_logs 
+                   (user_id, user_name, timestamp, access_granted, confidence, camera_id) 
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                entries
+            )
+        metrics.inc('access_logs_written', len(entries))
+
+    @staticmethod
+    def _build_log_filters(start, end, user_name, user_id, granted,
+                           min_confidence, max_confidence, camera_id):
+        """Construye la cláusula WHERE (sin paginación) de una consulta de logs."""
+        conditions = []
+        params = []
+        for condition, value in (
+            ('timestamp >= ?', start),
+            ('timestamp < ?', end),
+            ('user_name = ?', user_name),
+            ('user_id = ?', user_id),
+            ('access_granted = ?', None if granted is None else int(bool(granted))),
+            ('confidence >= ?', min_confidence),
+            ('confidence <= ?', max_confidence),
+            ('camera_id = ?', camera_id),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        return conditions, params
+
+    @staticmethod
+    def _iter_log_pages(conn, conditions, params, newest_first, page_size):
+        """Recorre una tabla access_logs con paginación por clave (timestamp, id)."""
+        order = 'DESC' if newest_first else 'ASC'
+        comparison = '<' if newest_first else '>'
+        last_key = None
+        while True:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if last_key is not None:
+                page_conditions.append(f'(timestamp, id) {comparison} (?, ?)')
+                page_params.extend(last_key)
+            where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ''
+            with metrics.timer('db_query'):
+                rows = conn.execute(f'''
+                    SELECT id, user_id, user_name, timestamp, access_granted, confidence, camera_id
+                    FROM access_logs
+                    {where}
+                    ORDER BY timestamp {order}, id {order}
+                    LIMIT ?
+                ''', page_params + [page_size]).fetchall()
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last_key = (rows[-1][3], rows[-1][0])
+
+    def query_access_logs(self, start=None, end=None, user_name=None, user_id=None,
+                          granted=None, min_confidence=None, max_confidence=None,
+                          camera_id=None, newest_first=True, page_size=500, archive_dir=None):
+        """
+        Consulta los logs de acceso con filtros, como un generador paginado.
+        Las páginas se leen con paginación por clave (timestamp, id), así que
+        auditorías grandes se recorren sin cargar todo en memoria.
+        Args:
+            start: Timestamp inicial incluido ('AAAA-MM-DD HH:MM:SS', UTC)
+            end: Timestamp final excluido
+            user_name / user_id: Filtra por usuario
+            granted: True (concedidos), False (denegados) o None (todos)
+            min_confidence / max_confidence: Banda de confianza
+            camera_id: Filtra por cámara
+            newest_first: Orden descendente por fecha
+            page_size: Filas por página
+            archive_dir: Carpeta de particiones archivadas a incluir (None = solo el mes en curso)
+        Yields:
+            Tuplas (id, user_id, user_name, timestamp, access_granted, confidence, camera_id)
+        """
+        self.flush()
+        conditions, params = self._build_log_filters(
+            start, end, user_name, user_id, granted, min_confidence, max_confidence, camera_id
+        )
         
-        # Accesos concedidos
-        cursor.execute('SELECT COUNT(*) FROM access_logs WHERE access_granted = 1')
-        granted = cursor.fetchone()[0]
+        archives = []
+        if archive_dir:
+            from log_partitions import LogPartitionManager
+            archives = LogPartitionManager(self, archive_dir).partitions_between(start, end)
         
-        # Accesos denegados
-        cursor.execute('SELECT COUNT(*) FROM access_logs WHERE access_granted = 0')
-        denied = cursor.fetchone()[0]
+        # Los meses archivados son anteriores a los de la base principal
+        if not newest_first:
+            for path in archives:
+                yield from self._iter_archive(path, conditions, params, newest_first, page_size)
+        yield from self._iter_log_pages(
+            self._get_connection(), conditions, params, newest_first, page_size
+        )
+        if newest_first:
+            for path in reversed(archives):
+                yield from self._iter_archive(path, conditions, params, newest_first, page_size)
+
+    def _iter_archive(self, path, conditions, params, newest_first, page_size):
+        """Recorre una partición archivada abierta en solo lectura."""
+        conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+        try:
+            yield from self._iter_log_pages(conn, conditions, params, newest_first, page_size)
+        finally:
+            conn.close()
+
+    def get_access_statistics(self, archive_dir='log_archive', recent=5):
+        """
+        Obtiene estadísticas generales (de los resúmenes incrementales) y logs recientes.
+        Args:
+            archive_dir: Particiones archivadas con las que se completan los logs recientes
+                si el mes en curso tiene menos de `recent` (None = solo el mes en curso)
+            recent: Número de logs recientes
+        """
+        self.flush()
+        start = time.perf_counter()
+        conn = self._get_connection()
+        cursor = conn.cursor()
         
-        # Usuarios registrados
-        cursor.execute('SELECT COUNT(*) FROM users')
-        total_users = cursor.fetchone()[0]
+        # Contadores mantenidos por los triggers (lectura O(1))
+        cursor.execute('''
+            SELECT total_attempts, granted, denied, total_users 
+            FROM access_stats WHERE id = 1
+        ''')
+        total_attempts, granted, denied, total_users = cursor.fetchone()
         
-        # Últimos 5 accesos
+        # Últimos accesos (usa el índice de timestamp); tras compactar, el mes en curso
+        # puede tener menos y el resto sale de los meses archivados más recientes
         cursor.execute('''
             SELECT user_name, access_granted, confidence, timestamp 
             FROM access_logs 
-            ORDER BY timestamp DESC 
-            LIMIT 5
-        ''')
+            ORDER BY timestamp DESC, id DESC 
+            LIMIT ?
+        ''', (recent,))
         recent_logs = cursor.fetchall()
-        
-        conn.close()
+        if len(recent_logs) < recent and archive_dir:
+            from log_partitions import recent_archived_logs
+            recent_logs += recent_archived_logs(archive_dir, recent - len(recent_logs))
+        metrics.observe('db_stats', time.perf_counter() - start)
         
         return {
             'total_attempts': total_attempts,
@@ -138,4 +879,29 @@ class DatabaseManager:
             'denied': denied,
             'total_users': total_users,
             'recent_logs': recent_logs
-        }
\ No newline at end of file
+        }
+
+    def get_daily_statistics(self, days=7):
+        """Intentos y accesos concedidos de los últimos días: lista de (day, total, granted)."""
+        self.flush()
+        cursor = self._get_connection().cursor()
+        cursor.execute(
+            'SELECT day, total, granted FROM access_daily ORDER BY day DESC LIMIT ?', (days,)
+        )
+        return cursor.fetchall()
+
+    def get_user_statistics(self, limit=10):
+        """
+        Usuarios con más intentos de acceso.
+        Returns:
+            Lista de (user_name, total, granted, last_seen)
+        """
+        self.flush()
+        cursor = self._get_connection().cursor()
+        cursor.execute('''
+            SELECT user_name, total, granted, last_seen 
+            FROM access_user_stats 
+            ORDER BY total DESC 
+            LIMIT ?
+        ''', (limit,))
+        return cursor.fetchall()
@@ -0,0 +1,201 @@
+import os
+
+import cv2
+import numpy as np
+
+from tracking import iou
+
+DNN_MODEL_DIR = 'models'
+DNN_CONFIG = 'deploy.prototxt'
+DNN_WEIGHTS = 'res10_300x300_ssd_iter_140000.caffemodel'
+DNN_URLS = (
+    'https://raw.githubusercontent.com/opencv/opencv/master/samples/dnn/face_detector/deploy.prototxt',
+    'https://raw.githubusercontent.com/opencv/opencv_3rdparty/'
+    'dnn_samples_face_detector_20170830/res10_300x300_ssd_iter_140000.caffemodel',
+)
+
+
+class HaarDetector:
+    """Detector Haar Cascade de OpenCV (rápido, menos preciso con rostros de perfil)."""
+
+    def __init__(self, scale_factor=1.3, min_neighbors=5, min_size=None):
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size) if min_size else (0, 0)
+        self.cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        )
+
+    def detect(self, frame):
+        """
+        Args:
+            frame: Imagen BGR o en escala de grises
+        Returns:
+            Lista de cajas (x, y, w, h)
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        faces = self.cascade.detectMultiScale(
+            gray, self.scale_factor, self.min_neighbors, minSize=self.min_size
+        )
+        return [tuple(int(v) for v in box) for box in faces]
+
+
+class DnnDetector:
+    """
+    Detector de rostros DNN de OpenCV (SSD ResNet-10, Caffe) en CPU.
+    Más preciso que Haar con poca luz, perfiles y rostros pequeños.
+    Requiere descargar el modelo en model_dir (ver DNN_URLS).
+    """
+
+    def __init__(self, model_dir=DNN_MODEL_DIR, confidence=0.5, input_size=(300, 300)):
+        config = os.path.join(model_dir, DNN_CONFIG)
+        weights = os.path.join(model_dir, DNN_WEIGHTS)
+        for path in (config, weights):
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"No se encuentra {path}. Descarga el modelo del detector DNN en '{model_dir}':\n  "
+                    + "\n  ".join(DNN_URLS)
+                )
+        self.net = cv2.dnn.readNetFromCaffe(config, weights)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.confidence = confidence
+        self.input_size = tuple(input_size)
+
+    def detect(self, frame):
+        """
+        Args:
+            frame: Imagen BGR (las imágenes en gris se convierten)
+        Returns:
+            Lista de cajas (x, y, w, h)
+        """
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        height, width = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(
+            cv2.resize(frame, self.input_size), 1.0, self.input_size, (104.0, 177.0, 123.0)
+        )
+        self.net.setInput(blob)
+        detections = self.net.forward()
+
+        boxes = []
+        for detection in detections[0, 0]:
+            if detection[2] < self.confidence:
+                continue
+            x1, y1, x2, y2 = detection[3:7] * np.array([width, height, width, height])
+            x1, y1 = max(0, int(x1)), max(0, int(y1))
+            x2, y2 = min(width, int(x2)), min(height, int(y2))
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2 - x1, y2 - y1))
+        return boxes
+
+
+def suppress_overlaps(boxes, iou_threshold=0.3):
+    """Elimina cajas duplicadas (se queda con la mayor de cada grupo solapado)."""
+    kept = []
+    for box in sorted(boxes, key=lambda b: b[2] * b[3], reverse=True):
+        if all(iou(box, other) < iou_threshold for other in kept):
+            kept.append(box)
+    return kept
+
+
+class FastDetector:
+    """
+    Modo rápido sobre cualquier detector.
+    Cada cierto número de frames hace un barrido completo sobre el frame reducido;
+    entre barridos solo busca en regiones ampliadas alrededor de las cajas del
+    frame anterior, y devuelve las coordenadas en la resolución original.
+    Los rostros que entran a escena se detectan en el siguiente barrido completo
+    (como mucho full_scan_interval frames después).
+    """
+
+    def __init__(self, detector, max_width=640, full_scan_interval=10, roi_margin=0.5):
+        """
+        Args:
+            detector: Detector base (HaarDetector, DnnDetector...)
+            max_width: Ancho máximo al que se reduce el frame para detectar
+            full_scan_interval: Frames entre barridos completos
+            roi_margin: Ampliación de cada caja previa (fracción de su tamaño por lado)
+        """
+        self.detector = detector
+        self.max_width = max_width
+        self.full_scan_interval = full_scan_interval
+        self.roi_margin = roi_margin
+        self._boxes = []
+        self._frames_since_scan = 0
+
+        # Contadores
+        self.full_scans = 0
+        self.roi_scans = 0
+
+    def reset(self):
+        self._boxes = []
+        self._frames_since_scan = 0
+
+    def _detect_scaled(self, image, offset_x=0, offset_y=0):
+        """Detecta sobre la imagen reducida y devuelve cajas en coordenadas originales."""
+        scale = min(1.0, self.max_width / float(image.shape[1]))
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return [
+            (int(x / scale) + offset_x, int(y / scale) + offset_y, int(w / scale), int(h / scale))
+            for x, y, w, h in self.detector.detect(image)
+        ]
+
+    def _detect_full(self, frame):
+        self.full_scans += 1
+        self._frames_since_scan = 0
+        return self._detect_scaled(frame)
+
+    def _detect_rois(self, frame):
+        self.roi_scans += 1
+        height, width = frame.shape[:2]
+        found = []
+        for x, y, w, h in self._boxes:
+            margin_x, margin_y = int(w * self.roi_margin), int(h * self.roi_margin)
+            x1, y1 = max(0, x - margin_x), max(0, y - margin_y)
+            x2, y2 = min(width, x + w + margin_x), min(height, y + h + margin_y)
+            if x2 > x1 and y2 > y1:
+                found.extend(self._detect_scaled(frame[y1:y2, x1:x2], x1, y1))
+        return suppress_overlaps(found)
+
+    def detect(self, frame):
+        """
+        Args:
+            frame: Imagen BGR o en escala de grises a resolución completa
+        Returns:
+            Lista de cajas (x, y, w, h) en coordenadas del frame
+        """
+        if not self._boxes or self._frames_since_scan >= self.full_scan_interval:
+            boxes = self._detect_full(frame)
+        else:
+            boxes = self._detect_rois(frame)
+            self._frames_since_scan += 1
+            if len(boxes) < len(self._boxes):
+                # Se perdió algún rostro: confirmar con un barrido completo
+                boxes = self._detect_full(frame)
+        self._boxes = boxes
+        return boxes
+
+
+def create_detector(backend='haar', fast=False, max_width=640, full_scan_interval=10,
+                    roi_margin=0.5, model_dir=DNN_MODEL_DIR, confidence=0.5):
+    """
+    Crea un detector de rostros.
+    Args:
+        backend: 'haar' o 'dnn'
+        fast: Usa el modo rápido (frame reducido + búsqueda en regiones previas)
+        max_width, full_scan_interval, roi_margin: Parámetros del modo rápido
+        model_dir, confidence: Parámetros del detector DNN
+    """
+    if backend == 'haar':
+        detector = HaarDetector()
+    elif backend == 'dnn':
+        detector = DnnDetector(model_dir=model_dir, confidence=confidence)
+    else:
+        raise ValueError(f"Detector desconocido: {backend} (usa 'haar' o 'dnn')")
+
+    if fast:
+        return FastDetector(detector, max_width=max_width,
+                            full_scan_interval=full_scan_interval, roi_margin=roi_margin)
+    return detector
@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import embeddings
+import metrics
+
+
+class EmbeddingServiceStopped(RuntimeError):
+    """Se envió una petición a un servicio de embeddings detenido."""
+
+
+class EmbeddingService:
+    """
+    Servicio de embeddings con agrupación de peticiones (batching).
+    Los llamadores (reconocimiento, registro, varias cámaras...) envían rostros
+    ya preprocesados; un hilo los acumula y ejecuta una sola pasada del modelo
+    por lote, limitada por tamaño máximo y tiempo máximo de espera.
+    """
+
+    def __init__(self, embed_fn=embeddings.embed_batch, preprocess_fn=embeddings.preprocess_faces,
+                 max_batch_size=16, max_wait=0.01):
+        """
+        Args:
+            embed_fn: Función que recibe una lista de rostros y devuelve la matriz de embeddings
+            preprocess_fn: Función (imagen, enforce_detection) -> lista de rostros preprocesados
+            max_batch_size: Máximo de rostros por pasada del modelo
+            max_wait: Segundos máximos que se espera para completar un lote
+        """
+        self.embed_fn = embed_fn
+        self.preprocess_fn = preprocess_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        # La comprobación de parada y el encolado van juntos: nada entra después de stop()
+        self._submit_lock = threading.Lock()
+        self._thread = None
+
+        # Contadores
+        self.batches = 0
+        self.faces = 0
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Detiene el servicio después de atender lo que ya estaba en cola."""
+        with self._submit_lock:
+            self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, faces):
+        """
+        Encola rostros preprocesados.
+        Returns:
+            Future cuyo resultado es la lista de embeddings (en el mismo orden)
+        """
+        future = Future()
+        faces = list(faces)
+        if not faces:
+            future.set_result([])
+        else:
+            with self._submit_lock:
+                if self._stop_event.is_set():
+                    future.set_exception(EmbeddingServiceStopped("El servicio de embeddings está detenido"))
+                else:
+                    self._queue.put((faces, future))
+        return future
+
+    def embed_faces(self, faces, timeout=None):
+        """Calcula los embeddings de rostros preprocesados (bloqueante)."""
+        return self.submit(faces).result(timeout)
+
+    def embed_image(self, img, enforce_detection=True, timeout=None):
+        """
+        Detecta los rostros de la imagen (en el hilo llamador) y calcula sus embeddings en lote.
+        Returns:
+            Lista de vectores float32 (uno por rostro)
+        """
+        with metrics.timer('preprocess'):
+            faces = self.preprocess_fn(img, enforce_detection)
+        return self.embed_faces(faces, timeout)
+
+    def _collect_batch(self):
+        """Espera la primera petición y agrupa las que lleguen hasta llenar el lote o agotar el tiempo."""
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        requests = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    def _run(self):
+        while not self._stop_event.is_set() or not self._queue.empty():
+            requests = self._collect_batch()
+            if not requests:
+                continue
+
+            faces = [face for request_faces, _ in requests for face in request_faces]
+            try:
+                with metrics.timer('model'):
+                    vectors = self.embed_fn(faces)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.faces += len(faces)
+            metrics.inc('embedding_batches')
+            metrics.inc('embedding_faces', len(faces))
+
+            offset = 0
+            for request_faces, future in requests:
+                count = len(request_faces)
+                future.set_result(list(vectors[offset:offset + count]))
+                offset += count
+
+        # Nada debería quedar en cola (stop() no deja encolar más), pero ninguna petición
+        # puede quedarse esperando para siempre
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(EmbeddingServiceStopped("El servicio de embeddings está detenido"))
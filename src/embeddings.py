@@ -0,0 +1,154 @@
+import threading
+
+import numpy as np
+
+# DeepFace (y con él TensorFlow) se importa solo al calcular embeddings:
+# las operaciones que solo usan la base de datos arrancan sin cargarlo.
+_model_lock = threading.Lock()
+
+# Configuración del modelo de reconocimiento
+MODEL_NAME = 'Facenet'
+DISTANCE_METRIC = 'cosine'
+DETECTOR_BACKEND = 'opencv'
+
+# Versión del formato/preprocesamiento de los embeddings guardados.
+# Incrementar si cambia la forma de calcularlos (alineación, normalización...)
+# y agregar la nueva versión a PREPROCESSING.
+EMBEDDING_VERSION = 1
+
+# Preprocesamiento de cada versión. Las versiones anteriores se conservan: mientras
+# dura una migración el sistema sigue calculando embeddings compatibles con la
+# versión activa en la base de datos (ver reembedding.py).
+PREPROCESSING = {
+    1: {'detector_backend': DETECTOR_BACKEND, 'align': True},
+}
+
+
+def get_threshold(model_name=MODEL_NAME, distance_metric=DISTANCE_METRIC):
+    """Umbral de distancia que usa DeepFace.verify para el modelo dado."""
+    from deepface.commons import distance as dst  # Solo depende de NumPy
+    return dst.findThreshold(model_name, distance_metric)
+
+
+def get_model():
+    """Modelo de reconocimiento (DeepFace lo construye una vez y lo cachea)."""
+    with _model_lock:
+        from deepface import DeepFace
+        return DeepFace.build_model(MODEL_NAME)
+
+
+def get_target_size():
+    from deepface.commons import functions
+    return functions.find_target_size(model_name=MODEL_NAME)
+
+
+def target_spec():
+    """(modelo, versión) con los que este código calcula los embeddings nuevos."""
+    return MODEL_NAME, EMBEDDING_VERSION
+
+
+def preprocessing_for(version):
+    """Parámetros de preprocesamiento de una versión de embeddings."""
+    if version not in PREPROCESSING:
+        raise ValueError(f"Versión de embeddings desconocida: {version} (conocidas: {sorted(PREPROCESSING)})")
+    return PREPROCESSING[version]
+
+
+def preprocess_faces(img, enforce_detection=True, target_size=None,
+                     detector_backend=DETECTOR_BACKEND, align=True, face_detector=None):
+    """
+    Detecta, alinea y redimensiona los rostros de una imagen a la entrada del modelo.
+    Args:
+        img: Ruta de la imagen o array BGR de NumPy
+        enforce_detection: Lanza excepción si no se detecta ningún rostro
+        target_size: Tamaño de entrada del modelo (por defecto, el de MODEL_NAME)
+        detector_backend, align: Preprocesamiento (ver PREPROCESSING)
+        face_detector: Detector ya construido de detector_backend (ver ModelManager);
+                       None = DeepFace lo busca o construye en cada llamada
+    Returns:
+        Lista de arrays (alto, ancho, 3) listos para el modelo (uno por rostro)
+    """
+    from deepface.commons import functions
+    target_size = target_size or get_target_size()
+    if face_detector is None:
+        face_objs = functions.extract_faces(
+            img=img,
+            target_size=target_size,
+            detector_backend=detector_backend,
+            grayscale=False,
+            enforce_detection=enforce_detection,
+            align=align
+        )
+    else:
+        from deepface.detectors import FaceDetector
+        image = functions.load_image(img)
+        detected = FaceDetector.detect_faces(face_detector, detector_backend, image, align)
+        if not detected:
+            if enforce_detection:
+                raise ValueError("No se detectó ningún rostro en la imagen")
+            detected = [(image, None, 0)]
+        # Cada recorte pasa por el mismo redimensionado y relleno de DeepFace, sin volver a detectar
+        face_objs = []
+        for face, _, _ in detected:
+            if face.shape[0] > 0 and face.shape[1] > 0:
+                face_objs.extend(functions.extract_faces(
+                    img=face, target_size=target_size, detector_backend='skip',
+                    grayscale=False, enforce_detection=False, align=False
+                ))
+        if not face_objs and enforce_detection:
+            raise ValueError("No se detectó ningún rostro en la imagen")
+    return [functions.normalize_input(face, normalization='base')[0] for face, _, _ in face_objs]
+
+
+def embed_batch(faces):
+    """
+    Calcula los embeddings de varios rostros preprocesados en una sola pasada del modelo.
+    Args:
+        faces: Lista de arrays devueltos por preprocess_faces
+    Returns:
+        Matriz float32 (n_rostros, dim)
+    """
+    if len(faces) == 0:
+        return np.empty((0, 0), dtype=np.float32)
+    batch = np.stack(faces).astype(np.float32)
+    return np.asarray(get_model().predict_on_batch(batch), dtype=np.float32)
+
+
+def compute_embeddings(img, enforce_detection=True):
+    """
+    Calcula los embeddings de todos los rostros de una imagen.
+    Args:
+        img: Ruta de la imagen o array BGR de NumPy
+        enforce_detection: Lanza excepción si no se detecta ningún rostro
+    Returns:
+        Lista de vectores float32 (uno por rostro)
+    """
+    return list(embed_batch(preprocess_faces(img, enforce_detection)))
+
+
+def encode_embedding(embedding):
+    """Serializa un embedding a BLOB (float32 little-endian)."""
+    return np.asarray(embedding, dtype='<f4').tobytes()
+
+
+def decode_embedding(blob, dim):
+    """Reconstruye un embedding a partir del BLOB guardado."""
+    vector = np.frombuffer(blob, dtype='<f4')
+    if vector.shape[0] != dim:
+        raise ValueError(f"Dimensión inválida: se esperaba {dim}, se obtuvo {vector.shape[0]}")
+    return vector.astype(np.float32)
+
+
+def is_current(model_name, version, spec=None):
+    """
+    Indica si un embedding guardado corresponde al modelo/versión dados
+    (por defecto, los de este código: target_spec()).
+    """
+    return (model_name, version) == tuple(spec or target_spec())
+
+
+def cosine_distance(a, b):
+    """Distancia coseno (misma definición que DeepFace)."""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    return float(1 - np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
@@ -0,0 +1,205 @@
+import csv
+import json
+import multiprocessing as mp
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from model_manager import init_worker, threads_per_worker, worker_model
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def name_from_filename(filename):
+    """'Juan_Perez_20240101_120000.jpg' -> 'Juan Perez' (mismo formato que _capture_photo)."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    stem = re.sub(r'_\d{8}_\d{6}$', '', stem)
+    return stem.replace('_', ' ').strip()
+
+
+def load_entries(source):
+    """
+    Lee las personas a registrar.
+    Args:
+        source: Carpeta de fotos (el nombre sale del archivo) o manifiesto CSV
+                con columnas name, email, photo (rutas relativas al CSV)
+    Returns:
+        Lista de diccionarios {name, email, photo_path}
+    """
+    entries = []
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                entries.append({
+                    'name': name_from_filename(filename),
+                    'email': None,
+                    'photo_path': os.path.abspath(os.path.join(source, filename)),
+                })
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                photo = (row.get('photo') or row.get('photo_path') or '').strip()
+                entries.append({
+                    'name': (row.get('name') or '').strip(),
+                    'email': (row.get('email') or '').strip() or None,
+                    'photo_path': os.path.abspath(os.path.join(base_dir, photo)) if photo else '',
+                })
+    return entries
+
+
+def _embed_entry(entry):
+    """Valida el rostro y calcula el embedding (se ejecuta en un proceso del pool)."""
+    import embeddings
+    try:
+        if not os.path.exists(entry['photo_path']):
+            raise ValueError(f"No se encuentra la foto: {entry['photo_path']}")
+        embedding = worker_model().embed_image(entry['photo_path'], enforce_detection=True)[0]
+        return entry, embeddings.encode_embedding(embedding), int(embedding.shape[0]), None
+    except Exception as e:
+        return entry, None, None, str(e)
+
+
+class BulkEnroller:
+    """
+    Registro masivo de usuarios desde una carpeta o un manifiesto CSV.
+    Valida los rostros y calcula los embeddings en un pool de procesos, omite
+    duplicados, inserta en transacciones por lotes y guarda el progreso en un
+    diario para poder reanudar tras una caída.
+    """
+
+    def __init__(self, db_manager, workers=None, batch_size=200, journal_path=None,
+                 retry_failed=False):
+        """
+        Args:
+            db_manager: DatabaseManager donde se registran los usuarios
+            workers: Procesos del pool (por defecto, número de CPUs)
+            batch_size: Usuarios por transacción
+            journal_path: Archivo JSONL de progreso (permite reanudar)
+            retry_failed: Reintenta las entradas que fallaron en ejecuciones anteriores
+        """
+        self.db_manager = db_manager
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.journal_path = journal_path
+        self.retry_failed = retry_failed
+
+    def _read_journal(self):
+        done = {}
+        if self.journal_path and os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Línea incompleta de una caída
+                    done[record['name']] = record
+        return done
+
+    def _journal(self, journal, records):
+        if journal is not None:
+            for record in records:
+                journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def run(self, entries):
+        """
+        Registra las entradas.
+        Returns:
+            Reporte {total, registered, duplicates, skipped, failed, failures, elapsed_s}
+        """
+        start = time.perf_counter()
+        report = {'total': len(entries), 'registered': 0, 'duplicates': 0,
+                  'skipped': 0, 'failed': 0, 'failures': []}
+
+        journal_done = self._read_journal()
+        existing = self.db_manager.get_all_user_names()
+        seen = set()
+        pending = []
+
+        for entry in entries:
+            name = entry['name']
+            if not name or not entry['photo_path']:
+                report['failed'] += 1
+                report['failures'].append((name or '(sin nombre)', "Falta el nombre o la foto"))
+                continue
+            if name in existing or name in seen:
+                report['duplicates'] += 1
+                continue
+            previous = journal_done.get(name)
+            if previous and (previous['status'] == 'ok' or not self.retry_failed):
+                report['skipped'] += 1
+                continue
+            seen.add(name)
+            pending.append(entry)
+
+        if not pending:
+            report['elapsed_s'] = time.perf_counter() - start
+            return report
+
+        print(f"Registrando {len(pending)} usuario(s) con {self.workers} proceso(s)...")
+        # Los embeddings se calculan con la versión activa en la base de datos
+        model_name, version = self.db_manager.get_active_embedding_spec()
+
+        journal = open(self.journal_path, 'a', encoding='utf-8') if self.journal_path else None
+        batch = []
+
+        def flush():
+            if not batch:
+                return
+            inserted = set(self.db_manager.add_users_batch([row for row, _ in batch]))
+            # Un nombre que otro proceso registró mientras tanto se omite en el INSERT
+            report['registered'] += len(inserted)
+            report['duplicates'] += len(batch) - len(inserted)
+            self._journal(journal, [{'name': row[0], 'status': 'ok' if row[0] in inserted else 'duplicate'}
+                                    for row, _ in batch])
+            batch.clear()
+
+        try:
+            ctx = mp.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                     initializer=init_worker,
+                                     initargs=(model_name, version, threads_per_worker(self.workers))) as executor:
+                futures = [executor.submit(_embed_entry, entry) for entry in pending]
+                for done_count, future in enumerate(as_completed(futures), 1):
+                    entry, blob, dim, error = future.result()
+                    if error:
+                        report['failed'] += 1
+                        report['failures'].append((entry['name'], error))
+                        self._journal(journal, [{'name': entry['name'], 'status': 'failed',
+                                                 'error': error}])
+                    else:
+                        batch.append(((entry['name'], entry['email'], entry['photo_path'], blob,
+                                       model_name, dim, version),
+                                      entry))
+                        if len(batch) >= self.batch_size:
+                            flush()
+
+                    if done_count % 100 == 0:
+                        print(f"  {done_count}/{len(pending)} procesados")
+            flush()
+        finally:
+            if journal is not None:
+                journal.close()
+
+        report['elapsed_s'] = time.perf_counter() - start
+        return report
+
+
+def print_report(report):
+    """Muestra el resumen del registro masivo."""
+    print("\n" + "="*60)
+    print("RESUMEN DEL REGISTRO MASIVO")
+    print("="*60)
+    print(f"  • Entradas: {report['total']}")
+    print(f"  • Registrados: {report['registered']} ✅")
+    print(f"  • Duplicados omitidos: {report['duplicates']}")
+    print(f"  • Ya procesados (reanudación): {report['skipped']}")
+    print(f"  • Fallidos: {report['failed']} ❌")
+    print(f"  • Tiempo: {report['elapsed_s']:.1f} s")
+    if report['failures']:
+        print("\nFallos:")
+        for name, error in report['failures']:
+            print(f"  • {name}: {error}")
@@ -0,0 +1,229 @@
+import numpy as np
+
+
+class GalleryIndex:
+    """
+    Índice en memoria de los embeddings de usuarios registrados.
+    Guarda todos los vectores L2-normalizados en una única matriz contigua,
+    de modo que la distancia coseno contra toda la galería es un producto
+    matriz-vector. Opcionalmente usa un modo aproximado tipo IVF
+    (agrupamiento grueso con k-means) para galerías muy grandes.
+    """
+
+    def __init__(self, approximate=False, n_lists=None, n_probe=8, min_train_size=1000):
+        """
+        Args:
+            approximate: Usa búsqueda aproximada (IVF) cuando la galería es grande
+            n_lists: Número de clusters del IVF (por defecto ~sqrt(N))
+            n_probe: Clusters revisados por consulta (más = mejor recall, más latencia)
+            min_train_size: Tamaño mínimo de galería para entrenar el IVF
+        """
+        self.approximate = approximate
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.dim = None
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._user_ids = []
+        self._names = []
+        self._positions = {}  # user_id -> fila de la matriz
+        # Estructuras del modo aproximado
+        self._centroids = None
+        self._lists = None
+        self._assignments = None  # fila -> lista del IVF
+
+    def __len__(self):
+        return len(self._user_ids)
+
+    @property
+    def is_trained(self):
+        return self._centroids is not None
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def build(self, entries):
+        """
+        Reconstruye el índice completo.
+        Args:
+            entries: Iterable de tuplas (user_id, name, embedding)
+        """
+        entries = list(entries)
+        self._user_ids = [user_id for user_id, _, _ in entries]
+        self._names = [name for _, name, _ in entries]
+        self._positions = {user_id: i for i, user_id in enumerate(self._user_ids)}
+        self._centroids = None
+        self._lists = None
+        self._assignments = None
+
+        if not entries:
+            self.dim = None
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+            return
+
+        matrix = np.stack([np.asarray(e, dtype=np.float32) for _, _, e in entries])
+        self._matrix = np.ascontiguousarray(self._normalize(matrix))
+        self.dim = self._matrix.shape[1]
+
+        if self.approximate and len(self) >= self.min_train_size:
+            self._train()
+
+    def add(self, user_id, name, embedding):
+        """Agrega un usuario al índice sin reconstruirlo."""
+        if user_id in self._positions:
+            self.upsert(user_id, name, embedding)
+            return
+        vector = self._normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        if len(self) == 0:
+            self.dim = vector.shape[1]
+            self._matrix = np.ascontiguousarray(vector)
+        else:
+            if vector.shape[1] != self.dim:
+                raise ValueError(f"Dimensión inválida: se esperaba {self.dim}, se obtuvo {vector.shape[1]}")
+            self._matrix = np.ascontiguousarray(np.vstack([self._matrix, vector]))
+
+        self._user_ids.append(user_id)
+        self._names.append(name)
+        index = len(self) - 1
+        self._positions[user_id] = index
+
+        if self.is_trained:
+            list_id = int(np.argmax(self._centroids @ vector[0]))
+            self._lists[list_id] = np.append(self._lists[list_id], index)
+            self._assignments = np.append(self._assignments, list_id)
+        elif self.approximate and len(self) >= self.min_train_size:
+            self._train()
+
+    def copy(self):
+        """
+        Copia independiente del índice. Los cambios se aplican sobre una copia que
+        luego reemplaza a la original, así las búsquedas en curso no ven estados a medias.
+        """
+        other = GalleryIndex(self.approximate, self.n_lists, self.n_probe, self.min_train_size)
+        other.dim = self.dim
+        other._matrix = self._matrix.copy()
+        other._user_ids = list(self._user_ids)
+        other._names = list(self._names)
+        other._positions = dict(self._positions)
+        other._centroids = self._centroids
+        if self._lists is not None:
+            other._lists = [ids.copy() for ids in self._lists]
+            other._assignments = self._assignments.copy()
+        return other
+
+    def upsert(self, user_id, name, embedding):
+        """Agrega el usuario o reemplaza su nombre y embedding si ya está en el índice."""
+        index = self._positions.get(user_id)
+        if index is None:
+            self.add(user_id, name, embedding)
+            return
+        vector = self._normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Dimensión inválida: se esperaba {self.dim}, se obtuvo {vector.shape[0]}")
+        self._matrix[index] = vector
+        self._names[index] = name
+
+        if self.is_trained:
+            list_id = int(np.argmax(self._centroids @ vector))
+            old_list = int(self._assignments[index])
+            if list_id != old_list:
+                self._lists[old_list] = self._lists[old_list][self._lists[old_list] != index]
+                self._lists[list_id] = np.append(self._lists[list_id], index)
+                self._assignments[index] = list_id
+
+    def remove(self, user_id):
+        """
+        Quita un usuario del índice (la última fila pasa a ocupar su lugar).
+        Returns:
+            True si el usuario estaba en el índice
+        """
+        index = self._positions.pop(user_id, None)
+        if index is None:
+            return False
+        last = len(self) - 1
+
+        if self.is_trained:
+            removed_list = int(self._assignments[index])
+            self._lists[removed_list] = self._lists[removed_list][self._lists[removed_list] != index]
+            if index != last:
+                moved_list = int(self._assignments[last])
+                self._lists[moved_list][self._lists[moved_list] == last] = index
+                self._assignments[index] = moved_list
+            self._assignments = self._assignments[:last]
+
+        if index != last:
+            self._matrix[index] = self._matrix[last]
+            self._user_ids[index] = self._user_ids[last]
+            self._names[index] = self._names[last]
+            self._positions[self._user_ids[index]] = index
+        self._matrix = self._matrix[:last]
+        self._user_ids.pop()
+        self._names.pop()
+        if last == 0:
+            self.dim = None
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+            self._centroids = None
+            self._lists = None
+            self._assignments = None
+        return True
+
+    def _train(self):
+        """Entrena el agrupamiento grueso (IVF) con MiniBatchKMeans."""
+        from sklearn.cluster import MiniBatchKMeans
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(self))))
+        n_lists = min(n_lists, len(self))
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_lists, batch_size=4096, n_init=3, random_state=0
+        )
+        labels = kmeans.fit_predict(self._matrix)
+        self._centroids = np.ascontiguousarray(self._normalize(kmeans.cluster_centers_))
+        self._lists = [np.flatnonzero(labels == i) for i in range(n_lists)]
+        self._assignments = labels.astype(np.int64)
+
+    def search(self, probe, k=1, exact=None):
+        """
+        Busca los k usuarios más cercanos al embedding dado.
+        Args:
+            probe: Embedding del rostro a buscar
+            k: Número de resultados
+            exact: Fuerza búsqueda exacta (True) o aproximada (False)
+        Returns:
+            Lista de tuplas (user_id, name, distance) ordenada por distancia
+            (vacía si el embedding no tiene la dimensión de la galería)
+        """
+        if len(self) == 0:
+            return []
+
+        query = self._normalize(np.asarray(probe, dtype=np.float32).reshape(-1))
+        if query.shape[0] != self.dim:
+            # Embedding de otro modelo (p. ej. durante un cambio de versión): sin coincidencias
+            return []
+        use_ivf = self.is_trained if exact is None else (not exact and self.is_trained)
+
+        if use_ivf:
+            n_probe = min(self.n_probe, len(self._lists))
+            list_scores = self._centroids @ query
+            probed = np.argpartition(-list_scores, n_probe - 1)[:n_probe]
+            candidates = np.concatenate([self._lists[i] for i in probed])
+            if candidates.size == 0:
+                return []
+            similarities = self._matrix[candidates] @ query
+        else:
+            candidates = None
+            similarities = self._matrix @ query
+
+        k = min(k, similarities.shape[0])
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+
+        results = []
+        for position in top:
+            index = int(candidates[position]) if candidates is not None else int(position)
+            distance = float(1.0 - similarities[position])
+            results.append((self._user_ids[index], self._names[index], distance))
+        return results
@@ -0,0 +1,377 @@
+import json
+import os
+
+import numpy as np
+
+MAGIC = b'FACEGAL1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DTYPES = ('float16', 'int8')
+
+# Filas que se convierten a float32 a la vez al puntuar (acota la memoria temporal)
+SCORE_CHUNK = 16384
+
+# Cambios en memoria a partir de los cuales conviene reescribir el archivo
+MAX_OVERLAY_CHANGES = 1000
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors, dtype='float16'):
+    """
+    Cuantiza vectores L2-normalizados.
+    Args:
+        vectors: Matriz (N, dim) float32 ya normalizada
+        dtype: 'float16' o 'int8' (simétrico, una escala por vector)
+    Returns:
+        (matriz cuantizada, escalas float32 por vector)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == 'float16':
+        return vectors.astype(np.float16), np.ones(vectors.shape[0], dtype=np.float32)
+    if dtype == 'int8':
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"Tipo de cuantización desconocido: {dtype} (usa {' o '.join(DTYPES)})")
+
+
+def write_gallery_file(path, entries, dtype='float16', generation=None, model=None, version=None):
+    """
+    Escribe la galería en disco de forma atómica (archivo temporal + os.replace).
+    No debe usarse sobre un archivo que otro proceso tenga mapeado (en Windows falla):
+    el sistema publica cada versión con su propio nombre (ver publish_gallery_file).
+
+    Formato: MAGIC, longitud (uint32) y cabecera JSON, y a continuación, alineadas a
+    64 bytes: vectores cuantizados (N, dim), escalas float32 (N), user_ids int64 (N),
+    desplazamientos de los nombres int64 (N + 1) y los nombres en UTF-8.
+
+    Args:
+        path: Ruta del archivo de galería
+        entries: Iterable de tuplas (user_id, name, embedding)
+        dtype: 'float16' o 'int8'
+        generation: Generación de la tabla users con la que se construyó
+        model, version: Modelo y versión de los embeddings
+    """
+    entries = list(entries)
+    count = len(entries)
+    dim = int(np.asarray(entries[0][2]).shape[-1]) if entries else 0
+
+    if entries:
+        matrix = _normalize(np.stack([np.asarray(e, dtype=np.float32) for _, _, e in entries]))
+        vectors, scales = quantize(matrix, dtype)
+    else:
+        vectors, scales = quantize(np.empty((0, 0), dtype=np.float32), dtype)
+    user_ids = np.array([user_id for user_id, _, _ in entries], dtype=np.int64)
+    encoded = [name.encode('utf-8') for _, name, _ in entries]
+    name_offsets = np.zeros(count + 1, dtype=np.int64)
+    if encoded:
+        name_offsets[1:] = np.cumsum([len(name) for name in encoded])
+    names = b''.join(encoded)
+
+    sections = [
+        ('vectors', vectors.tobytes()),
+        ('scales', scales.tobytes()),
+        ('user_ids', user_ids.tobytes()),
+        ('name_offsets', name_offsets.tobytes()),
+        ('names', names),
+    ]
+
+    # La cabecera guarda los desplazamientos, que dependen de su propia longitud:
+    # se reserva espacio de sobra y se rellena con espacios
+    header = {
+        'format': FORMAT_VERSION, 'dtype': dtype, 'count': count, 'dim': dim,
+        'generation': generation,
+        'model': model, 'version': version, 'offsets': {},
+    }
+    header_size = _align(len(MAGIC) + 4 + len(json.dumps(header)) + 256)
+    offset = header_size
+    for name, data in sections:
+        header['offsets'][name] = offset
+        offset = _align(offset + len(data))
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (header_size - len(MAGIC) - 4 - len(header_bytes))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # Uno por proceso: pueden reconstruirla varios a la vez
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(4, 'little'))
+        f.write(header_bytes)
+        for name, data in sections:
+            f.seek(header['offsets'][name])
+            f.write(data)
+        f.truncate(offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def versioned_path(path, generation):
+    """Archivo de la galería construida con la generación dada (gallery.bin.<generación>)."""
+    return f"{path}.{int(generation)}"
+
+
+def _versions(path):
+    """Archivos versionados de la galería: lista de (generación, ruta), de la más nueva a la más antigua."""
+    directory, base = os.path.split(os.path.abspath(path))
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    versions = []
+    for name in names:
+        suffix = name[len(base) + 1:]
+        if name.startswith(base + '.') and suffix.isdigit():
+            versions.append((int(suffix), os.path.join(directory, name)))
+    return sorted(versions, reverse=True)
+
+
+def latest_gallery_file(path):
+    """Archivo versionado más reciente de la galería, o None si no hay ninguno."""
+    versions = _versions(path)
+    return versions[0][1] if versions else None
+
+
+def publish_gallery_file(path, entries, dtype='float16', generation=0, model=None, version=None):
+    """
+    Escribe una versión nueva de la galería (gallery.bin.<generación>) y borra las anteriores.
+    Nunca se reemplaza un archivo que otro proceso pueda tener mapeado: cada versión
+    tiene su propio nombre y los lectores pasan a la más reciente. Las versiones que
+    no se pueden borrar (en Windows, mientras otro proceso las tenga abiertas) se
+    vuelven a intentar en la siguiente publicación.
+    Returns:
+        Ruta del archivo escrito (o el existente de la misma generación)
+    """
+    target = versioned_path(path, generation)
+    header = read_header(target)
+    if header is None or (header['dtype'], header['model'], header['version']) != (dtype, model, version):
+        write_gallery_file(target, entries, dtype=dtype, generation=generation, model=model, version=version)
+    for stale_generation, stale in _versions(path):
+        if stale_generation < generation:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return target
+
+
+def read_header(path):
+    """Lee la cabecera de un archivo de galería (None si no existe o no es válido)."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(4), 'little')
+            header = json.loads(f.read(length).decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    return header if header.get('format') == FORMAT_VERSION else None
+
+
+class QuantizedGallery:
+    """
+    Galería de solo lectura mapeada en memoria (np.memmap) desde un archivo de galería.
+    No copia los vectores: varios procesos del mismo equipo comparten las mismas
+    páginas del page cache, y abrirla es instantáneo. Las similitudes se calculan
+    sobre los datos cuantizados, convirtiendo a float32 por bloques.
+    Tiene la misma interfaz que GalleryIndex (búsqueda exacta); los cambios hechos
+    después de abrirla se guardan en memoria: los usuarios nuevos o modificados en
+    float32 aparte, y las filas del archivo reemplazadas o eliminadas se enmascaran.
+    """
+
+    def __init__(self, path):
+        header = read_header(path)
+        if header is None:
+            raise ValueError(f"Archivo de galería inválido: {path}")
+        self.path = path
+        self.header = header
+        self.dtype = header['dtype']
+        self.generation = header['generation']
+        self.model = header['model']
+        self.version = header['version']
+        self.dim = header['dim'] or None
+
+        count, offsets = header['count'], header['offsets']
+        if count:
+            self._vectors = np.memmap(path, dtype=self.dtype, mode='r',
+                                      offset=offsets['vectors'], shape=(count, header['dim']))
+            self._scales = np.memmap(path, dtype=np.float32, mode='r',
+                                     offset=offsets['scales'], shape=(count,))
+            self._user_ids = np.memmap(path, dtype=np.int64, mode='r',
+                                       offset=offsets['user_ids'], shape=(count,))
+            self._name_offsets = np.memmap(path, dtype=np.int64, mode='r',
+                                           offset=offsets['name_offsets'], shape=(count + 1,))
+            names_size = int(self._name_offsets[-1])
+            self._names = np.memmap(path, dtype=np.uint8, mode='r',
+                                    offset=offsets['names'], shape=(names_size,)) \
+                if names_size else np.empty(0, dtype=np.uint8)
+        else:
+            self._vectors = np.empty((0, 0), dtype=self.dtype)
+            self._scales = np.empty(0, dtype=np.float32)
+            self._user_ids = np.empty(0, dtype=np.int64)
+            self._name_offsets = np.zeros(1, dtype=np.int64)
+            self._names = np.empty(0, dtype=np.uint8)
+        self._count = count
+
+        # Cambios tras abrir el archivo (hasta que se reescribe)
+        self._extra_matrix = np.empty((0, self.dim or 0), dtype=np.float32)
+        self._extra = []
+        self._removed = None    # Máscara de filas del archivo reemplazadas o eliminadas
+        self._n_removed = 0
+        self._positions = None  # user_id -> fila del archivo (se crea con el primer cambio)
+
+    def __len__(self):
+        return self._count - self._n_removed + len(self._extra)
+
+    @property
+    def n_changes(self):
+        """Cambios guardados en memoria sobre el contenido del archivo."""
+        return self._n_removed + len(self._extra)
+
+    @property
+    def nbytes(self):
+        """Bytes mapeados del archivo (compartidos entre procesos)."""
+        return int(self._vectors.nbytes + self._scales.nbytes + self._user_ids.nbytes
+                   + self._name_offsets.nbytes + self._names.nbytes)
+
+    def _name(self, index):
+        start, end = int(self._name_offsets[index]), int(self._name_offsets[index + 1])
+        return bytes(self._names[start:end]).decode('utf-8')
+
+    def _entry(self, index):
+        """(user_id, name) de la posición dada."""
+        if index < self._count:
+            return int(self._user_ids[index]), self._name(index)
+        return self._extra[index - self._count]
+
+    def entries(self):
+        """Itera (user_id, name, embedding float32 normalizado) de toda la galería."""
+        for start in range(0, self._count, SCORE_CHUNK):
+            block = np.asarray(self._vectors[start:start + SCORE_CHUNK], dtype=np.float32)
+            block *= self._scales[start:start + SCORE_CHUNK, None]
+            for offset, vector in enumerate(block):
+                index = start + offset
+                if self._removed is not None and self._removed[index]:
+                    continue
+                yield int(self._user_ids[index]), self._name(index), vector
+        for (user_id, name), vector in zip(self._extra, self._extra_matrix):
+            yield user_id, name, vector
+
+    def copy(self):
+        """Copia de los cambios en memoria; el archivo mapeado se comparte."""
+        other = object.__new__(QuantizedGallery)
+        other.__dict__.update(self.__dict__)
+        other._extra_matrix = self._extra_matrix.copy()
+        other._extra = list(self._extra)
+        other._removed = self._removed.copy() if self._removed is not None else None
+        other._positions = dict(self._positions) if self._positions is not None else None
+        return other
+
+    def _mask_file_row(self, user_id):
+        """Enmascara la fila del archivo del usuario, si la tiene."""
+        if self._positions is None:
+            self._positions = {int(uid): i for i, uid in enumerate(self._user_ids)}
+        index = self._positions.pop(user_id, None)
+        if index is None:
+            return False
+        if self._removed is None:
+            self._removed = np.zeros(self._count, dtype=bool)
+        self._removed[index] = True
+        self._n_removed += 1
+        return True
+
+    def _extra_index(self, user_id):
+        for i, (extra_id, _) in enumerate(self._extra):
+            if extra_id == user_id:
+                return i
+        return None
+
+    def add(self, user_id, name, embedding):
+        """Agrega (o reemplaza) un usuario en memoria; el archivo se reescribe aparte."""
+        self.upsert(user_id, name, embedding)
+
+    def upsert(self, user_id, name, embedding):
+        """Agrega el usuario o reemplaza su nombre y embedding."""
+        vector = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        if self.dim is None:
+            self.dim = vector.shape[1]
+            self._extra_matrix = np.empty((0, self.dim), dtype=np.float32)
+        elif vector.shape[1] != self.dim:
+            raise ValueError(f"Dimensión inválida: se esperaba {self.dim}, se obtuvo {vector.shape[1]}")
+        self._mask_file_row(user_id)
+        index = self._extra_index(user_id)
+        if index is not None:
+            self._extra_matrix[index] = vector[0]
+            self._extra[index] = (user_id, name)
+            return
+        self._extra_matrix = np.vstack([self._extra_matrix, vector])
+        self._extra.append((user_id, name))
+
+    def remove(self, user_id):
+        """
+        Quita un usuario de la galería en memoria.
+        Returns:
+            True si el usuario estaba en la galería
+        """
+        removed = self._mask_file_row(user_id)
+        index = self._extra_index(user_id)
+        if index is not None:
+            self._extra_matrix = np.delete(self._extra_matrix, index, axis=0)
+            del self._extra[index]
+            removed = True
+        return removed
+
+    def similarities(self, query):
+        """Similitud coseno de la consulta (normalizada) contra toda la galería."""
+        scores = np.empty(self._count + len(self._extra), dtype=np.float32)
+        for start in range(0, self._count, SCORE_CHUNK):
+            block = self._vectors[start:start + SCORE_CHUNK]
+            scores[start:start + block.shape[0]] = block.astype(np.float32) @ query
+        if self.dtype == 'int8':
+            scores[:self._count] *= self._scales
+        if self._removed is not None:
+            scores[:self._count][self._removed] = -np.inf
+        if self._extra:
+            scores[self._count:] = self._extra_matrix @ query
+        return scores
+
+    def search(self, probe, k=1, exact=None):
+        """
+        Busca los k usuarios más cercanos al embedding dado.
+        Args:
+            probe: Embedding del rostro a buscar
+            k: Número de resultados
+            exact: Se acepta por compatibilidad con GalleryIndex (siempre es exacta)
+        Returns:
+            Lista de tuplas (user_id, name, distance) ordenada por distancia
+            (vacía si el embedding no tiene la dimensión de la galería)
+        """
+        if len(self) == 0:
+            return []
+
+        query = _normalize(np.asarray(probe, dtype=np.float32).reshape(-1))
+        if query.shape[0] != self.dim:
+            # Embedding de otro modelo (p. ej. durante un cambio de versión): sin coincidencias
+            return []
+        similarities = self.similarities(query)
+
+        k = min(k, len(self))  # Sin contar las filas enmascaradas
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+
+        results = []
+        for index in top:
+            user_id, name = self._entry(int(index))
+            # La cuantización puede dejar la similitud apenas por encima de 1
+            results.append((user_id, name, max(0.0, float(1.0 - similarities[index]))))
+        return results
@@ -0,0 +1,335 @@
+import base64
+import hmac
+import ipaddress
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+import metrics
+
+MAX_BODY_BYTES = 10 * 2**20
+
+
+class RequestError(Exception):
+    """Petición inválida: se responde con el código HTTP indicado."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def decode_image(data):
+    """Decodifica una imagen JPEG/PNG en memoria a un array BGR."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise RequestError(400, "No se pudo decodificar la imagen (se espera JPEG o PNG)")
+    return image
+
+
+def photo_filename(name):
+    """
+    Nombre de archivo para la foto de un registro. El nombre del usuario llega del
+    cliente, así que se reduce a letras, dígitos, '-' y '_' (sin separadores de ruta
+    ni '..'), y se añade un sufijo aleatorio para que dos altas no se pisen.
+    """
+    slug = re.sub(r'[^\w-]+', '_', name).strip('_')[:64] or 'usuario'
+    return f"{slug}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jpg"
+
+
+def is_loopback(address):
+    try:
+        return ipaddress.ip_address(address).is_loopback
+    except ValueError:
+        return False
+
+
+class _RecognitionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Conexiones en espera de accept (varios controladores a la vez)
+
+
+class RecognitionHTTPService:
+    """
+    Servicio HTTP local de reconocimiento para los controladores de puerta.
+    Todas las peticiones comparten el modelo, el servicio de embeddings y la galería
+    del sistema: cada una detecta su rostro en su propio hilo y los embeddings de las
+    peticiones concurrentes se calculan juntos en micro-lotes (EmbeddingService).
+    Si hay demasiadas peticiones en curso, las nuevas se rechazan con 503 en lugar
+    de acumular latencia.
+
+    /enroll modifica la galería: sin enroll_token solo se acepta desde la propia
+    máquina; con token, desde cualquier dirección que lo envíe en la cabecera
+    Authorization ("Bearer <token>") o X-Enroll-Token.
+
+    Endpoints:
+        POST /recognize  Imagen (JPEG/PNG) en el cuerpo o JSON {"image": base64, "camera_id"}
+        POST /enroll     JSON {"name", "email", "image": base64} o imagen con ?name=&email=
+        GET  /stats      Estadísticas de accesos, de la galería y del servicio
+    """
+
+    def __init__(self, system, host='127.0.0.1', port=8080, max_queue_depth=32,
+                 log_access=True, max_body_bytes=MAX_BODY_BYTES, enroll_token=None):
+        """
+        Args:
+            system: FaceAccessControlSystem compartido por todas las peticiones
+            host, port: Dirección de escucha (por defecto solo local)
+            max_queue_depth: Máximo de peticiones de reconocimiento/registro en curso
+            log_access: Registra cada reconocimiento en access_logs
+            max_body_bytes: Tamaño máximo del cuerpo de una petición
+            enroll_token: Token requerido para /enroll; None = solo desde loopback
+        """
+        self.system = system
+        self.host = host
+        self.port = port
+        self.max_queue_depth = max_queue_depth
+        self.log_access = log_access
+        self.max_body_bytes = max_body_bytes
+        self.enroll_token = enroll_token
+
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._enroll_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.started_at = None
+
+        # Contadores
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+
+    # ==================== CONTROL DE CARGA ====================
+
+    def _acquire(self):
+        """Reserva un hueco en la cola; False si está llena."""
+        with self._in_flight_lock:
+            self.requests += 1
+            if self._in_flight >= self.max_queue_depth:
+                self.rejected += 1
+                metrics.inc('http_rejected')
+                return False
+            self._in_flight += 1
+            metrics.set_gauge('http_in_flight', self._in_flight)
+            return True
+
+    def _release(self):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+            metrics.set_gauge('http_in_flight', self._in_flight)
+
+    def enroll_allowed(self, client_address, token):
+        """True si el cliente puede registrar usuarios."""
+        if self.enroll_token:
+            return token is not None and hmac.compare_digest(token.encode(), self.enroll_token.encode())
+        return is_loopback(client_address)
+
+    # ==================== ENDPOINTS ====================
+
+    def recognize(self, image, camera_id=None):
+        """Reconoce el rostro de la imagen y, si corresponde, registra el acceso."""
+        result = self.system.recognize_face(image)
+        confidence = 1 - result['distance'] if result['verified'] else 0.0
+        if self.log_access:
+            self.system.log_access(result['user_id'], result['name'], result['verified'],
+                                   confidence, camera_id)
+        return {
+            'verified': bool(result['verified']),
+            'user_id': result['user_id'],
+            'name': result['name'],
+            'distance': float(result['distance']),
+            'confidence': float(confidence),
+            'message': result.get('message'),
+        }
+
+    def enroll(self, name, email, image):
+        """Guarda la foto en known_faces y registra al usuario."""
+        if not isinstance(name, str) or not name.strip():
+            raise RequestError(400, "Falta el nombre del usuario")
+        if email is not None and not isinstance(email, str):
+            raise RequestError(400, "El email debe ser un texto")
+        # Los registros se serializan: son pocos y así no compiten dos altas del mismo nombre
+        with self._enroll_lock:
+            if self.system.db_manager.get_user_by_name(name):
+                raise RequestError(409, f"El usuario '{name}' ya está registrado")
+            faces_dir = os.path.realpath(self.system.known_faces_dir)
+            photo_path = os.path.realpath(os.path.join(faces_dir, photo_filename(name)))
+            if os.path.dirname(photo_path) != faces_dir:
+                raise RequestError(400, "Nombre de usuario inválido")
+            os.makedirs(faces_dir, exist_ok=True)
+            cv2.imwrite(photo_path, image)
+            if not self.system.register_user(name, email, photo_source=photo_path):
+                os.remove(photo_path)
+                raise RequestError(422, "No se detectó un rostro en la imagen")
+            user = self.system.db_manager.get_user_by_name(name)
+        return {'user_id': user[0] if user else None, 'name': name}
+
+    def stats(self):
+        """Estadísticas de accesos, de la galería y del servicio."""
+        access = self.system.get_access_statistics()
+        embedder = self.system.embedder
+        with self._in_flight_lock:
+            service = {
+                'requests': self.requests,
+                'rejected': self.rejected,
+                'errors': self.errors,
+                'in_flight': self._in_flight,
+                'max_queue_depth': self.max_queue_depth,
+                'uptime_s': time.time() - self.started_at if self.started_at else 0.0,
+            }
+        return {
+            'access': {key: access[key] for key in ('total_attempts', 'granted', 'denied', 'total_users')},
+            'gallery': {
+                'users': len(self.system.gallery),
+                'embedding_model': self.system.embedding_spec[0],
+                'embedding_version': self.system.embedding_spec[1],
+            },
+            'embedding': {
+                'batches': embedder.batches,
+                'faces': embedder.faces,
+                'mean_batch_size': embedder.faces / embedder.batches if embedder.batches else None,
+            },
+            'service': service,
+            'metrics': metrics.registry.snapshot() if metrics.registry.enabled else None,
+        }
+
+    # ==================== SERVIDOR ====================
+
+    def _make_handler(self):
+        service = self
+
+        class RecognitionHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Cabeceras y cuerpo van en dos escrituras: sin TCP_NODELAY, Nagle retiene el
+            # cuerpo hasta el ACK retardado del cliente (~40 ms por respuesta en keep-alive)
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass  # Silencioso: las peticiones se cuentan en /stats
+
+            def finish(self):
+                try:
+                    super().finish()
+                finally:
+                    # Cada conexión se atiende en un hilo nuevo: se cierra su conexión SQLite
+                    service.system.db_manager.release_thread_connection()
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self):
+                header = self.headers.get('Content-Length')
+                if header is None:
+                    self.close_connection = True  # Sin longitud no se sabe dónde acaba el cuerpo
+                    raise RequestError(411, "Falta la cabecera Content-Length")
+                header = header.strip()
+                if not header.isascii() or not header.isdigit():
+                    self.close_connection = True
+                    raise RequestError(400, f"Content-Length inválido: {header!r}")
+                # Un número de más de 18 cifras ya supera el límite (e int() rechaza más de 4300)
+                length = int(header) if len(header) <= 18 else None
+                if length is None or length > service.max_body_bytes:
+                    self.close_connection = True  # No se lee el cuerpo
+                    raise RequestError(413, f"La petición supera {service.max_body_bytes} bytes")
+                return self.rfile.read(length) if length else b''
+
+            def _token(self):
+                authorization = self.headers.get('Authorization', '')
+                if authorization.startswith('Bearer '):
+                    return authorization[len('Bearer '):].strip()
+                return self.headers.get('X-Enroll-Token')
+
+            def _parse_request(self, body, query):
+                """Campos de la petición: JSON con la imagen en base64, o la imagen en el cuerpo."""
+                content_type = self.headers.get('Content-Type', '')
+                if content_type.startswith('application/json'):
+                    try:
+                        fields = json.loads(body or b'{}')
+                        if not isinstance(fields, dict):
+                            raise RequestError(400, "El JSON debe ser un objeto")
+                        image_data = base64.b64decode(fields.get('image') or '', validate=True)
+                    except (ValueError, TypeError):
+                        raise RequestError(400, "JSON inválido o imagen en base64 inválida")
+                else:
+                    fields = {key: values[0] for key, values in query.items()}
+                    image_data = body
+                if not image_data:
+                    raise RequestError(400, "Falta la imagen")
+                return fields, decode_image(image_data)
+
+            def do_GET(self):
+                path = urlparse(self.path).path.rstrip('/')
+                if path == '/stats':
+                    self._send_json(200, service.stats())
+                else:
+                    self._send_json(404, {'error': f"Ruta desconocida: {self.path}"})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                path = url.path.rstrip('/')
+                if path not in ('/recognize', '/enroll'):
+                    self._send_json(404, {'error': f"Ruta desconocida: {self.path}"})
+                    return
+                try:
+                    body = self._read_body()
+                except RequestError as e:
+                    self._send_json(e.status, {'error': str(e)})
+                    return
+                if path == '/enroll' and not service.enroll_allowed(self.client_address[0], self._token()):
+                    self._send_json(403, {'error': "Registro no permitido desde esta dirección o sin token"})
+                    return
+
+                if not service._acquire():
+                    self._send_json(503, {'error': "Servicio saturado, reintenta más tarde"},
+                                    headers={'Retry-After': '1'})
+                    return
+                try:
+                    fields, image = self._parse_request(body, parse_qs(url.query))
+                    with metrics.timer(f'http_{path[1:]}'):
+                        if path == '/recognize':
+                            payload = service.recognize(image, fields.get('camera_id'))
+                        else:
+                            payload = service.enroll(fields.get('name'), fields.get('email'), image)
+                    self._send_json(200, payload)
+                except RequestError as e:
+                    self._send_json(e.status, {'error': str(e)})
+                except Exception as e:
+                    with service._in_flight_lock:
+                        service.errors += 1
+                    self._send_json(500, {'error': str(e)})
+                finally:
+                    service._release()
+
+        return RecognitionHandler
+
+    def start(self):
+        """Empieza a atender peticiones en segundo plano. Devuelve el puerto."""
+        self._server = _RecognitionServer((self.host, self.port), self._make_handler())
+        self.port = self._server.server_address[1]
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="recognition-http", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
@@ -0,0 +1,231 @@
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+PARTITION_PATTERN = re.compile(r'^access_logs_(\d{4})_(\d{2})\.db$')
+
+ARCHIVE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {schema}access_logs (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        user_name TEXT,
+        timestamp TIMESTAMP,
+        access_granted BOOLEAN,
+        confidence REAL,
+        camera_id TEXT
+    )
+'''
+
+LOG_COLUMNS = 'id, user_id, user_name, timestamp, access_granted, confidence, camera_id'
+
+
+def month_bounds(year, month):
+    """Devuelve los timestamps de inicio (incluido) y fin (excluido) de un mes."""
+    start = f"{year:04d}-{month:02d}-01 00:00:00"
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return start, f"{year:04d}-{month:02d}-01 00:00:00"
+
+
+def shift_month(year, month, delta):
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def list_partitions(archive_dir):
+    """
+    Particiones archivadas de una carpeta.
+    Returns:
+        Lista ordenada de (year, month, path)
+    """
+    if not os.path.isdir(archive_dir):
+        return []
+    partitions = []
+    for filename in os.listdir(archive_dir):
+        match = PARTITION_PATTERN.match(filename)
+        if match:
+            year, month = int(match.group(1)), int(match.group(2))
+            partitions.append((year, month, os.path.join(archive_dir, filename)))
+    return sorted(partitions)
+
+
+def recent_archived_logs(archive_dir, limit):
+    """
+    Últimos logs de las particiones archivadas, del más reciente al más antiguo.
+    Completa los "últimos accesos" cuando el mes en curso tiene pocos (p. ej. a
+    principio de mes, tras compactar). Solo abre las particiones necesarias.
+    Returns:
+        Lista de (user_name, access_granted, confidence, timestamp)
+    """
+    rows = []
+    for _, _, path in reversed(list_partitions(archive_dir)):
+        if len(rows) >= limit:
+            break
+        conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+        try:
+            rows.extend(conn.execute('''
+                SELECT user_name, access_granted, confidence, timestamp
+                FROM access_logs
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            ''', (limit - len(rows),)).fetchall())
+        finally:
+            conn.close()
+    return rows
+
+
+class LogPartitionManager:
+    """
+    Particionado mensual de los logs de acceso.
+    La base de datos principal solo guarda el mes en curso (partición caliente);
+    los meses cerrados se mueven a bases de datos de archivo, una por mes
+    (archive_dir/access_logs_AAAA_MM.db), que se compactan con VACUUM, se
+    eliminan según la política de retención y se pueden exportar a Parquet.
+    Los contadores de estadísticas no cambian al mover los logs.
+    """
+
+    def __init__(self, db_manager, archive_dir='log_archive', retention_months=12):
+        """
+        Args:
+            db_manager: DatabaseManager de la base de datos principal
+            archive_dir: Carpeta de las particiones archivadas
+            retention_months: Meses de archivo que se conservan (None = sin límite)
+        """
+        self.db_manager = db_manager
+        self.archive_dir = archive_dir
+        self.retention_months = retention_months
+
+    def partition_path(self, year, month):
+        return os.path.join(self.archive_dir, f"access_logs_{year:04d}_{month:02d}.db")
+
+    def list_partitions(self):
+        """
+        Particiones archivadas.
+        Returns:
+            Lista ordenada de (year, month, path)
+        """
+        return list_partitions(self.archive_dir)
+
+    def partitions_between(self, start=None, end=None):
+        """Rutas de las particiones archivadas que se solapan con el rango [start, end)."""
+        paths = []
+        for year, month, path in self.list_partitions():
+            month_start, month_end = month_bounds(year, month)
+            if (start is None or month_end > start) and (end is None or month_start < end):
+                paths.append(path)
+        return paths
+
+    def _closed_months_in_hot(self, now):
+        """Meses anteriores al actual que todavía tienen filas en la base principal."""
+        current_start, _ = month_bounds(now.year, now.month)
+        cursor = self.db_manager._get_connection().cursor()
+        cursor.execute('''
+            SELECT DISTINCT strftime('%Y', timestamp), strftime('%m', timestamp)
+            FROM access_logs WHERE timestamp < ?
+        ''', (current_start,))
+        return sorted((int(year), int(month)) for year, month in cursor.fetchall())
+
+    def _archive_month(self, year, month):
+        """Mueve las filas de un mes cerrado a su partición de archivo."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = self.partition_path(year, month)
+        start, end = month_bounds(year, month)
+
+        conn = self.db_manager._get_connection()
+        conn.execute('ATTACH DATABASE ? AS archive', (path,))
+        try:
+            with conn:
+                conn.execute(ARCHIVE_SCHEMA.format(schema='archive.'))
+                # OR IGNORE: si una ejecución anterior se interrumpió, no se duplican filas
+                moved = conn.execute(f'''
+                    INSERT OR IGNORE INTO archive.access_logs ({LOG_COLUMNS})
+                    SELECT {LOG_COLUMNS} FROM main.access_logs
+                    WHERE timestamp >= ? AND timestamp < ?
+                    ORDER BY id
+                ''', (start, end)).rowcount
+                conn.execute(
+                    'DELETE FROM main.access_logs WHERE timestamp >= ? AND timestamp < ?',
+                    (start, end)
+                )
+        finally:
+            conn.execute('DETACH DATABASE archive')
+
+        # Compactar la partición archivada
+        archive = sqlite3.connect(path)
+        try:
+            archive.execute(
+                'CREATE INDEX IF NOT EXISTS idx_access_logs_timestamp ON access_logs(timestamp)'
+            )
+            archive.commit()
+            archive.execute('VACUUM')
+        finally:
+            archive.close()
+        return moved
+
+    def apply_retention(self, now=None):
+        """Elimina las particiones archivadas más antiguas que la retención."""
+        if self.retention_months is None:
+            return []
+        now = now or datetime.now(timezone.utc)
+        cutoff = shift_month(now.year, now.month, -self.retention_months)
+        removed = []
+        for year, month, path in self.list_partitions():
+            if (year, month) < cutoff:
+                os.remove(path)
+                removed.append(path)
+        return removed
+
+    def compact(self, now=None, vacuum_hot=False):
+        """
+        Ejecuta el mantenimiento: archiva los meses cerrados, aplica la
+        retención y libera espacio en la base principal.
+        Args:
+            vacuum_hot: Hace VACUUM completo de la base principal (bloquea brevemente las escrituras)
+        Returns:
+            Reporte {archived: {mes: filas}, removed: [rutas]}
+        """
+        now = now or datetime.now(timezone.utc)
+        self.db_manager.flush()
+
+        archived = {}
+        for year, month in self._closed_months_in_hot(now):
+            archived[f"{year:04d}-{month:02d}"] = self._archive_month(year, month)
+
+        removed = self.apply_retention(now)
+
+        conn = self.db_manager._get_connection()
+        if vacuum_hot:
+            conn.execute('VACUUM')
+        else:
+            conn.execute('PRAGMA incremental_vacuum').fetchall()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        return {'archived': archived, 'removed': removed}
+
+    def export(self, output_dir, overwrite=False):
+        """
+        Exporta las particiones archivadas (meses cerrados) a Parquet.
+        Las particiones se abren en solo lectura, sin bloquear el sistema en vivo.
+        Returns:
+            Lista de archivos escritos
+        """
+        import pandas as pd
+
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+        for year, month, path in self.list_partitions():
+            target = os.path.join(output_dir, f"access_logs_{year:04d}_{month:02d}.parquet")
+            if os.path.exists(target) and not overwrite:
+                continue
+            conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+            try:
+                df = pd.read_sql_query(
+                    f'SELECT {LOG_COLUMNS} FROM access_logs ORDER BY id', conn,
+                    parse_dates=['timestamp']
+                )
+            finally:
+                conn.close()
+            df['access_granted'] = df['access_granted'].astype(bool)
+            df.to_parquet(target, index=False)
+            written.append(target)
+        return written
@@ -0,0 +1,281 @@
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+PREFIX = 'face_access'
+
+# Límites de los buckets (segundos), como en los histogramas de Prometheus
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RollingHistogram:
+    """
+    Histograma de latencias de una etapa.
+    Acumula conteos por bucket, suma y total desde el arranque (para Prometheus)
+    y guarda las últimas observaciones para calcular percentiles recientes.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)  # El último es +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self._recent.append(value)
+
+    def recent(self):
+        with self._lock:
+            return np.fromiter(self._recent, dtype=np.float64, count=len(self._recent))
+
+    def quantile(self, q):
+        """Percentil (0-1) de las observaciones recientes, o None si no hay."""
+        values = self.recent()
+        return float(np.quantile(values, q)) if values.size else None
+
+
+class _Timer:
+    __slots__ = ('registry', 'stage', 'start')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Temporizador vacío: lo que se usa con las métricas desactivadas."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas: latencia por etapa (histogramas), contadores y gauges.
+    Desactivado, timer() devuelve un temporizador vacío compartido y inc()/observe()
+    salen en la primera comprobación, así que la instrumentación casi no cuesta.
+    """
+
+    def __init__(self, enabled=False, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._textfile_thread = None
+        self._stop_event = threading.Event()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def timer(self, stage):
+        """Context manager que mide la duración de una etapa."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, RollingHistogram(window=self.window))
+        return histogram
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self.histogram(stage).observe(seconds)
+
+    def inc(self, name, value=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def fps(self, stage='frame'):
+        """Frames por segundo según la duración media reciente de la etapa del bucle."""
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            return None
+        values = histogram.recent()
+        return float(1.0 / values.mean()) if values.size and values.mean() > 0 else None
+
+    def snapshot(self):
+        """
+        Resumen actual: {stages: {etapa: {count, mean_ms, p50_ms, p99_ms}}, counters, gauges}.
+        La media es desde el arranque; los percentiles, de las últimas observaciones.
+        """
+        stages = {}
+        for stage, histogram in sorted(self.histograms.items()):
+            p50, p99 = histogram.quantile(0.5), histogram.quantile(0.99)
+            stages[stage] = {
+                'count': histogram.count,
+                'mean_ms': histogram.sum / histogram.count * 1000 if histogram.count else None,
+                'p50_ms': p50 * 1000 if p50 is not None else None,
+                'p99_ms': p99 * 1000 if p99 is not None else None,
+            }
+        return {'stages': stages, 'counters': dict(self.counters), 'gauges': dict(self.gauges)}
+
+    # ==================== EXPORTACIÓN ====================
+
+    def render_prometheus(self):
+        """Métricas en formato de texto de Prometheus."""
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Latencia por etapa del procesamiento",
+            f"# TYPE {PREFIX}_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            with histogram._lock:
+                bucket_counts = list(histogram.bucket_counts)
+                count, total = histogram.count, histogram.sum
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        lines.append(f"# HELP {PREFIX}_stage_recent_seconds Percentiles de las últimas observaciones por etapa")
+        lines.append(f"# TYPE {PREFIX}_stage_recent_seconds gauge")
+        for stage, histogram in sorted(self.histograms.items()):
+            for q in (0.5, 0.9, 0.99):
+                value = histogram.quantile(q)
+                if value is not None:
+                    lines.append(f'{PREFIX}_stage_recent_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Escribe las métricas de forma atómica (compatible con el textfile collector de node_exporter)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def start_textfile_writer(self, path, interval=5.0):
+        """Reescribe el archivo de métricas periódicamente en segundo plano."""
+        def run():
+            while not self._stop_event.wait(interval):
+                self.write_textfile(path)
+            self.write_textfile(path)
+
+        self._stop_event.clear()
+        self._textfile_thread = threading.Thread(target=run, name="metrics-textfile", daemon=True)
+        self._textfile_thread.start()
+
+    def start_http_server(self, port=9100, host='127.0.0.1'):
+        """Sirve las métricas en http://host:port/metrics."""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop(self):
+        self._stop_event.set()
+        if self._textfile_thread is not None:
+            self._textfile_thread.join(timeout=2.0)
+            self._textfile_thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # ==================== OVERLAY ====================
+
+    def draw_overlay(self, frame, stages=('capture', 'detect', 'embed', 'match'), origin=(10, 90)):
+        """Dibuja FPS y la latencia p50 de las etapas principales sobre el frame."""
+        if not self.enabled:
+            return frame
+        import cv2
+
+        x, y = origin
+        fps = self.fps()
+        lines = [f"FPS: {fps:.1f}" if fps else "FPS: -"]
+        for stage in stages:
+            histogram = self.histograms.get(stage)
+            p50 = histogram.quantile(0.5) if histogram else None
+            if p50 is not None:
+                lines.append(f"{stage}: {p50 * 1000:.1f} ms")
+        for i, line in enumerate(lines):
+            cv2.putText(frame, line, (x, y + i * 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+        return frame
+
+
+# Registro compartido por todo el proceso (desactivado por defecto)
+registry = MetricsRegistry()
+timer = registry.timer
+observe = registry.observe
+inc = registry.inc
+set_gauge = registry.set_gauge
+
+
+def configure(port=None, textfile=None, interval=5.0):
+    """
+    Activa las métricas y, opcionalmente, su exportación.
+    Args:
+        port: Puerto local para servir /metrics por HTTP
+        textfile: Archivo de texto de Prometheus que se reescribe cada `interval` segundos
+    """
+    registry.enable()
+    if port is not None:
+        registry.start_http_server(port)
+    if textfile:
+        registry.start_textfile_writer(textfile, interval)
+    return registry
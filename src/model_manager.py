@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+import embeddings
+
+
+class ModelManager:
+    """
+    Ciclo de vida del modelo de reconocimiento.
+    Construye una sola vez el modelo Facenet y el detector de rostros, los deja
+    residentes en memoria y ejecuta una inferencia de calentamiento para que el
+    primer reconocimiento real no pague la construcción del grafo. Las
+    inferencias llaman al modelo directamente, sin pasar por la API de alto
+    nivel de DeepFace.
+    """
+
+    def __init__(self, model_name=embeddings.MODEL_NAME, embedding_version=embeddings.EMBEDDING_VERSION,
+                 intra_op_threads=None, inter_op_threads=None, warmup_batch_sizes=(1,)):
+        """
+        Args:
+            model_name: Modelo de DeepFace a cargar
+            embedding_version: Versión de embeddings (define el preprocesamiento, ver embeddings.PREPROCESSING)
+            intra_op_threads: Hilos de TensorFlow dentro de cada operación (None = por defecto)
+            inter_op_threads: Hilos de TensorFlow entre operaciones (None = por defecto)
+            warmup_batch_sizes: Tamaños de lote con los que se calienta el modelo
+        """
+        self.model_name = model_name
+        self.embedding_version = embedding_version
+        preprocessing = embeddings.preprocessing_for(embedding_version)
+        self.detector_backend = preprocessing['detector_backend']
+        self.align = preprocessing['align']
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.warmup_batch_sizes = tuple(warmup_batch_sizes)
+
+        self.model = None
+        self.detector = None
+        self.target_size = None
+        self.load_time = None
+        self._lock = threading.Lock()
+
+    @property
+    def spec(self):
+        """(modelo, versión) de los embeddings que calcula."""
+        return self.model_name, self.embedding_version
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def _configure_threads(self):
+        """Fija los hilos de TensorFlow; solo tiene efecto antes de la primera operación."""
+        if self.intra_op_threads is None and self.inter_op_threads is None:
+            return
+        import tensorflow as tf
+        try:
+            if self.intra_op_threads is not None:
+                tf.config.threading.set_intra_op_parallelism_threads(self.intra_op_threads)
+            if self.inter_op_threads is not None:
+                tf.config.threading.set_inter_op_parallelism_threads(self.inter_op_threads)
+        except RuntimeError as e:
+            # TensorFlow ya se inicializó en este proceso (otro componente lo usó antes)
+            print(f"No se pudieron fijar los hilos de TensorFlow: {e}")
+
+    def load(self):
+        """Construye el modelo y el detector (una sola vez) y los calienta."""
+        if self.model is not None:
+            return self
+        with self._lock:
+            if self.model is not None:
+                return self
+            start = time.perf_counter()
+            self._configure_threads()
+
+            from deepface import DeepFace
+            from deepface.detectors import FaceDetector
+
+            model = DeepFace.build_model(self.model_name)
+            self.detector = FaceDetector.build_model(self.detector_backend)
+            self.target_size = tuple(model.input_shape[1:3])
+
+            # Calentamiento: la primera inferencia de cada forma construye el grafo
+            for batch_size in self.warmup_batch_sizes:
+                model(np.zeros((batch_size, *self.target_size, 3), dtype=np.float32), training=False)
+
+            self.model = model
+            self.load_time = time.perf_counter() - start
+        return self
+
+    def preprocess(self, img, enforce_detection=True):
+        """Detecta, alinea y redimensiona los rostros de una imagen (ver embeddings.preprocess_faces)."""
+        self.load()
+        return embeddings.preprocess_faces(img, enforce_detection, target_size=self.target_size,
+                                           detector_backend=self.detector_backend, align=self.align,
+                                           face_detector=self.detector)
+
+    def embed(self, batch):
+        """
+        Calcula los embeddings de un lote de rostros preprocesados.
+        Args:
+            batch: Lista o array (n, alto, ancho, 3) de rostros preprocesados
+        Returns:
+            Matriz float32 (n_rostros, dim)
+        """
+        self.load()
+        if len(batch) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+        batch = np.asarray(np.stack(batch) if isinstance(batch, list) else batch, dtype=np.float32)
+        return np.asarray(self.model(batch, training=False), dtype=np.float32)
+
+    def embed_image(self, img, enforce_detection=True):
+        """Embeddings de todos los rostros de una imagen (lista de vectores float32)."""
+        return list(self.embed(self.preprocess(img, enforce_detection)))
+
+
+_worker_model = None
+
+
+def init_worker(model_name, embedding_version, intra_op_threads=None, low_priority=False):
+    """
+    Inicializador de los pools de procesos (registro masivo, migración de embeddings):
+    carga y calienta el modelo de la versión indicada una sola vez por proceso.
+    Args:
+        low_priority: Baja la prioridad del proceso para no competir con el reconocimiento en vivo
+    """
+    global _worker_model
+    if low_priority and hasattr(os, 'nice'):
+        os.nice(10)
+    _worker_model = ModelManager(
+        model_name=model_name, embedding_version=embedding_version,
+        intra_op_threads=intra_op_threads, inter_op_threads=1
+    ).load()
+
+
+def worker_model():
+    """ModelManager cargado por init_worker en este proceso."""
+    return _worker_model
+
+
+def threads_per_worker(workers):
+    """Reparte los núcleos entre procesos para no sobresuscribir la CPU."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
@@ -0,0 +1,238 @@
+import multiprocessing as mp
+import queue
+
+import cv2
+
+from detection import create_detector
+from scheduler import RecognitionScheduler
+from tracking import FaceTracker
+
+
+# Fin de una fuente: se envía por la cola de ROIs (después de sus últimos rostros) y el
+# proceso principal responde por la cola de resultados cuando ya no le queda ninguno
+END_OF_STREAM = None
+
+
+def parse_source(source):
+    """Convierte '0' en índice de dispositivo; URLs RTSP y rutas de video se dejan igual."""
+    source = str(source).strip()
+    return int(source) if source.isdigit() else source
+
+
+def drain(camera_id, roi_queue, result_queue, stop_event, deliver):
+    """Avisa del fin de la fuente y entrega los resultados pendientes hasta la confirmación."""
+    while not stop_event.is_set():
+        try:
+            roi_queue.put((camera_id, END_OF_STREAM, None), timeout=0.1)
+            break
+        except queue.Full:
+            continue
+    while not stop_event.is_set():
+        try:
+            track_id, result = result_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if track_id is END_OF_STREAM:
+            return
+        deliver(track_id, result)
+
+
+def camera_worker(camera_id, source, roi_queue, event_queue, result_queue, stop_event, display,
+                  recognition_budget=None, detector_options=None):
+    """
+    Proceso de captura y detección para una cámara.
+    Envía los rostros a reconocer al proceso principal (que tiene el modelo y la
+    galería compartidos) y recibe de vuelta los resultados de sus tracks.
+    Cuando la fuente se acaba (p. ej. un archivo de video), espera los resultados
+    de los rostros que aún estaban en reconocimiento antes de terminar.
+    """
+    cap = cv2.VideoCapture(parse_source(source))
+    if not cap.isOpened():
+        event_queue.put(('error', camera_id, f"No se pudo abrir la fuente: {source}"))
+        event_queue.put(('done', camera_id, None))
+        return
+
+    try:
+        detector = create_detector(**(detector_options or {}))
+    except (FileNotFoundError, ValueError) as e:
+        cap.release()
+        event_queue.put(('error', camera_id, f"No se pudo crear el detector: {e}"))
+        event_queue.put(('done', camera_id, None))
+        return
+    tracker = FaceTracker()
+    scheduler = RecognitionScheduler(tracker, max_rate=recognition_budget)
+    window = f'Control de Acceso - {camera_id}'
+    frames = 0
+
+    def deliver(track_id, result):
+        if tracker.assign_result(track_id, result):
+            event_queue.put(('decision', camera_id, result))
+
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                drain(camera_id, roi_queue, result_queue, stop_event, deliver)
+                break
+            frames += 1
+
+            faces = detector.detect(frame)
+
+            tracks = tracker.update(faces)
+            for track, reason in scheduler.select(frame, tracks):
+                x, y, w, h = track.box
+                try:
+                    roi_queue.put_nowait((camera_id, track.id, frame[y:y+h, x:x+w].copy()))
+                    scheduler.mark_submitted(frame, track, reason)
+                except queue.Full:
+                    scheduler.cancel(track)  # Se reintenta en el siguiente frame
+
+            # Resultados del reconocimiento compartido
+            while True:
+                try:
+                    track_id, result = result_queue.get_nowait()
+                except queue.Empty:
+                    break
+                deliver(track_id, result)
+
+            if display:
+                for track in tracks:
+                    x, y, w, h = track.box
+                    if track.verified:
+                        color, label = (0, 255, 0), f"OK: {track.result['name']}"
+                    elif track.result is None:
+                        color, label = (0, 255, 255), "Verificando..."
+                    else:
+                        color, label = (0, 0, 255), "X: Desconocido"
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+                    cv2.putText(frame, label, (x, y-10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+
+                cv2.putText(frame, f"Camara: {camera_id}", (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                cv2.imshow(window, frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    stop_event.set()
+    finally:
+        cap.release()
+        if display:
+            cv2.destroyWindow(window)
+        event_queue.put(('done', camera_id, frames))
+
+
+class MultiCameraRunner:
+    """
+    Control de acceso con varias cámaras.
+    Cada fuente (índice de dispositivo, URL RTSP o archivo de video) se captura y
+    procesa en su propio proceso; el reconocimiento usa el backend y la galería
+    del FaceAccessControlSystem del proceso principal.
+    """
+
+    def __init__(self, system, sources, display=True, num_workers=2, max_pending=16,
+                 recognition_budget=5.0):
+        """
+        Args:
+            system: FaceAccessControlSystem que reconoce y registra los accesos
+            sources: Lista de fuentes de video
+            display: Muestra una ventana por cámara
+            num_workers: Hilos de reconocimiento en el proceso principal
+            max_pending: Rostros máximos en espera de reconocimiento (entre todas las cámaras)
+            recognition_budget: Máximo de reconocimientos por segundo de cada cámara
+        """
+        self.system = system
+        self.sources = list(sources)
+        self.display = display
+        self.num_workers = num_workers
+        self.max_pending = max_pending
+        self.recognition_budget = recognition_budget
+
+    def run(self):
+        from pipeline import RecognitionPipeline
+
+        # 'spawn' evita heredar por fork el estado de TensorFlow del proceso principal
+        ctx = mp.get_context('spawn')
+        roi_queue = ctx.Queue(maxsize=self.max_pending)
+        event_queue = ctx.Queue()
+        stop_event = ctx.Event()
+        result_queues = {}
+        processes = {}
+
+        for index, source in enumerate(self.sources):
+            camera_id = f"cam{index}"
+            result_queues[camera_id] = ctx.Queue()
+            process = ctx.Process(
+                target=camera_worker,
+                args=(camera_id, source, roi_queue, event_queue,
+                      result_queues[camera_id], stop_event, self.display,
+                      self.recognition_budget, self.system.detector_options),
+                name=f"camera-{camera_id}",
+                daemon=True
+            )
+            process.start()
+            processes[camera_id] = process
+            print(f"Cámara {camera_id}: {source}")
+
+        pipeline = RecognitionPipeline(
+            self.system.recognize_face, num_workers=self.num_workers,
+            max_queue_size=self.max_pending, track_discarded=True
+        ).start()
+
+        active = set(result_queues)
+        frames = {}
+        # Rostros de cada cámara en reconocimiento, y cámaras cuya fuente terminó
+        outstanding = dict.fromkeys(result_queues, 0)
+        draining = set()
+        try:
+            while active:
+                # Rostros enviados por las cámaras
+                try:
+                    camera_id, track_id, roi = roi_queue.get(timeout=0.05)
+                    if track_id is END_OF_STREAM:
+                        draining.add(camera_id)
+                    else:
+                        outstanding[camera_id] += 1
+                        pipeline.submit(roi, tag=(camera_id, track_id))
+                except queue.Empty:
+                    pass
+
+                for (camera_id, track_id), result in pipeline.poll_results():
+                    outstanding[camera_id] -= 1
+                    result_queues[camera_id].put((track_id, result))
+                for camera_id, _ in pipeline.poll_discarded():
+                    outstanding[camera_id] -= 1
+
+                # Cámaras sin fuente ni rostros pendientes: ya pueden terminar
+                for camera_id in [c for c in draining if outstanding[c] == 0]:
+                    draining.discard(camera_id)
+                    result_queues[camera_id].put((END_OF_STREAM, None))
+
+                # Decisiones y avisos de las cámaras
+                while True:
+                    try:
+                        kind, camera_id, payload = event_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if kind == 'decision':
+                        self.system._handle_recognition_result(payload, camera_id=camera_id)
+                    elif kind == 'error':
+                        print(payload)
+                    elif kind == 'done':
+                        active.discard(camera_id)
+                        frames[camera_id] = payload
+                
+                # Procesos que terminaron sin avisar (p. ej. por un error)
+                for camera_id in list(active):
+                    if not processes[camera_id].is_alive() and event_queue.empty():
+                        print(f"La cámara {camera_id} terminó inesperadamente")
+                        active.discard(camera_id)
+        except KeyboardInterrupt:
+            print("\nDeteniendo sistema...")
+        finally:
+            stop_event.set()
+            pipeline.stop()
+            for process in processes.values():
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+        return frames
@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+import time
+
+import cv2
+
+import metrics
+from scheduler import RecognitionScheduler
+from tracking import FaceTracker
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+class DecisionWriter:
+    """Escribe las decisiones de acceso en access_logs, CSV o JSONL."""
+
+    FIELDS = ['source', 'frame', 'time_s', 'track_id', 'user_id', 'name',
+              'granted', 'confidence', 'x', 'y', 'w', 'h']
+
+    def __init__(self, system, output=None):
+        """
+        Args:
+            system: FaceAccessControlSystem (para escribir en access_logs)
+            output: None para access_logs, o ruta .csv / .jsonl
+        """
+        self.system = system
+        self.output = output
+        self._file = None
+        self._csv = None
+
+        if output:
+            extension = os.path.splitext(output)[1].lower()
+            if extension not in ('.csv', '.jsonl'):
+                raise ValueError("La salida debe ser un archivo .csv o .jsonl")
+            self._file = open(output, 'w', newline='', encoding='utf-8')
+            if extension == '.csv':
+                self._csv = csv.DictWriter(self._file, fieldnames=self.FIELDS)
+                self._csv.writeheader()
+
+    def write(self, decision):
+        if self._file is None:
+            self.system.log_access(
+                decision['user_id'], decision['name'], decision['granted'],
+                decision['confidence'], decision['source']
+            )
+        elif self._csv is not None:
+            self._csv.writerow(decision)
+        else:
+            self._file.write(json.dumps(decision, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class OfflineProcessor:
+    """
+    Control de acceso sin interfaz sobre video grabado y carpetas de imágenes.
+    Usa la misma detección (Haar), seguimiento y reconocimiento que el modo en
+    vivo, sin cámara ni ventanas, y mide el rendimiento de cada etapa con el
+    registro de métricas compartido (el mismo que instrumenta el reconocimiento).
+    """
+
+    def __init__(self, system, output=None, frame_step=1):
+        """
+        Args:
+            system: FaceAccessControlSystem con el modelo y la galería
+            output: None para access_logs, o ruta .csv / .jsonl
+            frame_step: Procesa uno de cada N frames de los videos
+        """
+        self.system = system
+        self.writer = DecisionWriter(system, output)
+        self.frame_step = max(1, frame_step)
+        # Las imágenes sueltas no tienen continuidad: detector a resolución completa
+        self.image_detector = system.create_detector(fast=False)
+        metrics.registry.enable()
+        self.frames = 0
+        self.faces = 0
+        self.decisions = 0
+
+    def _decide(self, source, frame_index, time_s, track_id, box, result):
+        x, y, w, h = (int(v) for v in box)
+        granted = bool(result and result['verified'])
+        decision = {
+            'source': source,
+            'frame': frame_index,
+            'time_s': round(time_s, 3),
+            'track_id': track_id,
+            'user_id': result['user_id'] if granted else None,
+            'name': result['name'] if granted else 'Desconocido',
+            'granted': granted,
+            'confidence': round(1 - result['distance'], 4) if granted else 0,
+            'x': x, 'y': y, 'w': w, 'h': h,
+        }
+        with metrics.timer('log'):
+            self.writer.write(decision)
+        self.decisions += 1
+
+    def _detect(self, frame, detector):
+        with metrics.timer('detect'):
+            faces = detector.detect(frame)
+        self.faces += len(faces)
+        return faces
+
+    def process_video(self, path):
+        """Procesa un archivo de video con seguimiento de rostros (tiempo de video)."""
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            print(f"No se pudo abrir el video: {path}")
+            return
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        detector = self.system.create_detector()
+        tracker = FaceTracker()
+        # Sin presupuesto: en modo offline se procesa todo lo que dispara un evento
+        scheduler = RecognitionScheduler(tracker)
+        source = os.path.basename(path)
+        frame_index = -1
+
+        while True:
+            with metrics.timer('decode'):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            frame_index += 1
+            if frame_index % self.frame_step:
+                continue
+            self.frames += 1
+            now = frame_index / fps
+
+            faces = self._detect(frame, detector)
+            tracks = tracker.update(faces, now=now)
+            for track, reason in scheduler.select(frame, tracks, now=now):
+                x, y, w, h = track.box
+                scheduler.mark_submitted(frame, track, reason, now=now)
+                result = self.system.recognize_face(frame[y:y+h, x:x+w])
+                if tracker.assign_result(track.id, result, now=now):
+                    self._decide(source, frame_index, now, track.id, track.box, result)
+
+        cap.release()
+
+    def process_image(self, path):
+        """Procesa una imagen: cada rostro detectado es una decisión independiente."""
+        with metrics.timer('decode'):
+            frame = cv2.imread(path)
+        if frame is None:
+            print(f"No se pudo leer la imagen: {path}")
+            return
+        self.frames += 1
+        source = os.path.basename(path)
+
+        for (x, y, w, h) in self._detect(frame, self.image_detector):
+            result = self.system.recognize_face(frame[y:y+h, x:x+w])
+            self._decide(source, 0, 0.0, None, (x, y, w, h), result)
+
+    def process(self, sources):
+        """
+        Procesa una lista de videos, imágenes o carpetas de imágenes.
+        Returns:
+            Reporte de rendimiento (ver report())
+        """
+        start = time.perf_counter()
+        try:
+            for source in sources:
+                if os.path.isdir(source):
+                    for name in sorted(os.listdir(source)):
+                        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                            self.process_image(os.path.join(source, name))
+                elif os.path.splitext(source)[1].lower() in IMAGE_EXTENSIONS:
+                    self.process_image(source)
+                else:
+                    self.process_video(source)
+        finally:
+            self.writer.close()
+        return self.report(time.perf_counter() - start)
+
+    def report(self, elapsed):
+        elapsed = max(elapsed, 1e-9)
+        return {
+            'elapsed_s': elapsed,
+            'frames': self.frames,
+            'faces': self.faces,
+            'decisions': self.decisions,
+            'frames_per_s': self.frames / elapsed,
+            'faces_per_s': self.faces / elapsed,
+            # Incluye las etapas internas del reconocimiento (preprocess, embed, match...)
+            'stages': metrics.registry.snapshot()['stages'],
+        }
+
+
+def print_report(report):
+    """Muestra el reporte de rendimiento en consola."""
+    print("\n" + "="*60)
+    print("REPORTE DE RENDIMIENTO")
+    print("="*60)
+    print(f"  • Tiempo total: {report['elapsed_s']:.2f} s")
+    print(f"  • Frames procesados: {report['frames']} ({report['frames_per_s']:.1f} frames/s)")
+    print(f"  • Rostros detectados: {report['faces']} ({report['faces_per_s']:.1f} rostros/s)")
+    print(f"  • Decisiones de acceso: {report['decisions']}")
+    print(f"\n  {'Etapa':12s} {'n':>7s} {'media':>9s} {'p50':>9s} {'p99':>9s}  (ms)")
+    for stage, s in report['stages'].items():
+        p50 = f"{s['p50_ms']:9.2f}" if s['p50_ms'] is not None else f"{'-':>9s}"
+        p99 = f"{s['p99_ms']:9.2f}" if s['p99_ms'] is not None else f"{'-':>9s}"
+        print(f"  {stage:12s} {s['count']:7d} {s['mean_ms']:9.2f} {p50} {p99}")
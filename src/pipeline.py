@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+
+
+class RecognitionPipeline:
+    """
+    Pipeline productor/consumidor para el reconocimiento facial.
+    El bucle de captura encola rostros (ROIs) sin bloquearse y uno o más
+    hilos de reconocimiento los procesan en segundo plano. La cola está
+    acotada: cuando se llena se descartan frames según la política elegida.
+    """
+
+    DROP_OLDEST = 'drop_oldest'   # Descarta el rostro más antiguo de la cola
+    DROP_NEWEST = 'drop_newest'   # Descarta el rostro que se intenta encolar
+
+    def __init__(self, recognize_fn, num_workers=1, max_queue_size=2,
+                 drop_policy=DROP_OLDEST, max_age=None, track_discarded=False):
+        """
+        Args:
+            recognize_fn: Función que recibe un ROI y devuelve el resultado del reconocimiento
+            num_workers: Número de hilos de reconocimiento
+            max_queue_size: Tamaño máximo de la cola de rostros pendientes
+            drop_policy: DROP_OLDEST o DROP_NEWEST cuando la cola está llena
+            max_age: Segundos tras los cuales un rostro encolado se considera obsoleto
+            track_discarded: Guarda los tags de los rostros descartados o fallidos
+                             (ver poll_discarded)
+        """
+        if drop_policy not in (self.DROP_OLDEST, self.DROP_NEWEST):
+            raise ValueError(f"Política de descarte inválida: {drop_policy}")
+
+        self.recognize_fn = recognize_fn
+        self.num_workers = num_workers
+        self.drop_policy = drop_policy
+        self.max_age = max_age
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._submit_lock = threading.Lock()
+        self._results_lock = threading.Lock()
+        self._results = []
+        self.track_discarded = track_discarded
+        self._discarded = []
+        self._stop_event = threading.Event()
+        self._workers = []
+
+        # Contadores
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+
+    def start(self):
+        """Arranca los hilos de reconocimiento."""
+        self._stop_event.clear()
+        for i in range(self.num_workers):
+            worker = threading.Thread(
+                target=self._worker_loop, name=f"recognition-worker-{i}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout=5.0):
+        """Detiene los hilos; los rostros pendientes se descartan."""
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def submit(self, face_roi, tag=None):
+        """
+        Encola un rostro sin bloquear.
+        Args:
+            face_roi: Imagen del rostro (se recomienda pasar una copia)
+            tag: Identificador opaco que se devuelve junto al resultado
+        Returns:
+            True si el rostro quedó encolado
+        """
+        job = (tag, face_roi, time.monotonic())
+        with self._submit_lock:
+            self.submitted += 1
+            try:
+                self._queue.put_nowait(job)
+                return True
+            except queue.Full:
+                if self.drop_policy == self.DROP_NEWEST:
+                    self._discard(tag)
+                    return False
+
+            # DROP_OLDEST: se libera un hueco descartando el rostro más antiguo
+            try:
+                oldest_tag, _, _ = self._queue.get_nowait()
+                self._discard(oldest_tag)
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(job)
+                return True
+            except queue.Full:
+                self._discard(tag)
+                return False
+
+    def _discard(self, tag):
+        """Cuenta un rostro que no tendrá resultado (descartado o fallido)."""
+        with self._results_lock:
+            self.dropped += 1
+            if self.track_discarded:
+                self._discarded.append(tag)
+
+    def poll_results(self):
+        """Devuelve (y vacía) los resultados completados: lista de (tag, result)."""
+        with self._results_lock:
+            results, self._results = self._results, []
+        return results
+
+    def poll_discarded(self):
+        """Devuelve (y vacía) los tags de los rostros que no tendrán resultado."""
+        with self._results_lock:
+            discarded, self._discarded = self._discarded, []
+        return discarded
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                tag, face_roi, submitted_at = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            if self.max_age is not None and time.monotonic() - submitted_at > self.max_age:
+                self._discard(tag)
+                continue
+
+            try:
+                result = self.recognize_fn(face_roi)
+            except Exception as e:
+                print(f"Error en el reconocimiento: {e}")
+                self._discard(tag)
+                continue
+
+            with self._results_lock:
+                self._results.append((tag, result))
+                self.completed += 1
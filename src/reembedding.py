@@ -0,0 +1,161 @@
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from model_manager import init_worker, threads_per_worker, worker_model
+
+
+def _embed_user(user):
+    """Recalcula el embedding de un usuario desde su foto (se ejecuta en un proceso del pool)."""
+    import embeddings
+    user_id, name, photo_path = user
+    try:
+        if not photo_path or not os.path.exists(photo_path):
+            raise ValueError(f"No se encuentra la foto: {photo_path}")
+        embedding = worker_model().embed_image(photo_path, enforce_detection=False)[0]
+        return user_id, embeddings.encode_embedding(embedding), int(embedding.shape[0]), None
+    except Exception as e:
+        return user_id, None, None, str(e)
+
+
+class EmbeddingMigration:
+    """
+    Migración en segundo plano de los embeddings a otro modelo o preprocesamiento.
+    Recalcula los embeddings desde la foto de cada usuario en un pool de procesos,
+    por lotes y con un ritmo máximo, y los deja en pending_embeddings sin tocar los
+    que usa el reconocimiento. Se puede interrumpir y reanudar (lo calculado queda
+    en la base). Cuando están todos, activa la versión nueva en una sola transacción.
+    """
+
+    def __init__(self, db_manager, model_name=None, embedding_version=None, workers=None,
+                 batch_size=32, max_rate=None, retry_failed=False, allow_failures=False):
+        """
+        Args:
+            db_manager: DatabaseManager con los usuarios
+            model_name, embedding_version: Versión de destino (por defecto, la de este código)
+            workers: Procesos del pool (por defecto, la mitad de las CPUs)
+            batch_size: Usuarios por lote (y por transacción)
+            max_rate: Máximo de usuarios por segundo (None = sin límite)
+            retry_failed: Reintenta los usuarios que fallaron en ejecuciones anteriores
+            allow_failures: Activa la versión nueva aunque algunos usuarios hayan fallado
+        """
+        import embeddings
+
+        target_model, target_version = embeddings.target_spec()
+        self.db_manager = db_manager
+        self.target = (model_name or target_model,
+                       embedding_version if embedding_version is not None else target_version)
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        self.retry_failed = retry_failed
+        self.allow_failures = allow_failures
+
+    def status(self):
+        """Progreso hacia la versión de destino, con la versión activa."""
+        status = self.db_manager.get_reembedding_status(*self.target)
+        status['active'] = self.db_manager.get_active_embedding_spec()
+        status['target'] = self.target
+        return status
+
+    def _compute(self, executor, report, stop_event):
+        """Calcula los pendientes por lotes hasta que no quede ninguno (o se pida parar)."""
+        model_name, version = self.target
+        while not stop_event.is_set():
+            users = self.db_manager.get_users_to_reembed(model_name, version, limit=self.batch_size)
+            if not users:
+                return
+            start = time.monotonic()
+            rows = []
+            for user_id, blob, dim, error in executor.map(_embed_user, users):
+                rows.append((user_id, blob, model_name, dim, version, error))
+                if error:
+                    report['failed'] += 1
+                    report['failures'].append((user_id, error))
+                else:
+                    report['computed'] += 1
+            self.db_manager.save_pending_embeddings(rows)
+
+            status = self.db_manager.get_reembedding_status(model_name, version)
+            print(f"  {status['pending'] + status['failed']}/{status['total'] - status['current']} "
+                  f"calculados ({status['failed']} fallidos)")
+
+            # Ritmo máximo: el lote no puede tardar menos que len(users) / max_rate
+            if self.max_rate:
+                stop_event.wait(max(0.0, len(users) / self.max_rate - (time.monotonic() - start)))
+
+    def run(self, switch=True, stop_event=None):
+        """
+        Ejecuta (o reanuda) la migración.
+        Args:
+            switch: Activa la versión nueva al terminar
+            stop_event: threading.Event para detenerla desde otro hilo (se reanuda después)
+        Returns:
+            Reporte {target, computed, failed, failures, switched, status, elapsed_s}
+        """
+        start = time.perf_counter()
+        stop_event = stop_event or threading.Event()
+        report = {'target': self.target, 'computed': 0, 'failed': 0, 'failures': [],
+                  'switched': False, 'status': None}
+
+        self.db_manager.clear_pending_embeddings(*self.target)
+        if self.retry_failed:
+            self.db_manager.clear_pending_embeddings(*self.target, failed_only=True)
+
+        status = self.status()
+        if status['remaining'] == 0 and status['pending'] == 0 and status['failed'] == 0 \
+                and status['active'] == self.target:
+            report['status'] = status
+            report['elapsed_s'] = time.perf_counter() - start
+            return report
+
+        print(f"Migrando embeddings {status['active'][0]} v{status['active'][1]} -> "
+              f"{self.target[0]} v{self.target[1]}: {status['remaining']} usuario(s) por calcular "
+              f"con {self.workers} proceso(s)...")
+
+        ctx = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                 initializer=init_worker,
+                                 # Baja prioridad: el reconocimiento en vivo va primero
+                                 initargs=(*self.target, threads_per_worker(self.workers), True)) as executor:
+            while not stop_event.is_set():
+                self._compute(executor, report, stop_event)
+                if stop_event.is_set() or not switch:
+                    break
+                status = self.db_manager.switch_embedding_spec(*self.target, allow_failures=self.allow_failures)
+                if status['switched'] or not status['remaining']:
+                    report['switched'] = status['switched']
+                    break
+                # Se registraron usuarios mientras tanto: se calculan y se vuelve a intentar
+
+        report['status'] = self.status()
+        report['elapsed_s'] = time.perf_counter() - start
+        return report
+
+
+def print_report(report):
+    """Muestra el resumen de la migración."""
+    status = report['status']
+    print("\n" + "="*60)
+    print("MIGRACIÓN DE EMBEDDINGS")
+    print("="*60)
+    print(f"  • Versión activa: {status['active'][0]} v{status['active'][1]}")
+    print(f"  • Versión de destino: {report['target'][0]} v{report['target'][1]}")
+    print(f"  • Calculados en esta ejecución: {report['computed']} ✅")
+    print(f"  • Fallidos en esta ejecución: {report['failed']} ❌")
+    print(f"  • Pendientes de activar: {status['pending']} | fallidos: {status['failed']} | "
+          f"por calcular: {status['remaining']}")
+    if report['switched']:
+        print("  • Versión nueva activada")
+    elif status['active'] != tuple(report['target']):
+        if status['failed'] and not status['remaining']:
+            print("  • No se activó: hay usuarios fallidos (usa --retry-failed o --allow-failures)")
+        else:
+            print("  • No se activó todavía: vuelve a ejecutar para continuar")
+    print(f"  • Tiempo: {report.get('elapsed_s', 0.0):.1f} s")
+    if report['failures']:
+        print("\nFallos:")
+        for user_id, error in report['failures']:
+            print(f"  • Usuario {user_id}: {error}")
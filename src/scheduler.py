@@ -0,0 +1,165 @@
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+import metrics
+
+# Motivos de reconocimiento, en orden de prioridad
+NEW = 'new'            # Track nuevo (ya confirmado con min_hits detecciones)
+RETRY = 'retry'        # El reconocimiento anterior se perdió
+CHANGE = 'change'      # La región del rostro cambió de forma significativa
+DEADLINE = 'deadline'  # Venció el plazo de re-verificación según la confianza
+
+PRIORITY = {NEW: 0, RETRY: 1, CHANGE: 2, DEADLINE: 3}
+
+
+class TokenBucket:
+    """Presupuesto de inferencias por segundo con ráfagas acotadas."""
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate: Inferencias por segundo que se reponen
+            burst: Máximo de inferencias acumulables (por defecto, max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = None
+
+    def try_acquire(self, now):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class RecognitionScheduler:
+    """
+    Planificador de reconocimiento guiado por eventos.
+    En lugar de reconocer a intervalos fijos, envía un track a reconocer cuando
+    aparece, cuando su región del rostro cambia de forma significativa (otra
+    persona en la misma caja, giro, oclusión...) o cuando vence su plazo según
+    la confianza del último resultado. Todo dentro de un presupuesto de
+    inferencias por segundo: si no alcanza, se atienden primero los tracks
+    nuevos y los que llevan más tiempo sin verificar.
+    """
+
+    def __init__(self, tracker, max_rate=None, burst=None, change_threshold=0.5,
+                 min_change_interval=0.5, thumbnail_size=16):
+        """
+        Args:
+            tracker: FaceTracker que sigue los rostros (plazos, pendientes, resultados)
+            max_rate: Máximo de reconocimientos por segundo (None = sin límite)
+            burst: Reconocimientos que se pueden acumular para ráfagas
+            change_threshold: Diferencia media (miniaturas normalizadas) que cuenta como cambio
+            min_change_interval: Segundos mínimos desde el último reconocimiento para
+                                 disparar uno por cambio (evita repetir con cada movimiento)
+            thumbnail_size: Lado de la miniatura en escala de grises usada para comparar
+        """
+        self.tracker = tracker
+        self.budget = TokenBucket(max_rate, burst) if max_rate else None
+        self.change_threshold = change_threshold
+        self.min_change_interval = min_change_interval
+        self.thumbnail_size = thumbnail_size
+        self._references = {}  # track_id -> miniatura del rostro enviado a reconocer
+
+        # Contadores
+        self.triggers = Counter()
+        self.deferred = 0
+
+    def _thumbnail(self, frame, box):
+        """Miniatura en escala de grises normalizada (insensible a cambios de brillo/contraste)."""
+        x, y, w, h = box
+        roi = frame[max(y, 0):y+h, max(x, 0):x+w]
+        if roi.size == 0:
+            return None
+        if roi.ndim == 3:
+            roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(roi, (self.thumbnail_size, self.thumbnail_size),
+                           interpolation=cv2.INTER_AREA).astype(np.float32)
+        return (thumb - thumb.mean()) / (thumb.std() + 1e-6)
+
+    def _changed(self, frame, track, now):
+        if now - track.last_recognized < self.min_change_interval:
+            return False
+        reference = self._references.get(track.id)
+        if reference is None:
+            return False
+        thumb = self._thumbnail(frame, track.box)
+        if thumb is None:
+            return False
+        return float(np.abs(thumb - reference).mean()) >= self.change_threshold
+
+    def _reason(self, frame, track, now):
+        tracker = self.tracker
+        was_pending = track.pending_since is not None
+        if tracker.is_pending(track, now):
+            return None
+        if track.hits < tracker.min_hits:
+            return None
+        if was_pending:
+            return RETRY
+        if track.last_recognized is None:
+            return NEW
+        if now - track.last_recognized >= tracker.recognition_interval(track):
+            return DEADLINE
+        if self._changed(frame, track, now):
+            return CHANGE
+        return None
+
+    def select(self, frame, tracks, now=None):
+        """
+        Elige los tracks que se envían a reconocer en este frame.
+        Args:
+            frame: Frame actual (BGR o escala de grises)
+            tracks: Tracks visibles devueltos por FaceTracker.update
+        Returns:
+            Lista de (track, motivo) ordenada por prioridad
+        """
+        now = time.monotonic() if now is None else now
+
+        # Olvidar las referencias de tracks que ya no existen
+        for track_id in list(self._references):
+            if track_id not in self.tracker.tracks:
+                del self._references[track_id]
+
+        candidates = []
+        for track in tracks:
+            reason = self._reason(frame, track, now)
+            if reason is not None:
+                last = track.last_recognized if track.last_recognized is not None else track.first_seen
+                candidates.append((PRIORITY[reason], last, track, reason))
+        candidates.sort(key=lambda candidate: candidate[:2])
+
+        selected = []
+        for i, (_, _, track, reason) in enumerate(candidates):
+            if self.budget is not None and not self.budget.try_acquire(now):
+                # Sin presupuesto: el resto se reintenta en los siguientes frames
+                self.deferred += len(candidates) - i
+                metrics.inc('recognitions_deferred', len(candidates) - i)
+                break
+            selected.append((track, reason))
+        return selected
+
+    def mark_submitted(self, frame, track, reason, now=None):
+        """Registra que el track se envió a reconocer (guarda su miniatura de referencia)."""
+        self.tracker.mark_pending(track, now)
+        thumb = self._thumbnail(frame, track.box)
+        if thumb is not None:
+            self._references[track.id] = thumb
+        self.triggers[reason] += 1
+        metrics.inc(f'recognitions_{reason}')
+
+    def cancel(self, track):
+        """El envío no se pudo hacer (cola llena): se devuelve el presupuesto."""
+        if self.budget is not None:
+            self.budget.refund()
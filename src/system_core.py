@@ -1,15 +1,33 @@
 import cv2
-import numpy as np
-from deepface import DeepFace
 import os
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 from database import DatabaseManager  
 from assistants import IAAssistant
+from gallery import GalleryIndex
+from gallery_file import MAX_OVERLAY_CHANGES, QuantizedGallery, latest_gallery_file, publish_gallery_file, read_header
+from pipeline import RecognitionPipeline
+from tracking import FaceTracker
+from scheduler import RecognitionScheduler
+from detection import create_detector
+from embedding_service import EmbeddingService, EmbeddingServiceStopped
+from model_manager import ModelManager
+import embeddings
+import metrics
+
+# Segundos antes de reintentar un cambio de versión de embeddings que falló
+SPEC_SWITCH_RETRY = 30.0
+
 
 class FaceAccessControlSystem:
     """Sistema completo de control de acceso facial"""
-    def __init__(self, db_path='access_control.db', known_faces_dir='known_faces'):
+    def __init__(self, db_path='access_control.db', known_faces_dir='known_faces',
+                 approximate_search=False, n_probe=8, max_batch_size=16, max_batch_wait=0.01,
+                 intra_op_threads=None, inter_op_threads=None,
+                 detector_backend='haar', fast_detection=True, detection_max_width=640,
+                 gallery_file=None, gallery_dtype='int8', gallery_refresh_interval=1.0):
         
         """Inicializa el sistema."""
         self.known_faces_dir = known_faces_dir
@@ -18,16 +36,203 @@ class FaceAccessControlSystem:
         # Inicializar el manejador de base de datos
         self.db_manager = DatabaseManager(db_path=db_path)
         
+        # Versión de embeddings activa en la base de datos (modelo + preprocesamiento).
+        # El reconocimiento la usa hasta que una migración (reembed.py) complete y
+        # active otra; entonces cambia de modelo y galería a la vez.
+        self.embedding_spec = self.db_manager.get_active_embedding_spec()
+        # Umbral de distancia coseno (el mismo que aplica DeepFace.verify)
+        self.distance_threshold = embeddings.get_threshold(self.embedding_spec[0])
+        if self.embedding_spec != embeddings.target_spec():
+            print(f"Embeddings activos: {self.embedding_spec[0]} v{self.embedding_spec[1]} "
+                  f"(este código usa {embeddings.MODEL_NAME} v{embeddings.EMBEDDING_VERSION}). "
+                  f"Ejecuta 'python reembed.py' para migrarlos en segundo plano.")
+        
         # Crear directorio de caras conocidas
         Path(known_faces_dir).mkdir(exist_ok=True)
         
-        # Detector de rostros (Haar Cascade como respaldo)
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
+        # Detector de rostros ('haar' o 'dnn'). Los bucles en vivo usan el modo rápido
+        # (frame reducido + búsqueda alrededor de los rostros previos) si fast_detection;
+        # el registro siempre detecta a resolución completa.
+        self.detector_options = {
+            'backend': detector_backend, 'fast': fast_detection, 'max_width': detection_max_width
+        }
+        
+        # Modelo de reconocimiento y detector: se construyen una vez y quedan residentes.
+        # Servicio de embeddings: agrupa los rostros pendientes en una sola pasada del modelo.
+        self._model_options = {
+            'intra_op_threads': intra_op_threads, 'inter_op_threads': inter_op_threads,
+            'warmup_batch_sizes': (1, max_batch_size)
+        }
+        self._embedder_options = {'max_batch_size': max_batch_size, 'max_wait': max_batch_wait}
+        self.models, self.embedder = self._create_models(self.embedding_spec)
+        # Protege el par (embedder, galería) durante el cambio de versión de embeddings
+        self._serving_lock = threading.Lock()
+        self._spec_switch_thread = None
+        self._failed_spec = None  # Versión que no se pudo cargar (se reintenta)
+        self._spec_retry_at = 0.0
+        
+        # Galería en memoria con los embeddings de los usuarios.
+        # Se carga en el primer reconocimiento/registro (o con preload()), no al arrancar,
+        # para que las consultas que solo usan la base de datos no carguen el modelo.
+        # Después se mantiene al día con la tabla users: como mucho cada
+        # gallery_refresh_interval segundos comprueba si hubo cambios (de este u otro
+        # proceso) y carga solo las filas nuevas, modificadas o eliminadas.
+        # Con gallery_file, la galería se lee de un archivo cuantizado (float16/int8)
+        # mapeado en memoria y compartido entre procesos; cada reconstrucción se publica
+        # como una versión nueva (gallery.bin.<generación>).
+        if gallery_file and approximate_search:
+            raise ValueError("La galería en archivo solo admite búsqueda exacta (approximate_search=False)")
+        if gallery_dtype not in ('float16', 'int8'):
+            raise ValueError(f"Tipo de galería desconocido: {gallery_dtype} (usa 'float16' o 'int8')")
+        self.gallery_file = gallery_file
+        self.gallery_dtype = gallery_dtype
+        self._gallery_options = {'approximate': approximate_search, 'n_probe': n_probe}
+        self._gallery = GalleryIndex(**self._gallery_options)
+        self._gallery_loaded = False
+        self._gallery_lock = threading.Lock()
+        self._gallery_generation = None
+        self.gallery_refresh_interval = gallery_refresh_interval
+        self._next_gallery_check = 0.0
         
         print("Lógica del sistema cargada correctamente")
     
+    @property
+    def gallery(self):
+        """Galería de embeddings; se carga la primera vez que se usa y se mantiene al día."""
+        if not self._gallery_loaded:
+            with self._gallery_lock:
+                if not self._gallery_loaded:
+                    self._load_gallery()
+                    self._gallery_loaded = True
+                    self._next_gallery_check = time.monotonic() + (self.gallery_refresh_interval or 0.0)
+        elif self.gallery_refresh_interval is not None and time.monotonic() >= self._next_gallery_check:
+            self.refresh_gallery()
+        return self._gallery
+    
+    def refresh_gallery(self):
+        """
+        Aplica a la galería los cambios de la tabla users hechos desde este u otro
+        proceso (altas, embeddings recalculados, bajas), cargando solo esas filas.
+        Sin cambios solo cuesta un PRAGMA data_version.
+        Returns:
+            True si la galería se actualizó
+        """
+        if not self._gallery_loaded or not self._gallery_lock.acquire(blocking=False):
+            return False  # Aún no se cargó, u otro hilo ya la está actualizando
+        try:
+            self._next_gallery_check = time.monotonic() + (self.gallery_refresh_interval or 0.0)
+            if self._failed_spec is not None:
+                # Un cambio de versión anterior falló: se reintenta aunque no haya más cambios
+                spec = self.db_manager.get_active_embedding_spec()
+                if spec != self.embedding_spec:
+                    self._start_spec_switch(spec)
+                else:
+                    self._failed_spec = None
+            if not self.db_manager.users_changed():
+                return False
+            generation = self.db_manager.get_users_generation()
+            if generation == self._gallery_generation:
+                return False  # Cambiaron otras tablas (p. ej. los logs de acceso)
+            spec = self.db_manager.get_active_embedding_spec()
+            if spec != self.embedding_spec:
+                # Se activó otra versión de embeddings: el modelo nuevo se carga en segundo
+                # plano y, mientras tanto, se sigue reconociendo con la versión anterior
+                self._start_spec_switch(spec)
+                return False
+            self._apply_gallery_changes(generation)
+            return True
+        finally:
+            self._gallery_lock.release()
+    
+    def _create_models(self, spec):
+        """Modelo (sin cargar) y servicio de embeddings para una versión de embeddings."""
+        models = ModelManager(model_name=spec[0], embedding_version=spec[1], **self._model_options)
+        embedder = EmbeddingService(
+            embed_fn=models.embed, preprocess_fn=models.preprocess, **self._embedder_options
+        ).start()
+        return models, embedder
+    
+    def _start_spec_switch(self, spec):
+        if self._spec_switch_thread is not None and self._spec_switch_thread.is_alive():
+            return
+        if spec == self._failed_spec and time.monotonic() < self._spec_retry_at:
+            return  # Falló hace poco: se espera antes de volver a cargar el modelo
+        print(f"\nSe activó la versión de embeddings {spec[0]} v{spec[1]}; cargando el modelo nuevo...")
+        self._spec_switch_thread = threading.Thread(
+            target=self._switch_embedding_spec, args=(spec,), name="embedding-spec-switch", daemon=True
+        )
+        self._spec_switch_thread.start()
+    
+    def _switch_embedding_spec(self, spec):
+        """Prepara modelo y galería de la versión nueva y los pone en servicio a la vez."""
+        embedder = None
+        try:
+            models, embedder = self._create_models(spec)
+            models.load()
+            generation = self.db_manager.get_users_generation()
+            gallery = self._build_gallery(generation, embedder, spec)
+        except Exception as e:
+            print(f"No se pudo cambiar a la versión de embeddings {spec[0]} v{spec[1]}: {e} "
+                  f"(se reintenta en {SPEC_SWITCH_RETRY:.0f} s)")
+            if embedder is not None:
+                embedder.stop()
+            self._failed_spec = spec
+            self._spec_retry_at = time.monotonic() + SPEC_SWITCH_RETRY
+            return
+        
+        with self._gallery_lock, self._serving_lock:
+            old_embedder = self.embedder
+            self.models, self.embedder = models, embedder
+            self.embedding_spec = spec
+            self.distance_threshold = embeddings.get_threshold(spec[0])
+            self._gallery = gallery
+            self._gallery_generation = generation
+            self._failed_spec = None
+        # Las peticiones que ya tenía en cola se atienden; las que lleguen después fallan
+        # con EmbeddingServiceStopped y search_faces las repite con el modelo nuevo
+        old_embedder.stop()
+        print(f"Reconocimiento con embeddings {spec[0]} v{spec[1]} ({len(gallery)} usuarios)")
+    
+    def preload(self, background=True):
+        """
+        Carga y calienta por adelantado el modelo de reconocimiento y el detector
+        (DeepFace/TensorFlow), y la galería.
+        Args:
+            background: Carga en un hilo en segundo plano (p. ej. mientras el menú espera)
+        Returns:
+            El hilo de carga, o None si se cargó en primer plano
+        """
+        def load():
+            try:
+                self.models.load()
+                self.gallery
+            except Exception as e:
+                print(f"\nNo se pudo precargar el modelo de reconocimiento: {e}")
+        
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+    
+    def create_detector(self, fast=None):
+        """
+        Crea un detector de rostros con la configuración del sistema.
+        Cada flujo de video necesita el suyo (el modo rápido guarda estado entre frames).
+        Args:
+            fast: Fuerza (o desactiva) el modo rápido; None = según la configuración
+        """
+        options = dict(self.detector_options)
+        if fast is not None:
+            options['fast'] = fast
+        return create_detector(**options)
+
+    def close(self):
+        """Libera los recursos en segundo plano del sistema (y escribe los logs pendientes)."""
+        self.embedder.stop()
+        self.db_manager.close()
+
     def get_access_statistics(self):
         return self.db_manager.get_access_statistics()
         
@@ -35,20 +240,29 @@ class FaceAccessControlSystem:
     def get_all_users(self):
         return self.db_manager.get_all_users_info()
 
-    def log_access(self, user_id, user_name, granted, confidence):
-        self.db_manager.log_access(user_id, user_name, granted, confidence)
+    def query_access_logs(self, **filters):
+        return self.db_manager.query_access_logs(**filters)
 
-    def ask_ai(self, question):
-        """Pregunta al asistente IA (Inicialización perezosa)"""
+    def log_access(self, user_id, user_name, granted, confidence, camera_id=None):
+        self.db_manager.log_access(user_id, user_name, granted, confidence, camera_id)
+
+    def ask_ai(self, question, stream=False):
+        """
+        Pregunta al asistente IA (Inicialización perezosa)
+        Con stream=True devuelve un generador de fragmentos de texto.
+        """
         try:
             if self.ai is None:
-                self.ai = IAAssistant() 
-                
+                self.ai = IAAssistant(db_path=self.db_manager.db_path) 
+            
+            if stream:
+                return self.ai.chat_stream(question)
             return self.ai.chat(question)
             
         except Exception as e:
             self.ai = None 
-            return f"Error al consultar IA: {str(e)}"
+            error = f"Error al consultar IA: {str(e)}"
+            return iter([error]) if stream else error
 
     # === Lógica de Registro ===
     def register_user(self, name, email=None, photo_source='camera'):
@@ -73,16 +287,59 @@ class FaceAccessControlSystem:
                 print(f"No se encuentra la foto: {photo_path}")
                 return False
         
-        # 3. Verificar que la foto contiene un rostro detectable (usando DeepFace)
+        # 3. Verificar que la foto contiene un rostro y calcular su embedding (una sola vez)
+        #    (modelo y versión se toman juntos: puede haber un cambio de versión en curso)
+        while True:
+            with self._serving_lock:
+                embedder, spec = self.embedder, self.embedding_spec
+            try:
+                embedding = embedder.embed_image(photo_path, enforce_detection=True)[0]
+                print("Rostro detectado correctamente")
+                break
+            except EmbeddingServiceStopped as e:
+                if embedder is self.embedder:
+                    print(f"No se pudo calcular el embedding: {e}")
+                    return False
+            except Exception as e:
+                print(f"No se pudo detectar un rostro en la imagen: {e}")
+                return False
+        
+        # 4. Guardar en base de datos junto con el embedding (de la versión activa;
+        #    si hay una migración en curso, la recalcula junto con los demás)
+        user_id = self.db_manager.add_user(
+            name, email, photo_path,
+            embedding=embeddings.encode_embedding(embedding),
+            embedding_model=spec[0],
+            embedding_dim=int(embedding.shape[0]),
+            embedding_version=spec[1]
+        )
+        
+        # 5. Agregarlo a la galería en servicio (en modo archivo, como cambio en memoria
+        #    sobre el archivo mapeado, que se reescribe al acumular muchos cambios).
+        #    El usuario ya está guardado: si algo falla aquí, la siguiente actualización
+        #    de la galería lo carga desde la base de datos
         try:
-            DeepFace.represent(photo_path, model_name='Facenet', enforce_detection=True)
-            print("Rostro detectado correctamente")
+            generation = self.db_manager.get_user_generation(user_id)
+            if not self._gallery_loaded:
+                self.gallery  # Primera carga (ya incluye al usuario)
+            with self._gallery_lock:
+                # Se omite si la galería ya lo incluye (se cargó después del alta) o si
+                # cambió la versión de embeddings (la actualización lo recalcula)
+                if spec == self.embedding_spec and (
+                        self._gallery_generation is None or generation is None
+                        or self._gallery_generation < generation):
+                    gallery = self._gallery.copy()
+                    gallery.add(user_id, name, embedding)
+                    self._gallery = gallery
+                    # Si el alta es el único cambio desde la última carga, la galería queda
+                    # al día sin volver a leerlo; si no, la siguiente actualización carga
+                    # también los cambios de otros procesos
+                    if self._gallery_generation == generation - 1:
+                        self._gallery_generation = generation
+                    if self.gallery_file and getattr(gallery, 'n_changes', 0) > MAX_OVERLAY_CHANGES:
+                        self._rebuild_gallery_file()
         except Exception as e:
-            print(f"No se pudo detectar un rostro en la imagen: {e}")
-            return False
-        
-        # 4. Guardar en base de datos
-        user_id = self.db_manager.add_user(name, email, photo_path)
+            print(f"No se pudo actualizar la galería ({e}); se cargará en la próxima actualización")
         
         print(f"Usuario '{name}' registrado exitosamente (ID: {user_id})")
         return True
@@ -98,6 +355,8 @@ class FaceAccessControlSystem:
         
         print("Cámara activa. Presiona ESPACIO para capturar, ESC para cancelar")
         
+        # Para registrar se prioriza la precisión: detección a resolución completa
+        detector = self.create_detector(fast=False)
         captured = False
         frame_to_save = None
         
@@ -107,8 +366,7 @@ class FaceAccessControlSystem:
                 break
             
             # Detectar rostros para feedback visual
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+            faces = detector.detect(frame)
             
             # Dibujar rectángulos alrededor de rostros
             for (x, y, w, h) in faces:
@@ -146,69 +404,236 @@ class FaceAccessControlSystem:
         return None
 
     # === Lógica de Reconocimiento y Control ===
-    def recognize_face(self, image_path_or_array):
-        """Reconoce un rostro comparándolo con todos los usuarios registrados."""
-        # Obtener todos los usuarios registrados
-        users = self.db_manager.get_all_users_for_recognition()
+    def _get_user_embedding(self, user_id, photo_path, blob, model_name, dim, version,
+                            embedder=None, spec=None):
+        """
+        Devuelve el embedding guardado del usuario; lo calcula y guarda si falta o no es
+        de la versión activa.
+        Args:
+            embedder, spec: Servicio de embeddings y versión (por defecto, los activos)
+        """
+        embedder = embedder or self.embedder
+        spec = spec or self.embedding_spec
+        if blob is not None and embeddings.is_current(model_name, version, spec):
+            return embeddings.decode_embedding(blob, dim)
         
-        if len(users) == 0:
-            return {
-                'user_id': None, 'name': 'Desconocido', 'distance': 1.0, 
-                'verified': False, 'message': 'No hay usuarios registrados'
-            }
+        # Usuarios registrados antes de guardar embeddings (o que fallaron en una
+        # migración): se calcula una única vez
+        if self.db_manager.get_active_embedding_spec() != tuple(spec):
+            raise ValueError("la versión de embeddings activa cambió")
+        embedding = embedder.embed_image(photo_path, enforce_detection=False)[0]
+        self.db_manager.update_user_embedding(
+            user_id, embeddings.encode_embedding(embedding), spec[0],
+            int(embedding.shape[0]), spec[1]
+        )
+        return embedding
+
+    def _collect_gallery_entries(self, rows, embedder=None, spec=None):
+        """Embeddings (user_id, name, embedding) de las filas de usuarios dadas."""
+        entries = []
+        for user_id, name, photo_path, blob, model_name, dim, version in rows:
+            try:
+                embedding = self._get_user_embedding(
+                    user_id, photo_path, blob, model_name, dim, version, embedder, spec
+                )
+            except Exception as e:
+                print(f"No se pudo obtener el embedding de '{name}': {e}")
+                continue
+            entries.append((user_id, name, embedding))
+        return entries
+
+    def _gallery_file_current(self, header, spec=None):
+        """El archivo de galería se puede usar con la versión de embeddings y la configuración dadas."""
+        spec = spec or self.embedding_spec
+        return header is not None and header.get('generation') is not None \
+            and header['dtype'] == self.gallery_dtype \
+            and (header['model'], header['version']) == tuple(spec)
+
+    def _build_gallery(self, generation, embedder=None, spec=None):
+        """
+        Construye una galería nueva desde la base de datos (sin ponerla en servicio).
+        En modo archivo, reescribe el archivo de galería y lo abre.
+        Args:
+            generation: Generación de users tomada antes de leer los usuarios (lo que
+                        cambie en medio se vuelve a cargar en la siguiente actualización)
+            embedder, spec: Servicio de embeddings y versión (por defecto, los activos)
+        """
+        spec = spec or self.embedding_spec
+        if self.gallery_file:
+            print("Construyendo la galería en archivo desde la base de datos...")
+        entries = self._collect_gallery_entries(
+            self.db_manager.get_all_users_for_recognition(), embedder, spec
+        )
+        if self.gallery_file:
+            try:
+                path = publish_gallery_file(
+                    self.gallery_file, entries, dtype=self.gallery_dtype, generation=generation,
+                    model=spec[0], version=spec[1]
+                )
+                return QuantizedGallery(path)
+            except (OSError, ValueError) as e:
+                # Sin poder escribir el archivo se sigue reconociendo con la galería en memoria
+                print(f"No se pudo escribir la galería en archivo ({e}); se usa en memoria")
+        gallery = GalleryIndex(**self._gallery_options)
+        gallery.build(entries)
+        return gallery
+
+    def _rebuild_gallery_file(self, generation=None):
+        """Reescribe el archivo de galería desde la base de datos y lo abre."""
+        if generation is None:
+            generation = self.db_manager.get_users_generation()
+        self._gallery = self._build_gallery(generation)
+        self._gallery_generation = generation
+
+    def _load_gallery(self):
+        """Carga los embeddings de todos los usuarios registrados."""
+        self.db_manager.users_changed()  # Punto de partida para detectar cambios posteriores
+        generation = self.db_manager.get_users_generation()
+        
+        if not self.gallery_file:
+            self._gallery = self._build_gallery(generation)
+            self._gallery_generation = generation
+            return
         
-        temp_path = None
-        if isinstance(image_path_or_array, np.ndarray):
-            temp_path = Path(os.path.dirname(__file__)).parent / 'temp_frame.jpg'
-            cv2.imwrite(str(temp_path), image_path_or_array)
-            image_path = str(temp_path)
+        path = latest_gallery_file(self.gallery_file)
+        if path and self._gallery_file_current(read_header(path)):
+            # El archivo se abre al instante; lo que cambió después de escribirlo se aplica encima
+            self._gallery = QuantizedGallery(path)
+            self._gallery_generation = self._gallery.generation
+            if self._gallery_generation != generation:
+                self._apply_gallery_changes(generation)
         else:
-            image_path = image_path_or_array
+            self._rebuild_gallery_file(generation)
+
+    def _apply_gallery_changes(self, generation):
+        """Carga solo los usuarios nuevos, modificados o eliminados desde la generación actual."""
+        if self.gallery_file:
+            path = latest_gallery_file(self.gallery_file)
+            header = read_header(path) if path else None
+            if self._gallery_file_current(header) and header['generation'] >= generation \
+                    and header['generation'] != getattr(self._gallery, 'generation', None):
+                # Otro proceso ya publicó una versión más nueva: basta con abrirla
+                self._gallery = QuantizedGallery(path)
+                self._gallery_generation = self._gallery.generation
+                return
         
-        best_match = None
-        min_distance = float('inf')
+        since = self._gallery_generation or 0
+        deleted = self.db_manager.get_users_deleted_since(since)
+        changed = self.db_manager.get_users_changed_since(since)
+        if self.gallery_file and getattr(self._gallery, 'n_changes', 0) + len(deleted) + len(changed) > MAX_OVERLAY_CHANGES:
+            self._rebuild_gallery_file(generation)
+            return
         
-        # Comparar con cada usuario registrado usando DeepFace
-        for user_id, name, photo_path in users:
+        # Se modifica una copia y se reemplaza al final: las búsquedas en curso siguen
+        # usando la galería anterior completa
+        gallery = self._gallery.copy()
+        for user_id in deleted:
+            gallery.remove(user_id)
+        for user_id, name, embedding in self._collect_gallery_entries(changed):
+            gallery.upsert(user_id, name, embedding)
+        self._gallery = gallery
+        self._gallery_generation = generation
+        if deleted or changed:
+            print(f"Galería actualizada: {len(changed)} usuario(s) nuevo(s) o modificado(s), "
+                  f"{len(deleted)} eliminado(s)")
+
+    def _embed_probe(self, image_path_or_array, embedder=None):
+        """
+        Calcula los embeddings de los rostros presentes en la imagen a reconocer.
+        Los arrays de NumPy (BGR) se pasan directamente al modelo, sin archivos temporales.
+        """
+        try:
+            return (embedder or self.embedder).embed_image(image_path_or_array, enforce_detection=False)
+        except EmbeddingServiceStopped:
+            raise
+        except Exception:
+            return []
+
+    def search_faces(self, image_path_or_array, k=5):
+        """
+        Busca los k usuarios más parecidos al rostro de la imagen.
+        Returns:
+            Lista de tuplas (user_id, name, distance) ordenada por distancia
+        """
+        best = {}
+        self.gallery  # Carga o actualiza la galería si hace falta
+        while True:
+            # Modelo y galería de la misma versión de embeddings
+            with self._serving_lock:
+                embedder, gallery = self.embedder, self._gallery
             try:
-                result = DeepFace.verify(
-                    img1_path=image_path,
-                    img2_path=photo_path,
-                    model_name='Facenet',  
-                    distance_metric='cosine',
-                    enforce_detection=False
-                )
-                
-                distance = result['distance']
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    best_match = {
-                        'user_id': user_id, 'name': name, 'distance': distance, 
-                        'verified': result['verified']
-                    }
-            
-            except Exception:
-                continue
+                with metrics.timer('embed'):
+                    probes = self._embed_probe(image_path_or_array, embedder)
+                break
+            except EmbeddingServiceStopped:
+                if embedder is self.embedder:
+                    probes = []  # El sistema se está cerrando
+                    break
+                # Se cambió de versión de embeddings mientras tanto: se repite con la nueva
+        with metrics.timer('match'):
+            for probe in probes:
+                for user_id, name, distance in gallery.search(probe, k=k):
+                    if user_id not in best or distance < best[user_id][2]:
+                        best[user_id] = (user_id, name, distance)
+        
+        return sorted(best.values(), key=lambda match: match[2])[:k]
+
+    def recognize_face(self, image_path_or_array):
+        """Reconoce un rostro comparándolo con todos los usuarios registrados."""
+        with metrics.timer('recognize'):
+            result = self._recognize_face(image_path_or_array)
+        metrics.inc('recognitions')
+        if result['verified']:
+            metrics.inc('recognitions_verified')
+        return result
+
+    def _recognize_face(self, image_path_or_array):
+        if len(self.gallery) == 0:
+            return {
+                'user_id': None, 'name': 'Desconocido', 'distance': 1.0, 
+                'verified': False, 'message': 'No hay usuarios registrados'
+            }
         
-        # Limpiar archivo temporal
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+        matches = self.search_faces(image_path_or_array, k=1)
         
-        if best_match and best_match['verified']:
-            return best_match
+        if matches and matches[0][2] <= self.distance_threshold:
+            user_id, name, distance = matches[0]
+            return {
+                'user_id': user_id, 'name': name, 'distance': distance, 
+                'verified': True
+            }
         else:
             return {
                 'user_id': None,
                 'name': 'Desconocido',
-                'distance': min_distance if min_distance != float('inf') else 1.0,
+                'distance': matches[0][2] if matches else 1.0,
                 'verified': False,
                 'message': 'No coincide con ningún usuario registrado'
             }
 
-    def run_access_control(self):
-        """Ejecuta el sistema de control de acceso en tiempo real (igual que antes)."""
+    def _handle_recognition_result(self, result, camera_id=None):
+        """Registra en la base de datos la decisión de acceso de un reconocimiento."""
+        prefix = f"[{camera_id}] " if camera_id else ""
+        if result and result['verified']:
+            confidence = 1 - result['distance']
+            self.log_access(result['user_id'], result['name'], True, confidence, camera_id)
+            print(f"{prefix}Acceso concedido: {result['name']} (confianza: {confidence:.2f})")
+        else:
+            self.log_access(None, 'Desconocido', False, 0, camera_id)
+            print(f"{prefix}Acceso denegado: Usuario no reconocido")
+
+    def run_access_control(self, num_workers=2, max_queue_size=4,
+                           drop_policy=RecognitionPipeline.DROP_OLDEST, recognition_budget=5.0):
+        """
+        Ejecuta el sistema de control de acceso en tiempo real.
+        La captura y la detección van al ritmo de la cámara; el reconocimiento
+        corre en hilos de fondo y la imagen muestra el último resultado disponible.
+        Args:
+            recognition_budget: Máximo de reconocimientos por segundo (None = sin límite)
+        """
         print("\nIniciando sistema de control de acceso...")
+        # El modelo se carga antes de abrir la cámara (no bloquea el primer reconocimiento)
+        self.preload(background=False)
         print("Presiona 'q' para salir")
         
         cap = cv2.VideoCapture(0)
@@ -217,43 +642,55 @@ class FaceAccessControlSystem:
             print("No se pudo acceder a la cámara")
             return
         
-        frame_count = 0
-        check_interval = 30 
-        last_result = None
+        pipeline = RecognitionPipeline(
+            self.recognize_face, num_workers=num_workers,
+            max_queue_size=max_queue_size, drop_policy=drop_policy
+        ).start()
+        
+        detector = self.create_detector()
+        tracker = FaceTracker()
+        # Reconoce por eventos (rostro nuevo, cambio en el rostro, plazo vencido)
+        scheduler = RecognitionScheduler(tracker, max_rate=recognition_budget)
         
         while True:
-            ret, frame = cap.read()
+            frame_start = time.perf_counter()
+            with metrics.timer('capture'):
+                ret, frame = cap.read()
             if not ret:
                 break
             
-            frame_count += 1
-            
-            # Detectar rostros con Haar Cascade
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+            # Detectar rostros (modo rápido: frame reducido y regiones de los rostros previos)
+            with metrics.timer('detect'):
+                faces = detector.detect(frame)
+            metrics.inc('frames')
+            metrics.inc('faces_detected', len(faces))
             
-            # Solo procesar con DeepFace cada N frames para mejor rendimiento
-            if frame_count % check_interval == 0 and len(faces) > 0:
-                x, y, w, h = faces[0]
-                face_roi = frame[y:y+h, x:x+w]
-                
-                last_result = self.recognize_face(face_roi)
-                
-                if last_result and last_result['verified']:
-                    confidence = 1 - last_result['distance']
-                    self.log_access(last_result['user_id'], last_result['name'], True, confidence)
-                    print(f"Acceso concedido: {last_result['name']} (confianza: {confidence:.2f})")
+            # Asociar detecciones a tracks y encolar solo los que toca reconocer
+            tracks = tracker.update(faces)
+            for track, reason in scheduler.select(frame, tracks):
+                x, y, w, h = track.box
+                if pipeline.submit(frame[y:y+h, x:x+w].copy(), tag=track.id):
+                    scheduler.mark_submitted(frame, track, reason)
                 else:
-                    self.log_access(None, 'Desconocido', False, 0)
-                    print(f"Acceso denegado: Usuario no reconocido")
+                    scheduler.cancel(track)
+                    metrics.inc('recognitions_dropped')
+            metrics.set_gauge('recognition_queue_depth', pipeline.pending)
             
-            # Dibujar rectángulos y etiquetas
-            for (x, y, w, h) in faces:
-                current_match = last_result 
+            # Recoger los reconocimientos terminados en segundo plano
+            for track_id, result in pipeline.poll_results():
+                if tracker.assign_result(track_id, result):
+                    self._handle_recognition_result(result)
+            
+            # Dibujar rectángulos y etiquetas (cada rostro con su identidad)
+            for track in tracks:
+                x, y, w, h = track.box
                 
-                if current_match and current_match['verified']:
+                if track.verified:
                     color = (0, 255, 0)  # Verde
-                    label = f"OK: {current_match['name']}"
+                    label = f"OK: {track.result['name']}"
+                elif track.result is None:
+                    color = (0, 255, 255)  # Amarillo
+                    label = "Verificando..."
                 else:
                     color = (0, 0, 255)  # Rojo
                     label = "X: Desconocido"
@@ -267,14 +704,38 @@ class FaceAccessControlSystem:
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
             cv2.putText(frame, "Presiona 'q' para salir", (10, 60),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            metrics.registry.draw_overlay(frame)
             
             cv2.imshow('Control de Acceso Facial', frame)
             
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 print("\nDeteniendo sistema...")
                 break
+            metrics.observe('frame', time.perf_counter() - frame_start)
         
+        pipeline.stop()
         cap.release()
         cv2.waitKey(1) 
         cv2.destroyAllWindows()
+        triggers = ", ".join(f"{reason}: {count}" for reason, count in sorted(scheduler.triggers.items()))
+        print(f"Reconocimientos lanzados ({triggers or 'ninguno'}), aplazados por presupuesto: {scheduler.deferred}")
+        print("Sistema detenido")
+
+    def run_multi_camera(self, sources, display=True, num_workers=2):
+        """
+        Ejecuta el control de acceso sobre varias fuentes de video a la vez.
+        Cada fuente se captura y procesa en su propio proceso; el reconocimiento
+        y la galería son compartidos y cada acceso queda etiquetado con su cámara.
+        Args:
+            sources: Lista de índices de cámara, URLs RTSP o archivos de video
+            display: Muestra una ventana por cámara ('q' detiene todas)
+        """
+        from multicam import MultiCameraRunner
+
+        print(f"\nIniciando control de acceso con {len(sources)} cámara(s)...")
+        self.preload(background=False)
+        runner = MultiCameraRunner(self, sources, display=display, num_workers=num_workers)
+        frames = runner.run()
+        for camera_id, count in sorted(frames.items()):
+            print(f"  {camera_id}: {count or 0} frames procesados")
         print("Sistema detenido")
\ No newline at end of file
@@ -0,0 +1,179 @@
+import itertools
+import time
+
+
+def iou(box_a, box_b):
+    """Intersección sobre unión de dos cajas (x, y, w, h)."""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    intersection = inter_w * inter_h
+    return intersection / float(aw * ah + bw * bh - intersection)
+
+
+class Track:
+    """Un rostro seguido a lo largo de varios frames."""
+
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.misses = 0
+        self.result = None            # Último resultado de reconocimiento
+        self.last_recognized = None   # Momento del último resultado
+        self.pending_since = None     # Reconocimiento en curso
+
+    @property
+    def verified(self):
+        return bool(self.result and self.result['verified'])
+
+    @property
+    def confidence(self):
+        if not self.verified:
+            return 0.0
+        return 1 - self.result['distance']
+
+
+class FaceTracker:
+    """
+    Seguimiento ligero de rostros por IoU entre frames consecutivos.
+    Cada track se reconoce una vez al aparecer y solo se vuelve a verificar
+    según un calendario de tiempo/confianza, con su propia identidad.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=10, min_hits=2,
+                 reverify_interval=5.0, low_confidence=0.7,
+                 low_confidence_interval=1.5, unknown_interval=1.0,
+                 pending_timeout=5.0):
+        """
+        Args:
+            iou_threshold: IoU mínimo para asociar una detección a un track
+            max_missed: Frames sin detección antes de eliminar un track
+            min_hits: Detecciones necesarias antes de reconocer un track nuevo
+            reverify_interval: Segundos entre verificaciones de un usuario reconocido
+            low_confidence: Por debajo de esta confianza se re-verifica antes
+            low_confidence_interval: Segundos entre verificaciones con confianza baja
+            unknown_interval: Segundos entre reintentos de un rostro desconocido
+            pending_timeout: Segundos tras los que un reconocimiento perdido se reintenta
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.reverify_interval = reverify_interval
+        self.low_confidence = low_confidence
+        self.low_confidence_interval = low_confidence_interval
+        self.unknown_interval = unknown_interval
+        self.pending_timeout = pending_timeout
+        self.tracks = {}
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, now=None):
+        """
+        Asocia las detecciones del frame a los tracks existentes.
+        Args:
+            boxes: Cajas (x, y, w, h) detectadas en el frame
+        Returns:
+            Lista de tracks visibles en este frame
+        """
+        now = time.monotonic() if now is None else now
+        boxes = [tuple(int(v) for v in box) for box in boxes]
+
+        # Emparejamiento voraz por IoU descendente
+        pairs = []
+        for track_id, track in self.tracks.items():
+            for i, box in enumerate(boxes):
+                overlap = iou(track.box, box)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, track_id, i))
+        pairs.sort(reverse=True)
+
+        matched_tracks = set()
+        matched_boxes = set()
+        visible = []
+        for _, track_id, i in pairs:
+            if track_id in matched_tracks or i in matched_boxes:
+                continue
+            track = self.tracks[track_id]
+            track.box = boxes[i]
+            track.last_seen = now
+            track.hits += 1
+            track.misses = 0
+            matched_tracks.add(track_id)
+            matched_boxes.add(i)
+            visible.append(track)
+
+        # Tracks no vistos en este frame
+        for track_id in list(self.tracks):
+            if track_id not in matched_tracks:
+                track = self.tracks[track_id]
+                track.misses += 1
+                if track.misses > self.max_missed:
+                    del self.tracks[track_id]
+
+        # Detecciones nuevas
+        for i, box in enumerate(boxes):
+            if i not in matched_boxes:
+                track = Track(next(self._ids), box, now)
+                self.tracks[track.id] = track
+                visible.append(track)
+
+        return visible
+
+    def is_pending(self, track, now=None):
+        """Indica si el track espera un reconocimiento; libera los que se perdieron."""
+        if track.pending_since is None:
+            return False
+        now = time.monotonic() if now is None else now
+        if now - track.pending_since < self.pending_timeout:
+            return True
+        track.pending_since = None  # El reconocimiento se perdió (p. ej. descartado)
+        return False
+
+    def recognition_interval(self, track):
+        """Segundos entre verificaciones del track según su último resultado."""
+        if not track.verified:
+            return self.unknown_interval
+        if track.confidence < self.low_confidence:
+            return self.low_confidence_interval
+        return self.reverify_interval
+
+    def needs_recognition(self, track, now=None):
+        """Indica si el track debe enviarse a reconocer ahora."""
+        now = time.monotonic() if now is None else now
+
+        if self.is_pending(track, now):
+            return False
+        if track.hits < self.min_hits:
+            return False
+        if track.last_recognized is None:
+            return True
+        return now - track.last_recognized >= self.recognition_interval(track)
+
+    def mark_pending(self, track, now=None):
+        track.pending_since = time.monotonic() if now is None else now
+
+    def assign_result(self, track_id, result, now=None):
+        """
+        Guarda el resultado de reconocimiento de un track.
+        Returns:
+            True si es la primera decisión del track, si su identidad cambió
+            o si el track ya desapareció (la decisión no debe perderse)
+        """
+        track = self.tracks.get(track_id)
+        if track is None:
+            return True
+
+        previous = track.result
+        track.result = result
+        track.last_recognized = time.monotonic() if now is None else now
+        track.pending_since = None
+
+        if previous is None:
+            return True
+        return (previous['verified'], previous.get('user_id')) != \
+            (result['verified'], result.get('user_id'))